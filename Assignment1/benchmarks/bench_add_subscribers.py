@@ -0,0 +1,37 @@
+# Loads growing numbers of subscribers through Agency.add_subscriber and reports the time per insert.
+# With the hashed duplicate check the time per insert stays flat, i.e. loading is linear in the number of subscribers.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_add_subscribers [--max 1000000]
+import argparse
+import time
+
+from src.model.agency import Agency
+from src.model.subscriber import Subscriber
+
+
+def load_subscribers(count: int) -> float:
+    agency = Agency()
+    start = time.perf_counter()
+    for i in range(count):
+        agency.add_subscriber(Subscriber(ID=i, name=f"Subscriber {i}", address=f"Street {i}"))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk loading of subscribers")
+    parser.add_argument("--max", type=int, default=1_000_000, help="largest number of subscribers to load")
+    args = parser.parse_args()
+
+    sizes = []
+    size = args.max
+    while size >= 1000 and len(sizes) < 4:
+        sizes.insert(0, size)
+        size //= 2
+    print(f"{'subscribers':>12} {'seconds':>10} {'µs/insert':>10}")
+    for size in sizes:
+        seconds = load_subscribers(size)
+        print(f"{size:>12} {seconds:>10.2f} {seconds / size * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
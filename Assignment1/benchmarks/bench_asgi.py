@@ -0,0 +1,119 @@
+# Compares the asyncio serving mode (asgi.py on asyncio_server.py) with the WSGI path (the threaded Werkzeug server
+# behind create_app().run): the server runs in its own process, --idle keep-alive connections are opened and left
+# waiting, and --clients keep-alive clients send --requests GETs each, one after the other. Prints the throughput
+# and the latency percentiles of both.
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_asgi [--clients 100] [--requests 50] [--idle 1000] [--workers 32]
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import multiprocessing
+import re
+import resource
+import time
+
+from src.app import create_app
+from src.asgi import create_asgi_app
+from src.asyncio_server import serve
+
+PAPERS = 10
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve_wsgi(ports: multiprocessing.Queue, workers: int):
+    from werkzeug.serving import make_server
+    raise_file_limit()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)  # a thread per connection
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def serve_asgi(ports: multiprocessing.Queue, workers: int):
+    raise_file_limit()
+    asyncio.run(serve(create_asgi_app(workers), port=0, started=lambda server: ports.put(server.sockets[0].getsockname()[1])))
+
+
+async def client(port: int, paths, latencies: list, errors: list):
+    # a keep-alive client, it connects again if the server closes the connection (the Werkzeug server does after
+    # every response, the time to connect counts into the latency of the request)
+    writer = None
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            await reader.readexactly(int(re.search(rb"content-length: *(\d+)", head, re.IGNORECASE).group(1)))
+            latencies.append(time.perf_counter() - start)
+            if re.search(rb"connection: *close", head, re.IGNORECASE):
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+    except (OSError, asyncio.IncompleteReadError, AttributeError) as error:
+        errors.append(error)
+
+
+async def load(port: int, clients: int, requests: int, idle: int):
+    waiting = []
+    for _ in range(idle):
+        try:
+            waiting.append(await asyncio.open_connection("127.0.0.1", port))
+        except OSError:
+            break
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, [f"/newspaper/{(c + r) % PAPERS}" for r in range(requests)], latencies, errors)
+                           for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    for _, writer in waiting:
+        writer.close()
+    return elapsed, sorted(latencies), len(waiting), errors
+
+
+def measure(name: str, target, args) -> str:
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=(ports, args.workers), daemon=True)
+    process.start()
+    port = ports.get(timeout=30)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    for paper_id in range(PAPERS):
+        connection.request("POST", "/newspaper/", json.dumps({"paper_id": paper_id, "name": f"Paper {paper_id}",
+                                                              "frequency": 7, "price": 1.5}),
+                           {"Content-Type": "application/json"})
+        connection.getresponse().read()
+    connection.close()
+    elapsed, latencies, idle, errors = asyncio.run(load(port, args.clients, args.requests, args.idle))
+    process.terminate()
+    process.join()
+    if not latencies:
+        return f"{name:6} no request answered ({len(errors)} clients failed)"
+    percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    return (f"{name:6}{len(latencies) / elapsed:10.0f} req/s   p50 {percentile(0.5):7.1f} ms   p99 {percentile(0.99):7.1f} ms"
+            f"   ({idle} idle connections, {len(errors)} clients failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio serving mode against the WSGI server")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--idle", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=32, help="request threads of the asyncio mode")
+    args = parser.parse_args()
+    raise_file_limit()
+    print(f"{args.clients} clients x {args.requests} requests, {args.idle} idle keep-alive connections")
+    print(measure("wsgi", serve_wsgi, args))
+    print(measure("asgi", serve_asgi, args))
+
+
+if __name__ == "__main__":
+    main()
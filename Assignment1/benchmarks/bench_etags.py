@@ -0,0 +1,48 @@
+# Times a polling client on GET /subscriber/, GET /subscriber/<id> and GET /newspaper/<paper_id>/issue:
+# a full response (200) against an unchanged resource answered from its ETag (304 Not Modified).
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_etags [--subscribers 200000] [--issues 200000]
+import argparse
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.subscriber import Subscriber
+
+
+def time_get(client, url: str, repeat: int, headers=None) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        client.get(url, headers=headers)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conditional GETs")
+    parser.add_argument("--subscribers", type=int, default=200_000)
+    parser.add_argument("--issues", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    client = create_app().test_client()
+    agency = Agency.get_instance()
+    for ID in range(args.subscribers):
+        agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Street {ID}"))
+    agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+    paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=2.5))
+    for issue_id in range(args.issues):
+        agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1, pages=issue_id % 40))
+
+    for url, repeat in [("/subscriber/", args.repeat), ("/newspaper/1/issue", args.repeat), ("/subscriber/1", 1000)]:
+        response = client.get(url)
+        headers = {"If-None-Match": response.headers["ETag"]}
+        assert client.get(url, headers=headers).status_code == 304
+        full = time_get(client, url, repeat)
+        not_modified = time_get(client, url, repeat, headers)
+        print(f"GET {url:20} 200 {full * 1000:9.3f} ms   304 {not_modified * 1000:9.3f} ms   ({full / not_modified:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Compares the peak memory and time of GET /subscriber/ (marshal_list_with) with the streamed /subscriber/export.
+# The peak RSS only grows, so the streamed export runs first.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_export [--subscribers 1000000]
+import argparse
+import resource
+import time
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.subscriber import Subscriber
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def download(app, url: str):
+    # reads the response chunk by chunk, like a client would
+    start = time.perf_counter()
+    app_iter, status, headers = run_wsgi_app(app, EnvironBuilder(url).get_environ())
+    size = sum(len(chunk) for chunk in app_iter)
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streamed export")
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    args = parser.parse_args()
+    app = create_app()
+    agency = Agency.get_instance()
+    for ID in range(args.subscribers):
+        agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Street {ID}"))
+    print(f"{args.subscribers} subscribers, peak RSS {peak_rss_mib():.0f} MiB")
+
+    for label, url in [("export ndjson", "/subscriber/export"),
+                       ("export json", "/subscriber/export?format=json"),
+                       ("GET list", "/subscriber/")]:
+        before = peak_rss_mib()
+        seconds, size = download(app, url)
+        print(f"{label:14} {seconds:6.1f} s  {size / 2 ** 20:6.0f} MiB  peak RSS +{peak_rss_mib() - before:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
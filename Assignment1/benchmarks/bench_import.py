@@ -0,0 +1,84 @@
+# Compares the streamed bulk import of subscribers with single POST /subscriber/ requests, and checks that the memory
+# use of an import doesn't grow with the size of the upload (the upload is generated while it is read).
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_import [--rows 1000000] [--single 10000]
+import argparse
+import io
+import json
+import resource
+import time
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from src.app import create_app
+from src.model.agency import Agency
+
+
+class GeneratedUpload(io.RawIOBase):
+    # a file-like NDJSON upload that produces its rows while it is read, so the benchmark doesn't hold it in memory
+    def __init__(self, rows):
+        self.rows = rows
+        self.pending = b""
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self.pending) < len(buffer):
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.pending += json.dumps(row).encode() + b"\n"
+        data, self.pending = self.pending[:len(buffer)], self.pending[len(buffer):]
+        buffer[:len(data)] = data
+        self.size += len(data)
+        return len(data)
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_import(app, url: str, rows):
+    upload = GeneratedUpload(rows)
+    environ = EnvironBuilder(url, method="POST", content_type="application/x-ndjson").get_environ()
+    # like a chunked upload, without a content length
+    environ.update({"wsgi.input": io.BufferedReader(upload), "wsgi.input_terminated": True})
+    start = time.perf_counter()
+    app_iter, status, headers = run_wsgi_app(app, environ)
+    report = json.loads(b"".join(app_iter))
+    return time.perf_counter() - start, upload.size, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk import")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--single", type=int, default=10_000, help="number of single POST requests to compare with")
+    args = parser.parse_args()
+    app = create_app()
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for i in range(args.single):
+        client.post("/subscriber/", json={"ID": 1, "name": f"Single {i}", "address": "Street"})
+    single = (time.perf_counter() - start) / args.single
+    print(f"single POST:  {single * 1e6:8.1f} µs per subscriber")
+
+    rows = ({"ID": 1, "name": f"Reader {i}", "address": "Street"} for i in range(args.rows))
+    seconds, size, report = stream_import(app, "/subscriber/import", rows)
+    print(f"bulk import:  {seconds / args.rows * 1e6:8.1f} µs per subscriber "
+          f"({report['imported']} imported, {size / 2 ** 20:.0f} MiB upload, peak RSS {peak_rss_mib():.0f} MiB)")
+
+    # rows that are all rejected (duplicates) store nothing, so the peak memory must not grow with the upload
+    for factor in (1, 4):
+        before = peak_rss_mib()
+        rows = ({"ID": 1, "name": "Reader 0", "address": "Street"} for _ in range(args.rows * factor))
+        seconds, size, report = stream_import(app, "/subscriber/import", rows)
+        print(f"rejected:     {report['failed']} rows, {size / 2 ** 20:.0f} MiB upload, "
+              f"peak RSS {before:.0f} -> {peak_rss_mib():.0f} MiB")
+    assert len(Agency.get_instance().subscribers) == args.single + args.rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Compares Agency.issue_stats over the Issue objects with the columnar issue store (numpy, or the array fallback
+# with --no-numpy), and the cost of writing the issues through to the columns.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_issue_columns [--papers 100] [--issues 1000000] [--no-numpy]
+import argparse
+import time
+
+from src.model import issue_columns
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+
+
+def build(papers: int, issues: int, columnar: bool) -> Agency:
+    agency = Agency()
+    if columnar:
+        agency.enable_issue_columns()
+    for editor_id in range(1, 11):
+        agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address=f"Office {editor_id}"))
+    for paper_id in range(papers):
+        paper = agency.add_newspaper(Newspaper(paper_id=paper_id, name=f"Paper {paper_id}", frequency=1, price=1.0))
+        for issue_id in range(issues // papers):
+            issue = agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}",
+                                                  editor_id=1 + issue_id % 10, pages=8 + issue_id % 32))
+            if issue_id % 3:
+                agency.release_issue(issue)
+    return agency
+
+
+def time_stats(agency: Agency, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        stats = [agency.issue_stats(paper) for paper in agency.newspapers]
+    return (time.perf_counter() - start) / repeat, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar issue store")
+    parser.add_argument("--papers", type=int, default=100)
+    parser.add_argument("--issues", type=int, default=1_000_000, help="issues across all papers")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-numpy", action="store_true", help="use the array fallback even if numpy is installed")
+    args = parser.parse_args()
+    if args.no_numpy:
+        issue_columns.np = None
+    backend = "numpy" if issue_columns.np is not None else "array fallback"
+
+    results = {}
+    for columnar in (False, True):
+        start = time.perf_counter()
+        agency = build(args.papers, args.issues, columnar)
+        build_time = time.perf_counter() - start
+        stats_time, stats = time_stats(agency, args.repeat)
+        results[columnar] = stats
+        label = f"columns ({backend})" if columnar else "Issue objects"
+        print(f"{label:24} build {build_time:6.1f} s   issue_stats for all papers {stats_time * 1000:9.1f} ms")
+        del agency
+    assert results[False] == results[True]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Measures the memory used by the model objects and reports the resident set size (RSS) and the bytes per issue,
+# per subscriber (with one subscription) and per delivered issue.
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_memory [--issues 1000000] [--subscribers 1000000] [--deliveries 10000000]
+import argparse
+import gc
+import os
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.subscriber import Subscriber
+
+
+def rss() -> int:
+    # current resident set size in bytes (Linux)
+    gc.collect()
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory use of the model")
+    parser.add_argument("--issues", type=int, default=1_000_000, help="issues in the archive of one newspaper")
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--deliveries", type=int, default=10_000_000)
+    parser.add_argument("--papers", type=int, default=100, help="newspapers the subscribers are spread over")
+    args = parser.parse_args()
+    issues_per_paper = max(1, args.deliveries // args.subscribers)
+
+    start = time.perf_counter()
+    with create_app().app_context():
+        agency = Agency()
+        agency.add_editor(Editor(ID=1, name="Editor", address="Office 1"))
+        before = rss()
+
+        archive = agency.add_newspaper(Newspaper(paper_id=-1, name="Archive", frequency=1, price=1.0))
+        for issue_id in range(args.issues):
+            agency.add_issue(archive, Issue(issue_id=issue_id, releasedate=f"2024-{issue_id}", editor_id=1, pages=8))
+        after_issues = rss()
+
+        papers = [agency.add_newspaper(Newspaper(paper_id=paper_id, name=f"Paper {paper_id}", frequency=1, price=1.0))
+                  for paper_id in range(args.papers)]
+        for subscriber_id in range(args.subscribers):
+            subscriber = agency.add_subscriber(Subscriber(ID=subscriber_id, name=f"Subscriber {subscriber_id}",
+                                                          address=f"Street {subscriber_id}"))
+            agency.subscribe_to_paper(subscriber, papers[subscriber_id % args.papers])
+        after_subscribers = rss()
+
+        # every paper releases its issues and delivers them to all of its subscribers
+        for paper in papers:
+            for issue_id in range(issues_per_paper):
+                issue = agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"2024-{issue_id}", editor_id=1, pages=8))
+                agency.release_issue(issue)
+                for subscriber in paper.subscribers:
+                    agency.deliver_issue(subscriber, issue, paper)
+        after_deliveries = rss()
+    seconds = time.perf_counter() - start
+
+    deliveries = issues_per_paper * args.subscribers
+    print(f"{args.issues} issues, {args.subscribers} subscribers, {deliveries} deliveries ({seconds:.0f} s)")
+    print(f"bytes per issue:      {(after_issues - before) / max(args.issues, 1):8.1f}")
+    print(f"bytes per subscriber: {(after_subscribers - after_issues) / max(args.subscribers, 1):8.1f}")
+    print(f"bytes per delivery:   {(after_deliveries - after_subscribers) / max(deliveries, 1):8.1f}")
+    print(f"total RSS:            {after_deliveries / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
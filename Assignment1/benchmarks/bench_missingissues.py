@@ -0,0 +1,65 @@
+# Compares check_missingissues with the previous implementation, which rescanned every issue of every subscribed
+# paper against the list of delivered issues on each request.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_missingissues [--papers 1] [--issues 10000]
+import argparse
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.editor import Editor
+from src.model.subscriber import Subscriber
+
+
+# the implementation before the incrementally maintained subscriber.missing (scans issues_list with Issue.__eq__)
+def previous_check_missingissues(subscriber):
+    undelivered = {}
+    for paper in subscriber.newspaper_list:
+        for issue in paper.issues:
+            if issue.released and (issue not in subscriber.issues_list):
+                undelivered.update({paper.name: str(issue.issue_id) + undelivered.get(' '+paper.name, "")})
+    return f"Undelivered Issues from: {[key+': Issues with ID '+str(value)+' ' for key, value in undelivered.items()]}"
+
+
+def build(papers: int, issues: int, delivered_share: float):
+    agency = Agency()
+    agency.add_editor(Editor(ID=1, name="Editor", address="Office 1"))
+    subscriber = agency.add_subscriber(Subscriber(ID=1, name="Reader", address="Home 1"))
+    for paper_id in range(papers):
+        paper = agency.add_newspaper(Newspaper(paper_id=paper_id, name=f"Paper {paper_id}", frequency=1, price=1.0))
+        agency.subscribe_to_paper(subscriber, paper)
+        for issue_id in range(issues):
+            issue = agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1, pages=8))
+            agency.release_issue(issue)
+            if issue_id < issues * delivered_share:
+                agency.deliver_issue(subscriber, issue, paper)
+    return agency, subscriber
+
+
+def timed(function, subscriber, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(subscriber)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the missing issues check")
+    parser.add_argument("--papers", type=int, default=1, help="number of subscribed papers")
+    parser.add_argument("--issues", type=int, default=10_000, help="released issues per paper")
+    parser.add_argument("--delivered", type=float, default=0.999, help="share of the issues already delivered")
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        agency, subscriber = build(args.papers, args.issues, args.delivered)
+        current = timed(agency.check_missingissues, subscriber, repeat=1000)
+        previous = timed(previous_check_missingissues, subscriber, repeat=1)
+    print(f"{args.papers} papers x {args.issues} issues, {args.delivered:.1%} delivered")
+    print(f"previous implementation: {previous * 1e3:12.3f} ms/request")
+    print(f"maintained missing set:  {current * 1e3:12.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
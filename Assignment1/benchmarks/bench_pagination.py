@@ -0,0 +1,41 @@
+# Times GET /subscriber/?limit=...&cursor=... for pages at the start, the middle and the end of the subscribers,
+# a page should cost the same wherever it is (compared with the whole list GET /subscriber/).
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_pagination [--subscribers 1000000] [--limit 100]
+import argparse
+import time
+
+from src.api.pagination import encode_cursor
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.subscriber import Subscriber
+
+
+def time_get(client, url: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url)
+        assert response.status_code == 200
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cursor pagination")
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    client = create_app().test_client()
+    agency = Agency.get_instance()
+    for ID in range(args.subscribers):
+        agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Street {ID}"))
+
+    for label, after in [("first page", None), ("middle page", args.subscribers // 2),
+                         ("last page", args.subscribers - args.limit - 1)]:
+        url = f"/subscriber/?limit={args.limit}" + (f"&cursor={encode_cursor(after)}" if after is not None else "")
+        print(f"{label:12} {time_get(client, url, args.repeat) * 1000:8.2f} ms")
+    print(f"{'whole list':12} {time_get(client, '/subscriber/', 1) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
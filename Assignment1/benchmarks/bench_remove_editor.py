@@ -0,0 +1,71 @@
+# Removes a busy editor from an agency with many editors and issues and compares the reassignment through
+# Agency.paper_editors with the previous nested loop over all editors and their issue lists.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_remove_editor [--editors 1000] [--issues 100000]
+import argparse
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+
+
+# the implementation before the newspaper -> editors index
+def previous_remove_editor(agency, editor):
+    agency.editors.remove(editor)
+    if len(editor.issues_list) != 0 and len(agency.editors) != 0:
+        for issue in editor.issues_list:
+            for new_editor in agency.editors:
+                newspaper_list = [x.newspaper_id for x in new_editor.issues_list]
+                if issue.newspaper_id in newspaper_list:
+                    new_editor.issues_list.add(issue)
+                    break
+
+
+def build(editors: int, issues: int, papers: int, busy_share: float):
+    agency = Agency()
+    for editor_id in range(1, editors + 1):  # editor ID 0 means "no editor yet"
+        agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address=f"Office {editor_id}"))
+    for paper_id in range(papers):
+        agency.add_newspaper(Newspaper(paper_id=paper_id, name=f"Paper {paper_id}", frequency=1, price=1.0))
+    busy_issues = int(issues * busy_share)
+    editors_per_paper = max(1, (editors - 1) // papers)
+    for number in range(issues):
+        paper_id = number % papers
+        paper = agency.get_newspaper(paper_id)
+        # editor 1 is the busy one, every other editor works for a single newspaper
+        editor_id = 1 if number < busy_issues else 2 + paper_id + papers * ((number // papers) % editors_per_paper)
+        agency.add_issue(paper, Issue(issue_id=number, releasedate=f"day {number}", editor_id=editor_id, pages=8))
+    return agency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark removing an editor")
+    parser.add_argument("--editors", type=int, default=1000)
+    parser.add_argument("--issues", type=int, default=100_000)
+    parser.add_argument("--papers", type=int, default=100)
+    parser.add_argument("--busy", type=float, default=0.02, help="share of all issues supervised by the removed editor")
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        agency = build(args.editors, args.issues, args.papers, args.busy)
+        editor = agency.get_editor(1)
+        moved = len(editor.issues_list)
+        start = time.perf_counter()
+        agency.remove_editor(editor)
+        current = time.perf_counter() - start
+
+        agency = build(args.editors, args.issues, args.papers, args.busy)
+        start = time.perf_counter()
+        previous_remove_editor(agency, agency.get_editor(1))
+        previous = time.perf_counter() - start
+
+    print(f"{args.editors} editors, {args.issues} issues in {args.papers} papers, {moved} issues reassigned")
+    print(f"previous implementation: {previous * 1e3:10.1f} ms")
+    print(f"paper -> editors index:  {current * 1e3:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
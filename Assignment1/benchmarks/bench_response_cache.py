@@ -0,0 +1,78 @@
+# Times GET /subscriber/<id>/missingissues, /subscriber/<id>/stats and /newspaper/<paper_id>/stats with and without
+# the response cache, for a subscriber with many undelivered issues and special issues, and the hit rate of a
+# mix of reads and deliveries (every delivery changes the responses of one subscriber).
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_response_cache [--issues 50000] [--subscribers 1000]
+import argparse
+import random
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.subscriber import Subscriber
+
+
+def time_get(client, url: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        assert client.get(url).status_code == 200
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the response cache")
+    parser.add_argument("--issues", type=int, default=50_000, help="released issues the subscribers haven't received")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000, help="requests of the read/deliver mix")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    app = create_app()
+    client = app.test_client()
+    cache = app.extensions["response_cache"]
+    with app.app_context():  # the agency answers with jsonify
+        agency = Agency.get_instance()
+        agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=2.5))
+        special = agency.add_newspaper(Newspaper(paper_id=2, name="Special", frequency=1, price=1.0))
+        subscribers = [agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Street {ID}"))
+                       for ID in range(args.subscribers)]
+        for subscriber in subscribers:
+            agency.subscribe_to_paper(subscriber, paper)
+        issues = [agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1, pages=8))
+                  for issue_id in range(args.issues)]
+        for issue in issues:
+            agency.release_issue(issue)
+        for issue_id in range(1000):  # special issues for the stats of subscriber 0
+            issue = agency.add_issue(special, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1, pages=8))
+            agency.release_issue(issue)
+            agency.deliver_issue(subscribers[0], issue, special)
+
+        for url in ["/subscriber/0/missingissues", "/subscriber/0/stats", "/newspaper/1/stats"]:
+            app.extensions["response_cache"] = None
+            uncached = time_get(client, url, args.repeat)
+            app.extensions["response_cache"] = cache
+            client.get(url)
+            hit = time_get(client, url, args.repeat)
+            print(f"GET {url:30} computed {uncached * 1000:8.3f} ms   cached {hit * 1000:8.3f} ms   ({uncached / hit:.0f}x)")
+
+        # 9 reads of the missing issues of a random subscriber for every delivery to a random subscriber
+        random.seed(1)
+        hits, misses = cache.hits, cache.misses
+        start = time.perf_counter()
+        for i in range(args.requests):
+            subscriber = random.randrange(args.subscribers)
+            if i % 10 == 0:
+                agency.deliver_issue(subscribers[subscriber], issues[i % args.issues], paper)
+            else:
+                client.get(f"/subscriber/{subscriber}/missingissues")
+        elapsed = time.perf_counter() - start
+        hits, misses = cache.hits - hits, cache.misses - misses
+        print(f"read/deliver mix: {elapsed / args.requests * 1000:.3f} ms per request, hit rate {hits / (hits + misses):.0%}, "
+              f"{cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Compares the compiled encoders with flask_restx's marshal + json.dumps, for GET /subscriber/ and
+# GET /newspaper/<paper_id>/issue and for the encoders alone (and orjson, if it is installed, on marshalled dicts).
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_serializers [--subscribers 200000] [--issues 200000]
+import argparse
+import json
+import time
+
+from flask_restx import marshal
+
+from src.api.newspaperNS import issue_model
+from src.api.serializers import encode
+from src.api.subscriberNS import subscriber_model
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.subscriber import Subscriber
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def timed(function, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled serializers")
+    parser.add_argument("--subscribers", type=int, default=200_000)
+    parser.add_argument("--issues", type=int, default=200_000)
+    args = parser.parse_args()
+    app = create_app()
+    client = app.test_client()
+    agency = Agency.get_instance()
+    for ID in range(args.subscribers):
+        agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Straße {ID}"))
+    agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+    paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=2.5))
+    for issue_id in range(args.issues):
+        agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}",
+                                      editor_id=1, pages=issue_id % 40))
+
+    for url in ["/subscriber/", "/newspaper/1/issue"]:
+        app.config["COMPILED_SERIALIZERS"] = False
+        marshalled = timed(lambda: client.get(url))
+        expected = client.get(url).data
+        app.config["COMPILED_SERIALIZERS"] = True
+        compiled = timed(lambda: client.get(url))
+        assert client.get(url).data == expected
+        print(f"GET {url:20} marshal {marshalled * 1000:8.0f} ms   compiled {compiled * 1000:8.0f} ms   "
+              f"({marshalled / compiled:.1f}x)")
+
+    subscribers = agency.all_subscribers()
+    issues = agency.all_issues(paper)
+    with app.app_context():
+        for label, objects, model in [("subscribers", subscribers, subscriber_model), ("issues", issues, issue_model)]:
+            print(f"{label:12} marshal + json.dumps "
+                  f"{timed(lambda: json.dumps(marshal(objects, model, 'envelope'))) * 1000:8.0f} ms   "
+                  f"encode {timed(lambda: encode(objects, model, 'envelope')) * 1000:8.0f} ms", end="")
+            if orjson is not None:  # different bytes (no spaces, unescaped UTF-8), only for comparison
+                print(f"   marshal + orjson {timed(lambda: orjson.dumps(marshal(objects, model, 'envelope'))) * 1000:8.0f} ms", end="")
+            print()
+
+
+if __name__ == "__main__":
+    main()
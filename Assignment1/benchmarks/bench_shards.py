@@ -0,0 +1,134 @@
+# Throughput of the sharded agency (sharding.py) with more and more worker processes: the router and its shards run in
+# their own processes, --papers newspapers are spread over the shards and --clients keep-alive clients (in --loaders
+# processes of their own) send --requests requests each to the routes of one newspaper: three reads of a page of its
+# issues for every new issue. Prints the throughput and latency percentiles for every number of shards, and for the
+# asyncio serving mode without a router (one process, one agency) as the baseline.
+# The shards only add throughput while there are idle cores for them (and for the router and the clients).
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_shards [--shards 1,2,4] [--papers 64] [--clients 64] [--requests 100] [--loaders 2]
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import re
+import signal
+import time
+
+from src.asgi import create_asgi_app
+from src.asyncio_server import serve
+from src.sharding import create_sharded_app
+
+SUBSCRIBERS = 100
+
+
+def serve_router(ports: multiprocessing.Queue, shards: int, workers: int):
+    # (terminate ends the server like Ctrl+C, so the router stops its shards on the way out)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    app = create_sharded_app(shards, workers) if shards else create_asgi_app(workers)
+    try:
+        asyncio.run(serve(app, port=0, started=lambda server: ports.put(server.sockets[0].getsockname()[1])))
+    except KeyboardInterrupt:
+        pass
+
+
+def populate(port: int, papers: int):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+
+    def post(path: str, body: dict):
+        connection.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+        connection.getresponse().read()
+    post("/editor/", {"ID": 1, "name": "Bench Editor", "address": "Bench Street"})
+    for ID in range(SUBSCRIBERS):
+        post("/subscriber/", {"ID": ID, "name": f"Reader {ID}", "address": f"Street {ID}"})
+    for paper_id in range(papers):
+        post("/newspaper/", {"paper_id": paper_id, "name": f"Paper {paper_id}", "frequency": 1, "price": 1.5})
+        for ID in range(paper_id % 10, SUBSCRIBERS, 10):
+            post(f"/subscriber/{ID}/subscribe", {"paper_id": paper_id})
+    connection.close()
+
+
+async def client(port: int, number: int, papers: int, requests: int, latencies: list, errors: list):
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for r in range(requests):
+            paper_id = (number + r) % papers
+            if r % 4 == 3:  # a new issue (the pages tell the issues apart)
+                body = json.dumps({"issue_id": r, "releasedate": "2024-01-01", "editor_id": 1,
+                                   "pages": number * requests + r}).encode()
+                message = (f"POST /newspaper/{paper_id}/issue HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+            else:
+                message = f"GET /newspaper/{paper_id}/issue?limit=20 HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+            start = time.perf_counter()
+            writer.write(message)
+            head = await reader.readuntil(b"\r\n\r\n")
+            await reader.readexactly(int(re.search(rb"content-length: *(\d+)", head, re.IGNORECASE).group(1)))
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0])
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError, AttributeError) as error:
+        errors.append(error)
+
+
+def load(port: int, first: int, clients: int, papers: int, requests: int, results: multiprocessing.Queue):
+    # one process of clients, puts the latencies and errors of its clients into results
+    async def run():
+        latencies, errors = [], []
+        await asyncio.gather(*(client(port, first + c, papers, requests, latencies, errors) for c in range(clients)))
+        return latencies, errors
+    results.put(asyncio.run(run()))
+
+
+def measure(name: str, shards: int, args) -> str:
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    router = context.Process(target=serve_router, args=(ports, shards, args.workers))  # (not daemonic, it has children)
+    router.start()
+    port = ports.get(timeout=120)
+    populate(port, args.papers)
+    results = context.Queue()
+    per_loader = args.clients // args.loaders
+    loaders = [context.Process(target=load, args=(port, n * per_loader, per_loader, args.papers, args.requests, results))
+               for n in range(args.loaders)]
+    start = time.perf_counter()
+    for loader in loaders:
+        loader.start()
+    latencies, errors = [], []
+    for _ in loaders:
+        done, failed = results.get()
+        latencies += done
+        errors += failed
+    elapsed = time.perf_counter() - start  # (including the start of the client processes)
+    for loader in loaders:
+        loader.join()
+    router.terminate()
+    router.join()
+    if not latencies:
+        return f"{name:18} no request answered ({len(errors)} errors)"
+    latencies.sort()
+    percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    return (f"{name:18}{len(latencies) / elapsed:9.0f} req/s   p50 {percentile(0.5):7.1f} ms   "
+            f"p99 {percentile(0.99):7.1f} ms   ({len(errors)} errors)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sharded agency with different numbers of shards")
+    parser.add_argument("--shards", default="1,2,4", help="comma separated numbers of worker processes")
+    parser.add_argument("--papers", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--loaders", type=int, default=2, help="processes the clients are spread over")
+    parser.add_argument("--workers", type=int, default=8, help="request threads of every shard")
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} cores, {args.clients} clients x {args.requests} requests on {args.papers} newspapers")
+    print(measure("asgi (no router)", 0, args))
+    for shards in [int(shards) for shards in args.shards.split(",")]:
+        print(measure(f"{shards} shard{'s' if shards > 1 else ''}", shards, args))
+
+
+if __name__ == "__main__":
+    main()
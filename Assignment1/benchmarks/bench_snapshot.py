@@ -0,0 +1,90 @@
+# Cold start from a binary snapshot: 1M subscribers (one subscription each) and 10M deliveries, the state is built
+# directly (through the add_* methods that alone would take minutes), written with dump_snapshot and loaded again with
+# load_snapshot. The target for the load is TARGET seconds (on one core of a laptop), the benchmark fails above it.
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_snapshot [--subscribers 1000000] [--deliveries 10000000] [--papers 1000] [--dir /tmp]
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.snapshot import dump_snapshot, load_snapshot
+from src.model.subscriber import Subscriber
+
+TARGET = 15.0  # seconds for 1M subscribers and 10M deliveries
+
+
+def build_agency(subscribers: int, deliveries: int, papers: int) -> Agency:
+    # every subscriber has received all but the last released issue of the paper they subscribed to, and one special
+    # issue of the next paper (that's deliveries // subscribers deliveries each)
+    per_subscriber = max(deliveries // subscribers, 2)
+    agency = Agency()
+    for paper_id in range(papers):
+        paper = agency.add_newspaper(Newspaper(paper_id, f"Paper {paper_id}", 7, 1.5 + paper_id % 10))
+        agency.add_editor(Editor(paper_id, f"Editor {paper_id}", f"Office {paper_id % 20}"))
+        for issue_id in range(1, per_subscriber + 2):
+            agency.add_issue(paper, Issue(f"2024-{issue_id:04d}", issue_id, issue_id <= per_subscriber, paper_id, 24))
+    issues = [list(paper.issues) for paper in agency.newspapers]
+    for ID in range(subscribers):
+        paper = agency.newspapers.get(ID % papers)
+        other = (ID + 1) % papers
+        subscriber = Subscriber(ID, f"Reader {ID}", f"Street {ID % 5000}")
+        subscriber.newspaper_list.add(paper)
+        received = issues[paper.paper_id][:per_subscriber - 1] + [issues[other][0]]
+        subscriber.issues_list.load({issue.key(): issue for issue in received})
+        subscriber.missing = {paper.paper_id: {per_subscriber: None}}
+        subscriber.received = {paper.paper_id: per_subscriber - 1, other: 1}
+        subscriber.special_issues = {other: {1: None}}
+        subscriber.monthly_cost = paper.price
+        paper.subscribers.add(subscriber)
+        agency.subscribers.add(subscriber)
+    agency.subscriber_ids.claim_all(agency.subscribers.keys())
+    agency.subscriber_contents.update(Counter(subscriber.content_key() for subscriber in agency.subscribers))
+    return agency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading a binary snapshot")
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--deliveries", type=int, default=10_000_000)
+    parser.add_argument("--papers", type=int, default=1000)
+    parser.add_argument("--dir", default=None, help="directory for the snapshot file (default: a temporary directory)")
+    args = parser.parse_args()
+    directory = args.dir or tempfile.mkdtemp(prefix="paperback-bench-")
+    path = os.path.join(directory, "bench.snap")
+
+    start = time.perf_counter()
+    agency = build_agency(args.subscribers, args.deliveries, args.papers)
+    deliveries = sum(len(subscriber.issues_list) for subscriber in agency.subscribers)
+    print(f"built {len(agency.subscribers)} subscribers with {deliveries} deliveries in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    with open(path, "wb") as file:
+        dump_snapshot(agency, file)
+    print(f"snapshot written in {time.perf_counter() - start:8.1f} s  ({os.path.getsize(path) / 2**20:.0f} MiB)")
+    del agency
+    gc.collect()
+
+    start = time.perf_counter()
+    restored = Agency()
+    load_snapshot(restored, path)
+    elapsed = time.perf_counter() - start
+    assert sum(len(subscriber.issues_list) for subscriber in restored.subscribers) == deliveries
+    print(f"snapshot loaded in  {elapsed:8.1f} s  (target {TARGET:.0f} s for 1M subscribers and 10M deliveries)")
+    os.remove(path)
+    if args.dir is None:
+        os.rmdir(directory)
+    if args.subscribers >= 1_000_000 and args.deliveries >= 10_000_000 and elapsed > TARGET:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Compares the SQLite storage (SqliteAgency) with the in-memory Agency: adding subscribers, subscriptions and issues,
+# releasing and delivering the issues, and reading the missing issues and stats (set-based SQL on the SQLite side).
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_sqlite [--subscribers 20000] [--papers 20] [--issues 50] [--dir /tmp]
+import argparse
+import os
+import tempfile
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.sqlite_agency import SqliteAgency
+from src.model.subscriber import Subscriber
+
+
+def run(agency, subscribers: int, papers: int, issues: int):
+    timings = {}
+    start = time.perf_counter()
+    agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+    newspapers = [agency.add_newspaper(Newspaper(paper_id, f"Paper {paper_id}", 7, 1.5)) for paper_id in range(papers)]
+    readers = [agency.add_subscriber(Subscriber(ID, f"Reader {ID}", f"Street {ID}")) for ID in range(subscribers)]
+    for reader in readers:
+        agency.subscribe_to_paper(reader, newspapers[reader.ID % papers])
+    timings["add and subscribe"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for paper in newspapers:
+        for issue_id in range(issues):
+            issue = agency.add_issue(paper, Issue(f"day {issue_id}", issue_id, False, 1, 10))
+            agency.release_issue(issue)
+            if issue_id % 2:  # every other issue is delivered to all subscribers
+                agency.deliver_issue_to_subscribers(issue, paper)
+    timings["issues, release, deliver"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for reader in readers[::max(subscribers // 1000, 1)]:
+        agency.check_missingissues(agency.get_subscriber(reader.ID))
+        agency.get_subscriber_stats(agency.get_subscriber(reader.ID))
+    timings["1000 missing issues and stats"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for paper in newspapers:
+        agency.issue_stats(agency.get_newspaper(paper.paper_id))
+    timings["issue stats of every paper"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite storage against the in-memory agency")
+    parser.add_argument("--subscribers", type=int, default=20000)
+    parser.add_argument("--papers", type=int, default=20)
+    parser.add_argument("--issues", type=int, default=50)
+    parser.add_argument("--dir", default=None, help="directory for the database (default: a temporary directory)")
+    args = parser.parse_args()
+    directory = args.dir or tempfile.mkdtemp(prefix="paperback-bench-")
+    path = os.path.join(directory, "bench.sqlite3")
+
+    with create_app().app_context():
+        memory = run(Agency(), args.subscribers, args.papers, args.issues)
+        stored = SqliteAgency(path)
+        sqlite = run(stored, args.subscribers, args.papers, args.issues)
+        stored.close()
+    print(f"{'':32}{'memory':>10}{'sqlite':>10}")
+    for name in memory:
+        print(f"{name:32}{memory[name]:9.2f}s{sqlite[name]:9.2f}s")
+    print(f"database: {os.path.getsize(path) / 2**20:.1f} MiB")
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    if args.dir is None:
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Requests per second and latency of a GET heavy mix (GET /subscriber/<id>, /newspaper/<paper_id>/issue?limit=50,
+# /subscriber/<id>/missingissues and 1 in 20 requests delivering an issue with /deliver/bulk) sent by 1, 4, 16 and 64 threads at once,
+# straight to the WSGI app (no sockets), so the numbers show the app and the locking of the agency.
+# --exclusive makes the reading requests take the write lock too, to compare with a single lock.
+#
+# usage (from the Assignment1 folder): python -m benchmarks.bench_threads [--threads 1 4 16 64] [--seconds 3]
+import argparse
+import random
+import threading
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.editor import Editor
+from src.model.issue import Issue
+from src.model.newspaper import Newspaper
+from src.model.rwlock import ReadWriteLock
+from src.model.subscriber import Subscriber
+
+
+def populate(app, subscribers: int, issues: int):
+    agency = Agency.get_instance()
+    with app.app_context():
+        agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=2.5))
+        for ID in range(subscribers):
+            agency.subscribe_to_paper(agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address=f"Street {ID}")), paper)
+        for issue_id in range(issues):
+            agency.release_issue(agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1, pages=8)))
+
+
+def run(app, threads: int, seconds: float, subscribers: int, issues: int):
+    latencies = [[] for _ in range(threads)]
+    start_together = threading.Barrier(threads + 1)
+    stop = time.perf_counter() + seconds + 0.1
+
+    def worker(n):
+        client = app.test_client()
+        rng = random.Random(n)
+        start_together.wait()
+        while time.perf_counter() < stop:
+            subscriber_id = rng.randrange(subscribers)
+            kind = rng.randrange(20)
+            begin = time.perf_counter()
+            if kind == 0:
+                client.post(f"/newspaper/1/issue/{rng.randrange(issues)}/deliver/bulk", json={"IDs": [subscriber_id]})
+            elif kind < 8:
+                client.get(f"/subscriber/{subscriber_id}")
+            elif kind < 14:
+                client.get(f"/newspaper/1/issue?limit=50&fields=issue_id,released")
+            else:
+                client.get(f"/subscriber/{subscriber_id}/missingissues")
+            latencies[n].append(time.perf_counter() - begin)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    start_together.wait()
+    begin = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - begin
+    every = sorted(latency for per_thread in latencies for latency in per_thread)
+    return len(every) / elapsed, every[len(every) // 2], every[int(len(every) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app with several threads")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--exclusive", action="store_true", help="readers take the write lock as well")
+    args = parser.parse_args()
+    if args.exclusive:
+        ReadWriteLock.acquire_read, ReadWriteLock.release_read = ReadWriteLock.acquire_write, ReadWriteLock.release_write
+    app = create_app()
+    populate(app, args.subscribers, args.issues)
+    for threads in args.threads:
+        throughput, median, p99 = run(app, threads, args.seconds, args.subscribers, args.issues)
+        print(f"{threads:3} threads: {throughput:8.0f} requests/s   median {median * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Write throughput of the agency with a write-ahead log under each fsync policy (1 and 16 threads adding subscribers,
+# the group commit lets the threads share the fsyncs), and the recovery time for a log of 10M records: replaying the
+# whole log, and loading a snapshot of the same state.
+#
+# usage (from the Assignment1 folder):
+#   python -m benchmarks.bench_wal [--writes 2000] [--records 10000000] [--dir /tmp/paperback-bench]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from src.app import create_app
+from src.model.agency import Agency
+from src.model.persistence import Persistence
+from src.model.subscriber import Subscriber
+from src.model.wal import FSYNC_POLICIES
+
+
+def write_throughput(directory: str, fsync: str, threads: int, writes: int) -> float:
+    agency = Agency()
+    persistence = Persistence(directory, fsync=fsync)
+    persistence.open(agency)
+
+    def worker(first):
+        for ID in range(first, first + writes // threads):
+            agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address="Street"))  # returns once committed
+
+    pool = [threading.Thread(target=worker, args=(n * writes,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    persistence.close()
+    return writes // threads * threads / elapsed
+
+
+def write_log(path: str, records: int, papers: int = 100, issues: int = 20):
+    # a valid log: editors, newspapers with released issues, subscribers with one subscription each,
+    # and deliveries of the issues of their paper for the rest of the records
+    subscribers = records // (2 + issues - 2)
+    written = 0
+    with open(path, "w") as file:
+        def record(*values):
+            nonlocal written
+            file.write(json.dumps(values, separators=(",", ":")) + "\n")
+            written += 1
+
+        record("add_editor", 1, "Editor", "Office")
+        for paper_id in range(papers):
+            record("add_newspaper", paper_id, f"Paper {paper_id}", 1, 2.5)
+            for issue_id in range(issues):
+                record("add_issue", paper_id, issue_id, f"day {issue_id}", False, 1, 8, paper_id)
+                record("release_issue", paper_id, issue_id)
+        for ID in range(subscribers):
+            record("add_subscriber", ID, f"Reader {ID}", f"Street {ID}")
+            record("subscribe_to_paper", ID, ID % papers)
+        issue_id = 0
+        while written < records:
+            for ID in range(subscribers):
+                if written == records:
+                    break
+                record("deliver_issue", ID, ID % papers, issue_id)
+            issue_id += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the write-ahead log")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--records", type=int, default=10_000_000)
+    parser.add_argument("--dir", default=None, help="directory for the data (default: a temporary directory)")
+    args = parser.parse_args()
+    base = args.dir or tempfile.mkdtemp(prefix="paperback-bench-")
+    app = create_app()
+    with app.app_context():
+        for fsync in FSYNC_POLICIES:
+            for threads in [1, 16]:
+                directory = os.path.join(base, f"writes-{fsync}-{threads}")
+                shutil.rmtree(directory, ignore_errors=True)
+                print(f"fsync={fsync:8} {threads:2} threads: {write_throughput(directory, fsync, threads, args.writes):8.0f} writes/s")
+
+        directory = os.path.join(base, "recovery")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        start = time.perf_counter()
+        records = write_log(os.path.join(directory, f"log-{0:020d}.wal"), args.records)
+        print(f"wrote a log of {records} records ({os.path.getsize(os.path.join(directory, f'log-{0:020d}.wal')) / 2**20:.0f} MiB) "
+              f"in {time.perf_counter() - start:.0f} s")
+
+        start = time.perf_counter()
+        agency = Agency()
+        persistence = Persistence(directory, fsync="never")
+        persistence.open(agency)
+        print(f"recovery from the log:      {time.perf_counter() - start:8.1f} s  ({persistence.records} records)")
+        start = time.perf_counter()
+        persistence.snapshot()
+        snapshot = [name for name in os.listdir(directory) if name.startswith("snapshot-")][0]
+        print(f"snapshot taken in           {time.perf_counter() - start:8.1f} s  "
+              f"({os.path.getsize(os.path.join(directory, snapshot)) / 2**20:.0f} MiB)")
+        persistence.close()
+        del agency, persistence
+
+        start = time.perf_counter()
+        Persistence(directory, fsync="never").open(Agency())
+        print(f"recovery from the snapshot: {time.perf_counter() - start:8.1f} s")
+    if args.dir is None:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import json
+from typing import List
+
+from flask import Response, request, stream_with_context
+from flask_restx import abort, marshal
+
+from .projection import project
+from .serializers import encoder
+
+BATCH_SIZE = 1000  # records serialized into one chunk of the response
+
+
+# the records are serialized while the response is sent, instead of building the whole list and JSON string first
+# format=ndjson (default): one JSON object per line
+# format=json: the same document as the list endpoint (e.g. {"newspapers": [...]}), sent in chunks
+# fields=...: only these attributes, like on the list endpoint
+# objects is a list like Agency.all_newspapers() (only references), so changes during the export don't break it
+def export_rows(objects: List, model, envelope: str):
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "json"):
+        abort(400, f"Unknown format {export_format}, use ndjson or json")
+    model = project(model, request.args.get("fields"))
+    write = encoder(model) or (lambda obj: json.dumps(marshal(obj, model)))  # the same text either way
+
+    def generate():
+        if export_format == "json":
+            yield f"{{{json.dumps(envelope)}: ["
+        separator = ", " if export_format == "json" else "\n"
+        for start in range(0, len(objects), BATCH_SIZE):
+            chunk = separator.join(map(write, objects[start:start + BATCH_SIZE]))
+            if export_format == "json":
+                yield (", " if start else "") + chunk
+            else:
+                yield chunk + "\n"
+        if export_format == "json":
+            yield "]}\n"
+
+    mimetype = "application/json" if export_format == "json" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,134 @@
+import codecs
+import json
+from typing import Callable, Iterator, Optional, Tuple
+
+from flask import jsonify, request
+from jsonschema import Draft4Validator
+
+from ..model.agency import Agency
+from ..model.ids import IdAllocator
+
+BATCH_SIZE = 1000  # objects handed to the agency at once
+CHUNK_SIZE = 64 * 1024  # bytes read from the upload at once
+MAX_ROW_SIZE = 1024 * 1024  # a single row can't be bigger, so a broken upload can't fill the memory
+MAX_REPORTED_ERRORS = 1000  # only the first errors are listed, the rest are just counted
+
+
+# the upload is read row by row, so the memory use doesn't depend on the size of the upload
+# NDJSON (one JSON object per line) by default, a JSON array if the upload is sent as application/json
+def read_rows(stream, json_array: bool) -> Iterator[Tuple[int, object]]:
+    # yields (row number, row), the row is a ValueError if it couldn't be parsed
+    if json_array:
+        yield from _read_array(stream)
+        return
+    for number, line in enumerate(_read_lines(stream), start=1):  # the row number is the line number
+        if line is None:
+            yield number, ValueError(f"Row is longer than {MAX_ROW_SIZE} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, ValueError(f"Invalid JSON: {error}")
+
+
+def _read_lines(stream) -> Iterator[Optional[str]]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        buffer += decoder.decode(chunk, final=not chunk)
+        *lines, buffer = buffer.split("\n")
+        yield from lines
+        if not chunk:
+            break
+        if len(buffer) > MAX_ROW_SIZE:
+            # the line is reported as None and the rest of it is skipped without keeping it
+            yield None
+            chunk = b""
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                if b"\n" in chunk:
+                    break
+            decoder.reset()
+            buffer = decoder.decode(chunk[chunk.index(b"\n") + 1:]) if b"\n" in chunk else ""
+    if buffer:
+        yield buffer
+
+
+def _read_array(stream) -> Iterator[Tuple[int, object]]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = json.JSONDecoder()
+    buffer, position, number, started, eof = "", 0, 0, False, False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    yield 1, ValueError("Invalid JSON: expected an array")
+                    return
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                row, position = parser.raw_decode(buffer, position)
+            except ValueError as error:
+                # either the row isn't complete yet or it is broken, in which case the import stops here
+                # (the rows of an array can't be told apart anymore after a broken row)
+                if eof or len(buffer) - position > MAX_ROW_SIZE:
+                    yield number + 1, ValueError(f"Invalid JSON: {error}")
+                    return
+            else:
+                number += 1
+                yield number, row
+                continue
+        elif eof:
+            yield number + 1, ValueError("Invalid JSON: the array isn't closed" if started else "Invalid JSON: expected an array")
+            return
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + decoder.decode(chunk, final=eof)
+        position = 0
+
+
+def import_rows(model, create: Callable[[dict, int], object], ids: IdAllocator, id_field: str, add: Callable):
+    # validates the uploaded rows against the model, creates the objects with create(row, ID) and adds them in
+    # batches with add (e.g. Agency.add_newspaper), a failing row is reported and doesn't stop the import
+    validator = Draft4Validator(model.__schema__)
+    report = {"imported": 0, "failed": 0, "errors": []}
+
+    def failed(number, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": number, "error": message})
+
+    def flush(batch):
+        errors = Agency.get_instance().add_batch(add, [obj for _, obj in batch])
+        for position, message in errors.items():
+            number, obj = batch[position]
+            ids.release(getattr(obj, id_field))  # the ID is free again
+            failed(number, message)
+        report["imported"] += len(batch) - len(errors)
+
+    batch = []
+    for number, row in read_rows(request.stream, request.mimetype == "application/json"):
+        if isinstance(row, ValueError):
+            failed(number, str(row))
+            continue
+        if not isinstance(row, dict):
+            failed(number, "Input payload validation failed: expected an object")
+            continue
+        errors = dict(model.format_error(error) for error in validator.iter_errors(row))
+        if errors:
+            failed(number, f"Input payload validation failed: {errors}")
+            continue
+        batch.append((number, create(row, ids.allocate(row.get(id_field, 1)))))
+        if len(batch) == BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return jsonify(report)
@@ -4,8 +4,13 @@ from flask_restx import Namespace, reqparse, Resource, fields, abort
 from ..model.agency import Agency
 from ..model.editor import Editor
 from .newspaperNS import issue_model
+from .bulk_import import import_rows
+from .bulk_export import export_rows
+from .etags import versioned, versions
+from .pagination import paginate, is_issue_key, PAGE_PARAMS
+from .projection import ProjectionNamespace
 
-editor_ns = Namespace("editor", description="Editor related operations")
+editor_ns = ProjectionNamespace("editor", description="Editor related operations")
 
 
 editor_model = editor_ns.model('EditorModel', {
@@ -24,27 +29,44 @@ class EditorAPI(Resource):
     @editor_ns.expect(editor_model, validate=True)
     @editor_ns.marshal_with(editor_model, envelope='editor')
     def post(self):
-        # create a unique ID (optional: customised ID if not yet existing)
-        editor_id = editor_ns.payload['ID']
-        IDs = [x.ID for x in Agency.get_instance().editors]
-        while True:
-            if editor_id not in IDs:
-                break
-            editor_id += 1
-        # create a new editor object and add it
-        new_editor = Editor(ID=editor_id,
-                            name=editor_ns.payload['name'],
-                            address=editor_ns.payload['address'])
-        return Agency.get_instance().add_editor(new_editor)
-
-    @editor_ns.doc(description="List all editors")
+        # create a unique ID (optional: customised ID if not yet existing), it is given back if adding the editor fails
+        with Agency.get_instance().editor_ids.reserve(editor_ns.payload['ID']) as editor_id:
+            # create a new editor object and add it
+            new_editor = Editor(ID=editor_id,
+                                name=editor_ns.payload['name'],
+                                address=editor_ns.payload['address'])
+            return Agency.get_instance().add_editor(new_editor)
+
+    @versioned(lambda: versions(Agency.get_instance().editors))
+    @editor_ns.doc(description="List all editors (or a page of them, in ID order)", params=PAGE_PARAMS)
     @editor_ns.marshal_list_with(editor_model, envelope='editor')
     def get(self):
-        return Agency.get_instance().all_editors()
+        return paginate(Agency.get_instance().editors, Agency.get_instance().all_editors)
+
+
+@editor_ns.route('/import')
+class EditorImport(Resource):
+    lock_whole_request = False  # import_rows locks the agency per batch
+
+    @editor_ns.doc(description="Add many editors, streamed as NDJSON (one editor per line) or as a JSON array")
+    def post(self):
+        def create(row, editor_id):
+            return Editor(ID=editor_id, name=row['name'], address=row['address'])
+        agency = Agency.get_instance()
+        return import_rows(editor_model, create, agency.editor_ids, 'ID', agency.add_editor)
+
+
+@editor_ns.route('/export')
+class EditorExport(Resource):
+    @versioned(lambda: versions(Agency.get_instance().editors))
+    @editor_ns.doc(description="Stream all editors", params={'format': 'ndjson (default, one editor per line) or json (chunked, like the list endpoint)'})
+    def get(self):
+        return export_rows(Agency.get_instance().all_editors(), editor_model, 'editor')
 
 
 @editor_ns.route('/<int:editor_id>')
 class EditorID(Resource):
+    @versioned(lambda editor_id: versions(Agency.get_instance().get_editor(editor_id)))
     @editor_ns.doc(description="Get an editors information")
     @editor_ns.marshal_with(editor_model, envelope='editor')
     def get(self, editor_id):
@@ -74,11 +96,14 @@ class EditorID(Resource):
 
 @editor_ns.route('/<int:editor_id>/issues')
 class EditorIssues(Resource):
-    @editor_ns.doc(description="Get newspaper issues that a editor is responsible for")
+    @versioned(lambda editor_id: versions(getattr(Agency.get_instance().get_editor(editor_id), 'issues_list', None)))
+    @editor_ns.doc(description="Get newspaper issues that a editor is responsible for (or a page of them, ordered by newspaper and issue ID)",
+                   params=PAGE_PARAMS)
     @editor_ns.marshal_list_with(issue_model, envelope='editor')
     def get(self, editor_id):
         targeted_editor = Agency.get_instance().get_editor(editor_id)
         if not targeted_editor:
             abort(404, f"Editor with ID {editor_id} was not found")
-        issues = Agency.get_instance().get_editor_issues(targeted_editor)
+        issues = paginate(targeted_editor.issues_list, lambda: Agency.get_instance().get_editor_issues(targeted_editor),
+                          is_issue_key)
         return issues
@@ -0,0 +1,61 @@
+import secrets
+from functools import wraps
+from typing import Callable, Optional, Tuple
+from zlib import crc32
+
+from flask import current_app, request
+from flask_restx.utils import unpack
+from werkzeug.wrappers import Response
+
+
+def versions(*objects) -> Optional[Tuple[int, ...]]:
+    # the versions of the objects or collections (see Agency), None if one of them doesn't exist
+    if any(obj is None for obj in objects):
+        return None
+    return tuple(obj.version for obj in objects)
+
+
+# the versions start again at 1 when the app is restarted (and the data is loaded from the data directory),
+# so the ETags of this process are told apart from those of an earlier one
+_PROCESS = secrets.token_hex(4)
+
+
+def make_etag(current: Tuple[int, ...]) -> str:
+    # the versions the response is built from, plus a checksum of the query string and the X-Fields mask if there are any,
+    # so every page, projection and format of a resource has its own ETag (not quoted)
+    tag = _PROCESS + "." + ".".join(map(str, current))
+    variant = request.query_string + request.headers.get(current_app.config["RESTX_MASK_HEADER"], "").encode()
+    if variant:
+        tag += f"-{crc32(variant):08x}"
+    return tag
+
+
+# for GET endpoints: answers 304 Not Modified if the client already has the current version (If-None-Match),
+# without calling the endpoint (so nothing is looked up or serialized), otherwise adds the ETag to the response
+# get_versions is called with the arguments of the route and returns versions(...) of everything the response shows
+# (None if there is nothing, the endpoint answers that itself, e.g. with a 404)
+# has to be the outermost decorator, so it sees the marshalled response
+def versioned(get_versions: Callable[..., Optional[Tuple[int, ...]]]):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            current = get_versions(**kwargs)
+            if current is None:
+                return func(*args, **kwargs)
+            etag = make_etag(current)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+            result = func(*args, **kwargs)
+            if isinstance(result, Response):
+                result.set_etag(etag)
+                return result
+            data, code, headers = unpack(result)
+            headers = dict(headers or {})
+            headers["ETag"] = f'"{etag}"'
+            return data, code, headers
+
+        return wrapper
+
+    return decorator
@@ -2,10 +2,35 @@ from flask import jsonify
 from flask_restx import Namespace, reqparse, Resource, fields, abort
 
 from ..model.agency import Agency
+from .bulk_import import import_rows
+from .bulk_export import export_rows
+from .etags import versioned, versions
+from .response_cache import cached
+from .pagination import paginate, PAGE_PARAMS
+from .projection import ProjectionNamespace
 from ..model.newspaper import Newspaper
 from ..model.issue import Issue
 
-newspaper_ns = Namespace("newspaper", description="Newspaper related operations")
+
+def _paper(paper_id):
+    return Agency.get_instance().get_newspaper(paper_id)
+
+
+def _issue(paper_id, issue_id):
+    paper = _paper(paper_id)
+    return paper.issues.get(issue_id) if paper else None
+
+
+def _stats_versions(paper_id):
+    # the stats show the name and price of the paper, the number of its subscribers and the issue stats. the number of
+    # undelivered issues only goes up with a new version of the issues or subscribers (a release or a subscription),
+    # so with the same versions a different count is always a later state
+    paper = _paper(paper_id)
+    if paper is None:
+        return None
+    return versions(paper, paper.subscribers, paper.issues) + (Agency.get_instance().undelivered_count(paper),)
+
+newspaper_ns = ProjectionNamespace("newspaper", description="Newspaper related operations")
 
 paper_model = newspaper_ns.model('NewspaperModel', {
     'paper_id': fields.Integer(required=False,
@@ -36,6 +61,11 @@ ID_model = newspaper_ns.model('IDModel', {
                          help='The unique identifier')
 })
 
+IDs_model = newspaper_ns.model('IDListModel', {
+    'IDs': fields.List(fields.Integer, required=False,
+                       help='The unique identifiers (all subscribers of the newspaper if left out)')
+})
+
 
 @newspaper_ns.route('/')
 class NewspaperAPI(Resource):
@@ -44,28 +74,45 @@ class NewspaperAPI(Resource):
     @newspaper_ns.expect(paper_model, validate=True)
     @newspaper_ns.marshal_with(paper_model, envelope='newspaper')
     def post(self):
-        # creating a unique ID (optional: customised if not jet existing)
-        paper_id = newspaper_ns.payload['paper_id']
-        IDs = [x.paper_id for x in Agency.get_instance().newspapers]
-        while True:
-            if paper_id not in IDs:
-                break
-            paper_id += 1
-        # create a new paper object and add it
-        new_paper = Newspaper(paper_id=paper_id,
-                              name=newspaper_ns.payload['name'],
-                              frequency=newspaper_ns.payload['frequency'],
-                              price=newspaper_ns.payload['price'])
-        return Agency.get_instance().add_newspaper(new_paper)
-
-    @newspaper_ns.doc(description="Get all newspapers")
+        # creating a unique ID (optional: customised if not jet existing), it is given back if adding the paper fails
+        with Agency.get_instance().newspaper_ids.reserve(newspaper_ns.payload['paper_id']) as paper_id:
+            # create a new paper object and add it
+            new_paper = Newspaper(paper_id=paper_id,
+                                  name=newspaper_ns.payload['name'],
+                                  frequency=newspaper_ns.payload['frequency'],
+                                  price=newspaper_ns.payload['price'])
+            return Agency.get_instance().add_newspaper(new_paper)
+
+    @versioned(lambda: versions(Agency.get_instance().newspapers))
+    @newspaper_ns.doc(description="Get all newspapers (or a page of them, in ID order)", params=PAGE_PARAMS)
     @newspaper_ns.marshal_list_with(paper_model, envelope='newspapers')
     def get(self):
-        return Agency.get_instance().all_newspapers()
+        return paginate(Agency.get_instance().newspapers, Agency.get_instance().all_newspapers)
+
+
+@newspaper_ns.route('/import')
+class NewspaperImport(Resource):
+    lock_whole_request = False  # import_rows locks the agency per batch
+
+    @newspaper_ns.doc(description="Add many newspapers, streamed as NDJSON (one newspaper per line) or as a JSON array")
+    def post(self):
+        def create(row, paper_id):
+            return Newspaper(paper_id=paper_id, name=row['name'], frequency=row['frequency'], price=row['price'])
+        agency = Agency.get_instance()
+        return import_rows(paper_model, create, agency.newspaper_ids, 'paper_id', agency.add_newspaper)
+
+
+@newspaper_ns.route('/export')
+class NewspaperExport(Resource):
+    @versioned(lambda: versions(Agency.get_instance().newspapers))
+    @newspaper_ns.doc(description="Stream all newspapers", params={'format': 'ndjson (default, one newspaper per line) or json (chunked, like the list endpoint)'})
+    def get(self):
+        return export_rows(Agency.get_instance().all_newspapers(), paper_model, 'newspapers')
 
 
 @newspaper_ns.route('/<int:paper_id>')
 class NewspaperID(Resource):
+    @versioned(lambda paper_id: versions(_paper(paper_id)))
     @newspaper_ns.doc(description="Get a new newspaper")
     @newspaper_ns.marshal_with(paper_model, envelope='newspaper')
     def get(self, paper_id):
@@ -96,13 +143,14 @@ class NewspaperID(Resource):
 
 @newspaper_ns.route('/<int:paper_id>/issue')
 class NewspaperIssue(Resource):
-    @newspaper_ns.doc(description="Get all paper issues")
+    @versioned(lambda paper_id: versions(getattr(_paper(paper_id), 'issues', None)))
+    @newspaper_ns.doc(description="Get all paper issues (or a page of them, in ID order)", params=PAGE_PARAMS)
     @newspaper_ns.marshal_list_with(issue_model, envelope='issues')
     def get(self, paper_id):
         targeted_paper = Agency.get_instance().get_newspaper(paper_id)
         if not targeted_paper:
             abort(404, f"Newspaper with ID {paper_id} was not found")
-        return Agency.get_instance().all_issues(targeted_paper)
+        return paginate(targeted_paper.issues, lambda: Agency.get_instance().all_issues(targeted_paper))
 
     @newspaper_ns.doc(description="Create a new paper issue")
     @newspaper_ns.expect(issue_model, validate=True)
@@ -112,26 +160,58 @@ class NewspaperIssue(Resource):
         if not targeted_paper:
             abort(404, f"Newspaper with ID {paper_id} was not found")
 
-        # creating a unique ID (optional: customised if not jet existing)
-        issue_id = newspaper_ns.payload['issue_id']
-        IDs = [x.issue_id for x in targeted_paper.issues]
-        while True:
-            if issue_id not in IDs:
-                break
-            issue_id += 1
+        # creating a unique ID (optional: customised if not jet existing), it is given back if adding the issue fails
+        with targeted_paper.issue_ids.reserve(newspaper_ns.payload['issue_id']) as issue_id:
+            # create a new issue object and add it
+            new_issue = Issue(issue_id=issue_id,
+                              releasedate=newspaper_ns.payload['releasedate'],
+                              released=False,  # Initially, paper issues are not published
+                              editor_id=newspaper_ns.payload['editor_id'],
+                              pages=newspaper_ns.payload['pages'],
+                              newspaper_id=paper_id)
+            return Agency.get_instance().add_issue(targeted_paper, new_issue)
+
+
+@newspaper_ns.route('/<int:paper_id>/issue/import')
+class NewspaperIssueImport(Resource):
+    lock_whole_request = False  # import_rows locks the agency per batch
+
+    @newspaper_ns.doc(description="Add many paper issues, streamed as NDJSON (one issue per line) or as a JSON array")
+    def post(self, paper_id):
+        targeted_paper = Agency.get_instance().get_newspaper(paper_id)
+        if not targeted_paper:
+            abort(404, f"Newspaper with ID {paper_id} was not found")
+
+        def create(row, issue_id):
+            return Issue(issue_id=issue_id,
+                         releasedate=row['releasedate'],
+                         released=False,  # Initially, paper issues are not published
+                         editor_id=row['editor_id'],
+                         pages=row['pages'],
+                         newspaper_id=paper_id)
+
+        def add(new_issue):
+            # the batches run under the lock of the agency, but the paper could be removed between two batches
+            if Agency.get_instance().get_newspaper(paper_id) is not targeted_paper:
+                raise ValueError(f"Newspaper with ID {paper_id} was removed")
+            return Agency.get_instance().add_issue(targeted_paper, new_issue)
+        return import_rows(issue_model, create, targeted_paper.issue_ids, 'issue_id', add)
 
-        # create a new issue object and add it
-        new_issue = Issue(issue_id=issue_id,
-                          releasedate=newspaper_ns.payload['releasedate'],
-                          released=False,  # Initially, paper issues are not published
-                          editor_id=newspaper_ns.payload['editor_id'],
-                          pages=newspaper_ns.payload['pages'],
-                          newspaper_id=paper_id)
-        return Agency.get_instance().add_issue(targeted_paper, new_issue)
+
+@newspaper_ns.route('/<int:paper_id>/issue/export')
+class NewspaperIssueExport(Resource):
+    @versioned(lambda paper_id: versions(getattr(_paper(paper_id), 'issues', None)))
+    @newspaper_ns.doc(description="Stream all paper issues", params={'format': 'ndjson (default, one issue per line) or json (chunked, like the list endpoint)'})
+    def get(self, paper_id):
+        targeted_paper = Agency.get_instance().get_newspaper(paper_id)
+        if not targeted_paper:
+            abort(404, f"Newspaper with ID {paper_id} was not found")
+        return export_rows(Agency.get_instance().all_issues(targeted_paper), issue_model, 'issues')
 
 
 @newspaper_ns.route("/<int:paper_id>/issue/<int:issue_id>")
 class NewspaperIssueID(Resource):
+    @versioned(lambda paper_id, issue_id: versions(_issue(paper_id, issue_id)))
     @newspaper_ns.doc(description="Get information of a specific paper issue")
     @newspaper_ns.marshal_with(issue_model, envelope='issue')
     def get(self, paper_id, issue_id):
@@ -228,8 +308,26 @@ class NewspaperIssueIDDeliver(Resource):
         return deliver
 
 
+@newspaper_ns.route("/<int:paper_id>/issue/<int:issue_id>/deliver/bulk")
+class NewspaperIssueIDDeliverBulk(Resource):
+    @newspaper_ns.doc(description="Deliver an issue to all subscribers of the newspaper (or to the given subscribers)")
+    @newspaper_ns.expect(IDs_model, validate=True)
+    def post(self, paper_id, issue_id):
+        targeted_paper = Agency.get_instance().get_newspaper(paper_id)
+        if not targeted_paper:
+            abort(404, f"Newspaper with ID {paper_id} was not found")
+        issue = Agency.get_instance().get_issue(targeted_paper, issue_id)
+        if not issue:
+            abort(404, f"Issue with ID {issue_id} was not found")
+        subscriber_ids = newspaper_ns.payload.get('IDs')
+        deliver = Agency.get_instance().deliver_issue_to_subscribers(issue, targeted_paper, subscriber_ids)
+        return deliver
+
+
 @newspaper_ns.route('/<int:paper_id>/stats')
 class NewspaperStatsID(Resource):
+    @versioned(_stats_versions)
+    @cached(_stats_versions)
     @newspaper_ns.doc(description="Get information of a specific newspaper")
     def get(self, paper_id):
         targeted_paper = Agency.get_instance().get_newspaper(paper_id)
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from typing import Callable, List
+
+from flask import current_app, request
+from flask_restx import abort
+
+from ..model.collection import Collection
+
+PAGE_PARAMS = {'limit': 'The number of objects per page (at most MAX_PAGE_SIZE)',
+               'cursor': 'The X-Next-Cursor header of the previous page'}
+
+
+# the cursor is the (encoded) key of the last object of a page, the next page starts after it
+# (so objects added or removed in the meantime don't shift the pages)
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, is_key: Callable[[object], bool]):
+    # is_key checks that the key fits the keys of the collection (a key of another type can't be compared with them)
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        abort(400, "Invalid cursor")
+    key = tuple(key) if isinstance(key, list) else key  # issue keys are (newspaper_id, issue_id) tuples
+    if not is_key(key):
+        abort(400, "Invalid cursor")
+    return key
+
+
+# the keys of the paged lists: IDs (of newspapers, editors, subscribers and of the issues of a newspaper) and the
+# Issue.key() of the issues of an editor
+def is_id(key) -> bool:
+    return type(key) is int  # (JSON true and false are bools)
+
+
+def is_issue_key(key) -> bool:
+    return type(key) is tuple and len(key) == 2 and all(map(is_id, key))
+
+
+def paginate(collection: Collection, everything: Callable[[], List], is_key: Callable[[object], bool] = is_id):
+    # without limit and cursor the list endpoints still return everything (everything() is e.g. Agency.all_newspapers)
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return everything()
+    max_page_size = current_app.config["MAX_PAGE_SIZE"]
+    try:
+        limit = min(int(request.args.get('limit', max_page_size)), max_page_size)
+    except ValueError:
+        abort(400, "limit has to be a number")
+    if limit < 1:
+        abort(400, "limit has to be at least 1")
+    cursor = request.args.get('cursor')
+    objects, next_key = collection.page(decode_cursor(cursor, is_key) if cursor else None, limit)
+    headers = {'X-Next-Cursor': encode_cursor(next_key)} if next_key is not None else {}
+    return objects, 200, headers
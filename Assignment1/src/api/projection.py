@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from functools import wraps
+from http import HTTPStatus
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from flask import request
+from flask_restx import Namespace, abort, marshal
+from flask_restx.utils import merge, unpack
+
+from .serializers import compiled_output, encode
+
+FIELDS_PARAM = {'fields': {'description': 'Only these attributes, comma separated (e.g. ID,name)', 'in': 'query', 'type': 'string'}}
+
+# (model name, requested attributes) -> the model restricted to these attributes
+# only valid attributes get here, so there are at most 2^(number of attributes) projections per model
+_projections: Dict[Tuple[str, FrozenSet[str]], OrderedDict] = {}
+
+
+def project(model, names: Optional[str]):
+    # the model restricted to the comma separated attributes in names (the whole model if names is empty)
+    if not names:
+        return model
+    requested = frozenset(name.strip() for name in names.split(",") if name.strip())
+    projection = _projections.get((model.name, requested))
+    if projection is None:
+        unknown = requested.difference(model)
+        if unknown:
+            abort(400, f"Unknown fields: {', '.join(sorted(unknown))}, use {', '.join(model)}")
+        projection = OrderedDict((name, field) for name, field in model.items() if name in requested)
+        _projections[(model.name, requested)] = projection
+    return projection
+
+
+# a namespace whose GET endpoints accept ?fields=..., so only the requested attributes are marshalled
+# (without the parameter the endpoints marshal the whole model, like Namespace.marshal_with)
+# the responses are written by the compiled encoders of the models (see serializers.py) whenever they give the same output
+class ProjectionNamespace(Namespace):
+    def marshal_with(self, fields, as_list=False, code=HTTPStatus.OK, description=None, **kwargs):
+        marshal_documented = super().marshal_with(fields, as_list, code, description, **kwargs)
+        envelope, skip_none = kwargs.get("envelope"), kwargs.get("skip_none", False)
+
+        def wrapper(func):
+            marshalled = marshal_documented(func)
+            projecting = func.__name__ == "get"
+
+            @wraps(marshalled)
+            def serialized(*args, **kwargs_):
+                names = request.args.get("fields") if projecting else None
+                compiled = compiled_output() and not skip_none
+                if not names and not compiled:
+                    return marshalled(*args, **kwargs_)
+                data, code_, headers = unpack(func(*args, **kwargs_))
+                model = project(fields, names)
+                encoded = encode(data, model, envelope) if compiled else None
+                if encoded is not None:
+                    return encoded, code_, headers
+                return marshal(data, model, envelope, skip_none, ordered=self.ordered), code_, headers
+
+            if projecting:
+                serialized.__apidoc__ = merge(serialized.__apidoc__, {"params": FIELDS_PARAM})
+            return serialized
+
+        return wrapper
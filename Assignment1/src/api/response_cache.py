@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from flask import current_app
+from werkzeug.wrappers import Response
+
+
+# the bodies of expensive responses (the stats), with the versions (see Agency) of everything they were built from
+# an entry is only used while these versions are still current, so every agency change that affects a response
+# (a subscription, delivery, release, price update or deletion) invalidates exactly the entries built from the changed
+# objects, and a stale answer is never served. the least recently used entries are dropped when the cache is full
+class ResponseCache(object):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()  # key -> (versions, body)
+        self._lock = Lock()  # the requests of a threaded server share the cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, current: Tuple[int, ...]) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == current:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, current: Tuple[int, ...], body: bytes):
+        with self._lock:
+            self._entries[key] = (current, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self._entries), "maxsize": self.maxsize}
+
+
+# for GET endpoints that return a JSON Response: answers from the response cache of the app (see create_app) while
+# the versions returned by get_versions (called like for versioned) haven't changed, X-Cache tells HIT or MISS
+def cached(get_versions: Callable[..., Optional[Tuple[int, ...]]]):
+    def decorator(func):
+        name = func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache: Optional[ResponseCache] = current_app.extensions.get("response_cache")
+            current = get_versions(**kwargs) if cache is not None else None
+            if current is None:
+                return func(*args, **kwargs)
+            key = (name, tuple(kwargs.items()))
+            body = cache.get(key, current)  # the versions are read before the response is built, so a change in
+            if body is not None:             # between makes the entry outdated instead of wrong
+                response = current_app.response_class(body, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                return response
+            response = func(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                cache.put(key, current, response.get_data())
+                response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,98 @@
+from json import encoder as json_encoder
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, make_response, request
+from flask_restx import fields
+from flask_restx.inputs import boolean
+from flask_restx.representations import output_json as restx_output_json
+
+
+# the JSON text of a marshalled response, produced by a compiled encoder instead of marshal() and json.dumps()
+class EncodedJSON(str):
+    __slots__ = ()
+
+
+def output_json(data, code, headers=None):
+    # the application/json representation of the api (registered in create_app), like flask_restx's output_json
+    if isinstance(data, EncodedJSON):
+        resp = make_response(data + "\n", code)
+        resp.headers.extend(headers or {})
+        return resp
+    return restx_output_json(data, code, headers)
+
+
+# the values formatted like the flask_restx fields do, then written like json.dumps does
+def _int(value) -> str:
+    return int.__repr__(int(value))
+
+
+def _float(value) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _str(value) -> str:
+    return json_encoder.encode_basestring_ascii(str(value))
+
+
+def _bool(value) -> str:
+    return "true" if (value if value.__class__ is bool else boolean(value)) else "false"
+
+
+_FORMATS = {fields.Integer: "_int", fields.Float: "_float", fields.String: "_str", fields.Boolean: "_bool"}
+
+# id(model fields) -> (model fields, encoder or None), the fields are kept so their id can't be reused
+_encoders: Dict[int, Tuple[dict, Optional[Callable]]] = {}
+
+
+def compile_encoder(model) -> Optional[Callable]:
+    # generates a function that writes one object as the JSON text of marshal(obj, model)
+    # (None if the model has fields that aren't simple values, those are left to marshal())
+    names = list(model)
+    for field in model.values():
+        if type(field) not in _FORMATS or field.attribute is not None or field.default is not None:
+            return None
+    lines = ["def encode(obj):",
+             "    if obj is None:",
+             f"        return {'{' + ', '.join(_str(name) + ': null' for name in names) + '}'!r}"]
+    lines += [f"    v{i} = obj.{name}" for i, name in enumerate(names)]
+    parts = [f"{('{' if i == 0 else ', ') + _str(name) + ': '!r} + ('null' if v{i} is None else {_FORMATS[type(field)]}(v{i}))"
+             for i, (name, field) in enumerate(model.items())]
+    lines.append("    return " + " + ".join(parts or ["'{'"]) + " + '}'")
+    namespace = {"_int": _int, "_float": _float, "_str": _str, "_bool": _bool}
+    exec("\n".join(lines), namespace)
+    return namespace["encode"]
+
+
+def encoder(model) -> Optional[Callable]:
+    cached = _encoders.get(id(model))
+    if cached is None:
+        cached = _encoders[id(model)] = (model, compile_encoder(model))
+    return cached[1]
+
+
+def compiled_output() -> bool:
+    # the compiled encoders write exactly what flask_restx would, as long as it doesn't indent (debug, RESTX_JSON),
+    # apply an X-Fields mask or answer as text/plain
+    config = current_app.config
+    return (config.get("COMPILED_SERIALIZERS", False) and not current_app.debug and not config.get("RESTX_JSON")
+            and not request.headers.get(config["RESTX_MASK_HEADER"])
+            and request.accept_mimetypes.best_match(["application/json", "text/plain"], "application/json") != "text/plain")
+
+
+def encode(data, model, envelope: Optional[str] = None) -> Optional[EncodedJSON]:
+    # the JSON text of marshal(data, model, envelope), None if the model can't be compiled
+    write = encoder(model)
+    if write is None or isinstance(data, dict):
+        return None
+    if isinstance(data, (list, tuple)):
+        text = "[" + ", ".join(map(write, data)) + "]"
+    else:
+        text = write(data)
+    if envelope:
+        text = "{" + _str(envelope) + ": " + text + "}"
+    return EncodedJSON(text)
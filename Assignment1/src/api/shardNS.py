@@ -0,0 +1,30 @@
+from flask_restx import Namespace, Resource, abort
+
+from ..model.agency import Agency
+
+# only registered in the worker processes of a sharded agency (see sharding.py): the subscriber stats and missing issues
+# of one shard as parts, the router adds them up from all shards and writes the texts of the subscriber endpoints
+# (the received counts and missing issues with the positions of their newspapers in the subscription list, which every
+# shard has)
+shard_ns = Namespace("shard", description="Partial results of one shard of a sharded agency")
+
+
+def _subscriber(subscriber_id):
+    subscriber = Agency.get_instance().get_subscriber(subscriber_id)
+    if not subscriber:
+        abort(404, f"Subscriber with ID {subscriber_id} was not found")
+    return subscriber
+
+
+@shard_ns.route('/subscriber/<int:subscriber_id>/stats')
+class ShardSubscriberStats(Resource):
+    @shard_ns.doc(description="The subscriptions, costs, received and special issues of a subscriber in this shard")
+    def get(self, subscriber_id):
+        return Agency.get_instance().subscriber_stats_parts(_subscriber(subscriber_id), positions=True)
+
+
+@shard_ns.route('/subscriber/<int:subscriber_id>/missingissues')
+class ShardSubscriberMissingIssues(Resource):
+    @shard_ns.doc(description="The undelivered issues of the newspapers of this shard a subscriber subscribed to")
+    def get(self, subscriber_id):
+        return {"missing": Agency.get_instance().missing_issue_parts(_subscriber(subscriber_id), positions=True)}
@@ -3,8 +3,14 @@ from flask_restx import Namespace, reqparse, Resource, fields, abort
 
 from ..model.agency import Agency
 from ..model.subscriber import Subscriber
+from .bulk_import import import_rows
+from .bulk_export import export_rows
+from .etags import versioned, versions
+from .response_cache import cached
+from .pagination import paginate, PAGE_PARAMS
+from .projection import ProjectionNamespace
 
-subscriber_ns = Namespace("subscriber", description="Subscriber related operations")
+subscriber_ns = ProjectionNamespace("subscriber", description="Subscriber related operations")
 
 subscriber_model = subscriber_ns.model('SubscriberModel', {
     'ID': fields.Integer(required=False,
@@ -21,33 +27,65 @@ newspaperID_model = subscriber_ns.model('NewspaperIDModel', {
 })
 
 
+def _stats_versions(subscriber_id):
+    # the stats also name the newspapers of the special issues, which the subscriber doesn't follow
+    # (a deleted newspaper counts as version 0)
+    agency = Agency.get_instance()
+    subscriber = agency.get_subscriber(subscriber_id)
+    if subscriber is None:
+        return None
+    papers = [agency.get_newspaper(paper_id) for paper_id in subscriber.special_issues]
+    return versions(subscriber) + tuple(paper.version if paper else 0 for paper in papers)
+
+
+def _missing_versions(subscriber_id):
+    return versions(Agency.get_instance().get_subscriber(subscriber_id))
+
+
 @subscriber_ns.route('/')
 class SubscriberAPI(Resource):
     @subscriber_ns.doc(subscriber_model, description="Add a new subscriber")
     @subscriber_ns.expect(subscriber_model, validate=True)
     @subscriber_ns.marshal_with(subscriber_model, envelope='subscriber')
     def post(self):
-        # create a unique ID (optional: customised ID if not yet existing)
-        subscriber_id = subscriber_ns.payload['ID']
-        IDs = [x.ID for x in Agency.get_instance().subscribers]
-        while True:
-            if subscriber_id not in IDs:
-                break
-            subscriber_id += 1
-        # create a new subscriber object and add it
-        new_subscriber = Subscriber(ID=subscriber_id,
-                                    name=subscriber_ns.payload['name'],
-                                    address=subscriber_ns.payload['address'])
-        return Agency.get_instance().add_subscriber(new_subscriber)
-
-    @subscriber_ns.doc(description="List all subscribers")
+        # create a unique ID (optional: customised ID if not yet existing), it is given back if adding the subscriber fails
+        with Agency.get_instance().subscriber_ids.reserve(subscriber_ns.payload['ID']) as subscriber_id:
+            # create a new subscriber object and add it
+            new_subscriber = Subscriber(ID=subscriber_id,
+                                        name=subscriber_ns.payload['name'],
+                                        address=subscriber_ns.payload['address'])
+            return Agency.get_instance().add_subscriber(new_subscriber)
+
+    @versioned(lambda: versions(Agency.get_instance().subscribers))
+    @subscriber_ns.doc(description="List all subscribers (or a page of them, in ID order)", params=PAGE_PARAMS)
     @subscriber_ns.marshal_list_with(subscriber_model, envelope='subscriber')
     def get(self):
-        return Agency.get_instance().all_subscribers()
+        return paginate(Agency.get_instance().subscribers, Agency.get_instance().all_subscribers)
+
+
+@subscriber_ns.route('/import')
+class SubscriberImport(Resource):
+    lock_whole_request = False  # import_rows locks the agency per batch
+
+    @subscriber_ns.doc(description="Add many subscribers, streamed as NDJSON (one subscriber per line) or as a JSON array")
+    def post(self):
+        def create(row, subscriber_id):
+            return Subscriber(ID=subscriber_id, name=row['name'], address=row['address'])
+        agency = Agency.get_instance()
+        return import_rows(subscriber_model, create, agency.subscriber_ids, 'ID', agency.add_subscriber)
+
+
+@subscriber_ns.route('/export')
+class SubscriberExport(Resource):
+    @versioned(lambda: versions(Agency.get_instance().subscribers))
+    @subscriber_ns.doc(description="Stream all subscribers", params={'format': 'ndjson (default, one subscriber per line) or json (chunked, like the list endpoint)'})
+    def get(self):
+        return export_rows(Agency.get_instance().all_subscribers(), subscriber_model, 'subscriber')
 
 
 @subscriber_ns.route('/<int:subscriber_id>')
 class SubscriberID(Resource):
+    @versioned(lambda subscriber_id: versions(Agency.get_instance().get_subscriber(subscriber_id)))
     @subscriber_ns.doc(description="Get an subscribers information")
     @subscriber_ns.marshal_with(subscriber_model, envelope='subscriber')
     def get(self, subscriber_id):
@@ -92,6 +130,8 @@ class SubscriberIDSubscribe(Resource):
 
 @subscriber_ns.route('/<int:subscriber_id>/stats')
 class SubscriberIDStats(Resource):
+    @versioned(_stats_versions)
+    @cached(_stats_versions)
     @subscriber_ns.doc(description="Get the number of newspaper subscriptions and details")
     def get(self, subscriber_id):
         subscriber = Agency.get_instance().get_subscriber(subscriber_id)
@@ -103,6 +143,8 @@ class SubscriberIDStats(Resource):
 
 @subscriber_ns.route('/<int:subscriber_id>/missingissues')
 class SubscriberIDMissingIssues(Resource):
+    @versioned(_missing_versions)
+    @cached(_missing_versions)
     @subscriber_ns.doc(description="Check for undelivered issues of the subscribed newspapers")
     def get(self, subscriber_id):
         subscriber = Agency.get_instance().get_subscriber(subscriber_id)
@@ -0,0 +1,31 @@
+from functools import wraps
+
+from flask import request
+
+from ..model.agency import Agency
+
+READING_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+# registered for all resources in create_app (Api(decorators=...)): a request runs under the lock of the agency,
+# reading requests share it, the others hold it alone. so a compound operation of an endpoint (e.g. look up a paper and
+# its issue, check them and update the issue) is atomic, and the marshalling of a GET doesn't see half done changes
+# streamed responses (the exports) take a snapshot of the list under the lock and write it after the lock is released
+# resources with lock_whole_request = False (the streamed imports) lock the agency per batch themselves
+def synchronized(view):
+    resource = getattr(view, "view_class", None)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        agency = Agency.get_instance()
+        if request.method in READING_METHODS:
+            with agency.lock.read():
+                return view(*args, **kwargs)
+        if not getattr(resource, "lock_whole_request", True):
+            return view(*args, **kwargs)
+        with agency.lock.write():
+            response = view(*args, **kwargs)
+        agency.commit()  # the change is logged before it is answered (outside the lock, so the commits can be grouped)
+        return response
+
+    return wrapper
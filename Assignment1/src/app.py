@@ -1,23 +1,82 @@
+import os
+import tempfile
+
 from flask import Flask
 from flask_restx import Api
 
 from .api.newspaperNS import newspaper_ns
 from .api.editorNS import editor_ns
 from .api.subscriberNS import subscriber_ns
+from .api.shardNS import shard_ns
 
+from .api.response_cache import ResponseCache
+from .api.serializers import output_json
+from .api.synchronization import synchronized
 from .model.agency import Agency
+from .model.persistence import Persistence
+from .model.sqlite_agency import SqliteAgency
 
 agency = Agency()
 
+
+def _flag(name: str, default: bool) -> bool:
+    # an on/off setting from the environment (1, true, yes or on for on)
+    value = os.environ.get(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
 def create_app():
     paperroute_app = Flask(__name__)
+    paperroute_app.config["MAX_PAGE_SIZE"] = 1000  # the biggest page the list endpoints return (?limit=...)
     # need to extend this class for custom objects, so that they can be jsonified
-    paperroute_api = Api(paperroute_app, title="PaperBack: An App for Newspaper Issue and Subscription Management")
+    # every request runs under the lock of the agency, so the app can be served by several threads (see synchronized)
+    paperroute_api = Api(paperroute_app, title="PaperBack: An App for Newspaper Issue and Subscription Management",
+                         decorators=[synchronized])
+    # responses are written by the compiled encoders of the models (byte for byte the same as marshal and json.dumps),
+    # PAPERBACK_COMPILED_SERIALIZERS=0 leaves them to marshal and json.dumps again
+    paperroute_api.representation("application/json")(output_json)
+    paperroute_app.config["COMPILED_SERIALIZERS"] = _flag("PAPERBACK_COMPILED_SERIALIZERS", True)
+    # the stats and missing issues responses are kept until the objects they show change (least recently used dropped first)
+    paperroute_app.config["RESPONSE_CACHE_SIZE"] = 10000
+    paperroute_app.extensions["response_cache"] = ResponseCache(paperroute_app.config["RESPONSE_CACHE_SIZE"])
 
     # add individual namespaces
     paperroute_api.add_namespace(newspaper_ns)
     paperroute_api.add_namespace(editor_ns)
     paperroute_api.add_namespace(subscriber_ns)
+    # a worker process of a sharded agency (PAPERBACK_SHARD=index/shards, set by sharding.py) also answers the
+    # partial results its router merges
+    paperroute_app.config["SHARD"] = os.environ.get("PAPERBACK_SHARD")
+    if paperroute_app.config["SHARD"]:
+        paperroute_api.add_namespace(shard_ns)
+
+    # with PAPERBACK_DATA_DIR the agency keeps its data in that directory: every change is appended to a write-ahead log
+    # (fsync policy PAPERBACK_WAL_FSYNC: always, interval or never), a snapshot is taken every PAPERBACK_SNAPSHOT_EVERY
+    # log records (default 1000000), and the state is loaded from there at startup (see persistence.py). otherwise it is
+    # only kept in memory
+    paperroute_app.config["DATA_DIR"] = os.environ.get("PAPERBACK_DATA_DIR")
+    paperroute_app.config["WAL_FSYNC"] = os.environ.get("PAPERBACK_WAL_FSYNC", "always")
+    paperroute_app.config["SNAPSHOT_EVERY"] = int(os.environ.get("PAPERBACK_SNAPSHOT_EVERY", 1_000_000))
+    # with PAPERBACK_STORAGE=sqlite the agency keeps its data in a SQLite database instead (PAPERBACK_SQLITE_PATH, by
+    # default paperback.sqlite3 in the data directory or in a temporary one), several processes can share the database
+    paperroute_app.config["STORAGE"] = os.environ.get("PAPERBACK_STORAGE", "memory")
+    paperroute_app.config["SQLITE_PATH"] = os.environ.get("PAPERBACK_SQLITE_PATH")
+    if paperroute_app.config["STORAGE"] not in ("memory", "sqlite"):
+        raise ValueError(f"Unknown storage {paperroute_app.config['STORAGE']}, use memory or sqlite")
+    if paperroute_app.config["STORAGE"] == "sqlite" and Agency.singleton_instance is None:
+        path = paperroute_app.config["SQLITE_PATH"] or os.path.join(
+            paperroute_app.config["DATA_DIR"] or tempfile.mkdtemp(prefix="paperback-"), "paperback.sqlite3")
+        Agency.singleton_instance = SqliteAgency(path)
+    agency = Agency.get_instance()
+    if paperroute_app.config["DATA_DIR"] and paperroute_app.config["STORAGE"] == "memory" and agency.log is None:
+        with paperroute_app.app_context():  # the agency answers with jsonify while the log is replayed
+            Persistence(paperroute_app.config["DATA_DIR"], paperroute_app.config["WAL_FSYNC"],
+                        paperroute_app.config["SNAPSHOT_EVERY"]).open(agency)
+    # with PAPERBACK_ISSUE_COLUMNS=1 the newspapers also keep their issues as columns, so the issue numbers of the
+    # newspaper stats are aggregated over arrays instead of the Issue objects (see issue_columns.py)
+    paperroute_app.config["ISSUE_COLUMNS"] = _flag("PAPERBACK_ISSUE_COLUMNS", False)
+    if paperroute_app.config["ISSUE_COLUMNS"] and not agency.columnar_issues:
+        agency.enable_issue_columns()
 
     return paperroute_app
 
@@ -0,0 +1,164 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from .app import create_app
+
+
+# the ASGI interface of the app, for the asyncio server (see asyncio_server.py) or any other ASGI server
+# (e.g. uvicorn --factory src.asgi:create_asgi_app). the routes are the Flask (WSGI) app of create_app, every request
+# runs in a thread of a pool, so the agency methods (and the agency lock they might wait for) never block the event
+# loop, which only moves the bytes of the connections. the request body is read from the connection while the app
+# reads it and the response is sent while the app writes it, so the bulk imports and exports stay streamed
+class AsgiAdapter(object):
+    def __init__(self, wsgi_app: Callable, workers: int = 32):
+        self.wsgi_app = wsgi_app
+        self.workers = workers  # requests handled at the same time, the others wait for a thread (connections don't)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="paperback-request")
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            exchange = _Exchange(scope, receive, send, asyncio.get_running_loop())
+            await asyncio.get_running_loop().run_in_executor(self.executor, exchange.run, self.wsgi_app)
+        else:  # websockets
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(workers: int = 32) -> AsgiAdapter:
+    return AsgiAdapter(create_app(), workers)
+
+
+# one request, run in a thread of the pool: the WSGI environ is built from the ASGI scope, the messages to and from the
+# server are passed to the event loop (and waited for, so a slow client slows down the thread writing to it)
+class _Exchange(object):
+    def __init__(self, scope: dict, receive: Callable, send: Callable, loop: asyncio.AbstractEventLoop):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.loop = loop
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.started = False
+        self.pending: Optional[bytes] = None  # the last chunk is held back, so it can be sent with more_body=False
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _send_all(self, messages: List[dict]):
+        for message in messages:
+            await self.send(message)
+
+    def environ(self) -> dict:
+        scope = self.scope
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+            "PATH_INFO": scope["path"].encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": _Input(self),
+            "wsgi.input_terminated": True,  # the body ends where the input ends (also for chunked uploads)
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = "HTTP_" + name
+            value = value.decode("latin-1")
+            environ[name] = environ[name] + "," + value if name in environ else value
+        return environ
+
+    def start_response(self, status: str, headers: List[Tuple[str, str]], exc_info=None):
+        if exc_info is not None and self.started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return self.write
+
+    def write(self, chunk: bytes):
+        if self.pending is not None:
+            self._flush(more_body=True)
+        self.pending = chunk
+
+    def _flush(self, more_body: bool):
+        messages = [{"type": "http.response.body", "body": self.pending or b"", "more_body": more_body}]
+        if not self.started:
+            self.started = True
+            messages.insert(0, {"type": "http.response.start", "status": self.status, "headers": self.headers})
+        self.pending = None
+        self._call(self._send_all(messages))
+
+    def run(self, wsgi_app: Callable):
+        result = wsgi_app(self.environ(), self.start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    self.write(chunk)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        self._flush(more_body=False)  # (a response of one chunk is sent at once)
+
+
+# wsgi.input of a request: the body is received from the server as the app reads it
+class _Input(object):
+    def __init__(self, exchange: _Exchange):
+        self.exchange = exchange
+        self.buffer = b""
+        self.done = False
+
+    def _fill(self) -> bool:
+        # receives the next part of the body, False at the end of the body
+        if self.done:
+            return False
+        message = self.exchange._call(self.exchange.receive())
+        if message["type"] != "http.request" or not message.get("more_body", False):
+            self.done = True  # (the end, or http.disconnect: the client is gone)
+        self.buffer += message.get("body", b"")
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self.buffer) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        while b"\n" not in self.buffer and (size < 0 or len(self.buffer) < size) and self._fill():
+            pass
+        end = self.buffer.find(b"\n") + 1 or len(self.buffer)
+        if size >= 0:
+            end = min(end, size)
+        line, self.buffer = self.buffer[:end], self.buffer[end:]
+        return line
+
+    def readlines(self, hint: int = -1) -> List[bytes]:
+        return list(self)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
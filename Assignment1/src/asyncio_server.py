@@ -0,0 +1,284 @@
+import asyncio
+from http import HTTPStatus
+from typing import AsyncIterator, Callable, List, Optional, Set, Tuple
+from urllib.parse import unquote_to_bytes
+
+MAX_HEAD_SIZE = 64 * 1024  # request line and headers
+CHUNK_SIZE = 64 * 1024  # bytes of a request body passed to the app at once
+KEEP_ALIVE_TIMEOUT = 75.0  # seconds an idle connection is kept open
+MAX_DRAINED_BODY = 1024 * 1024  # a body the app didn't read is skipped up to this size, bigger ones close the connection
+
+
+# a small HTTP/1.1 server for ASGI apps (the app of asgi.py) on asyncio streams, without dependencies: every
+# connection is a task of the event loop (an idle keep-alive connection is only a waiting read), so one process can
+# keep thousands of clients connected. requests of a connection are handled one after the other (no pipelining),
+# request bodies can be sent with Content-Length or chunked, responses without a Content-Length are sent chunked
+async def serve(app: Callable, host: str = "127.0.0.1", port: int = 7890,
+                started: Optional[Callable[[asyncio.AbstractServer], None]] = None):
+    await _lifespan(app, "startup")
+    connections: Set[asyncio.Task] = set()
+
+    async def connected(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        connections.add(task)
+        try:
+            await _Connection(app, reader, writer).handle()
+        finally:
+            connections.discard(task)
+
+    server = await asyncio.start_server(connected, host, port, limit=MAX_HEAD_SIZE, backlog=4096)
+    if started is not None:
+        started(server)  # (e.g. to learn the port, with port=0)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in list(connections):  # the open connections are closed with the server
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await _lifespan(app, "shutdown")
+
+
+def run(app: Callable, host: str = "127.0.0.1", port: int = 7890):
+    try:
+        asyncio.run(serve(app, host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _lifespan(app: Callable, event: str):
+    # one message of the lifespan protocol (apps that don't support it raise an error, that is ignored)
+    messages = [{"type": f"lifespan.{event}"}]
+
+    async def receive():
+        return messages.pop() if messages else await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == f"lifespan.{event}.complete":
+            raise _LifespanDone()
+
+    try:
+        await app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send)
+    except Exception:  # (_LifespanDone, or an app without lifespan support)
+        pass
+
+
+class _LifespanDone(Exception):
+    pass
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class _Connection(object):
+    def __init__(self, app: Callable, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.app = app
+        self.reader = reader
+        self.writer = writer
+        self.server = writer.get_extra_info("sockname")
+        self.client = writer.get_extra_info("peername")
+
+    async def handle(self):
+        try:
+            while await self._request():
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writer.close()
+
+    async def _request(self) -> bool:
+        # handles one request, True if the connection stays open for the next one
+        try:
+            head = await asyncio.wait_for(self.reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False  # idle for too long or closed by the client
+        except asyncio.LimitOverrunError:
+            await self._error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            return False
+        try:
+            method, target, version, headers = _parse_head(head)
+        except _BadRequest:
+            await self._error(HTTPStatus.BAD_REQUEST)
+            return False
+        fields = {}
+        for name, value in headers:
+            fields[name] = fields[name] + b"," + value if name in fields else value
+        connection = fields.get(b"connection", b"").lower()
+        keep_alive = b"close" not in connection if version == "1.1" else b"keep-alive" in connection
+        if b"chunked" in fields.get(b"transfer-encoding", b"").lower():
+            body = _chunked_body(self.reader)
+        else:
+            try:
+                length = int(fields.get(b"content-length", b"0"))
+            except ValueError:
+                await self._error(HTTPStatus.BAD_REQUEST)
+                return False
+            body = _sized_body(self.reader, length)
+        path, _, query = target.partition(b"?")
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": version, "method": method,
+                 "scheme": "http", "path": unquote_to_bytes(path).decode("utf-8", "replace"), "raw_path": path,
+                 "query_string": query, "root_path": "", "headers": headers, "client": self.client,
+                 "server": self.server}
+        exchange = _Exchange(self.writer, body, method == "HEAD", version, keep_alive,
+                             fields.get(b"expect", b"").lower() == b"100-continue")
+        try:
+            await self.app(scope, exchange.receive, exchange.send)
+        except Exception:
+            if exchange.started:
+                return False  # the response is broken off, the client sees the connection closing
+            await self._error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return False
+        finally:
+            exchange.finished.set()
+        if not exchange.complete:
+            return False
+        # the part of the body the app didn't read has to go before the next request
+        return exchange.keep_alive and await exchange.skip_body()
+
+    async def _error(self, status: HTTPStatus):
+        body = f"{status.value} {status.phrase}".encode()
+        self.writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\ncontent-type: text/plain\r\n"
+                          f"content-length: {len(body)}\r\nconnection: close\r\n\r\n".encode() + body)
+        await self.writer.drain()
+
+
+def _parse_head(head: bytes) -> Tuple[str, bytes, str, List[Tuple[bytes, bytes]]]:
+    lines = head[:-4].split(b"\r\n")
+    try:
+        method, target, protocol = lines[0].split(b" ")
+    except ValueError:
+        raise _BadRequest() from None
+    if protocol not in (b"HTTP/1.1", b"HTTP/1.0"):
+        raise _BadRequest()
+    headers = []
+    for line in lines[1:]:
+        name, colon, value = line.partition(b":")
+        if not colon or not name or name != name.strip():
+            raise _BadRequest()
+        headers.append((name.lower(), value.strip()))
+    return method.decode("ascii"), target, protocol[5:].decode("ascii"), headers
+
+
+async def _sized_body(reader: asyncio.StreamReader, length: int) -> AsyncIterator[bytes]:
+    while length > 0:
+        chunk = await reader.read(min(length, CHUNK_SIZE))
+        if not chunk:
+            raise asyncio.IncompleteReadError(b"", length)
+        length -= len(chunk)
+        yield chunk
+
+
+async def _chunked_body(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while True:
+        size_line = await reader.readuntil(b"\r\n")
+        try:
+            size = int(size_line.split(b";", 1)[0], 16)
+        except ValueError:
+            raise ConnectionError("Invalid chunk size") from None
+        if size == 0:
+            while await reader.readuntil(b"\r\n") != b"\r\n":  # trailers
+                pass
+            return
+        while size > 0:
+            chunk = await reader.read(min(size, CHUNK_SIZE))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", size)
+            size -= len(chunk)
+            yield chunk
+        await reader.readexactly(2)
+
+
+# the receive and send callables of one request
+class _Exchange(object):
+    def __init__(self, writer: asyncio.StreamWriter, body: AsyncIterator[bytes], head: bool, version: str,
+                 keep_alive: bool, expects_continue: bool):
+        self.writer = writer
+        self.body = body
+        self.head = head  # a HEAD request, the response has no body
+        self.version = version
+        self.keep_alive = keep_alive
+        self.expects_continue = expects_continue
+        self.body_done = False
+        self.body_read = 0
+        self.response: Optional[dict] = None  # http.response.start, written with the first part of the body
+        self.started = False
+        self.chunked = False
+        self.complete = False
+        self.finished = asyncio.Event()
+
+    async def receive(self) -> dict:
+        if self.body_done:
+            await self.finished.wait()  # nothing more to read until the response is sent
+            return {"type": "http.disconnect"}
+        if self.expects_continue:
+            self.expects_continue = False
+            self.writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        try:
+            chunk = await self.body.__anext__()
+        except StopAsyncIteration:
+            self.body_done = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.body_done = True
+            self.keep_alive = False
+            return {"type": "http.disconnect"}
+        self.body_read += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(self, message: dict):
+        if message["type"] == "http.response.start":
+            self.response = message
+            return
+        if message["type"] != "http.response.body" or self.complete:
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            self.writer.write(self._head(None if more_body else len(body)))
+        if not self.head and body:
+            self.writer.write(b"%x\r\n%s\r\n" % (len(body), body) if self.chunked else body)
+        if not more_body:
+            self.complete = True
+            if self.chunked and not self.head:
+                self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+    def _head(self, length: Optional[int]) -> bytes:
+        status = self.response["status"]
+        headers = list(self.response.get("headers", []))
+        names = {name.lower() for name, _ in headers}
+        if b"content-length" not in names:
+            if length is not None:  # the whole body came with the first message
+                headers.append((b"content-length", b"%d" % length))
+            elif self.version == "1.1":
+                self.chunked = True
+                headers.append((b"transfer-encoding", b"chunked"))
+            else:
+                self.keep_alive = False  # the end of the body is the end of the connection
+        if not self.keep_alive:
+            headers.append((b"connection", b"close"))
+        elif self.version == "1.0":
+            headers.append((b"connection", b"keep-alive"))
+        try:
+            phrase = HTTPStatus(status).phrase
+        except ValueError:
+            phrase = ""
+        lines = [b"HTTP/1.1 %d %s" % (status, phrase.encode())]
+        lines += [name + b": " + value for name, value in headers]
+        return b"\r\n".join(lines) + b"\r\n\r\n"
+
+    async def skip_body(self) -> bool:
+        # True if the connection can be used for the next request
+        if self.body_done:
+            return True
+        try:
+            async for chunk in self.body:
+                self.body_read += len(chunk)
+                if self.body_read > MAX_DRAINED_BODY:
+                    return False
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return False
+        return True
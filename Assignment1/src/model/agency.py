@@ -1,249 +1,709 @@
-from typing import List, Union, Optional
+from functools import wraps
+from operator import attrgetter
+from threading import Lock
+from typing import Dict, List, Union, Optional
 from flask import jsonify
 
+from .collection import Collection
+from .ids import IdAllocator
+from .issue_columns import IssueColumns
 from .newspaper import Newspaper
+from .rwlock import ReadWriteLock
 from .editor import Editor
 from .subscriber import Subscriber
+from .versions import next_version
+
+
+# content indexes count how many objects share a content_key(), so duplicates are found without comparing every object
+def _count_key(index: Dict[tuple, int], key: tuple):
+    index[key] = index.get(key, 0) + 1
+
+
+def _uncount_key(index: Dict[tuple, int], key: tuple):
+    if index.get(key, 0) > 1:
+        index[key] -= 1
+    else:
+        index.pop(key, None)
+
+
+# every change of a newspaper, issue, editor or subscriber gives it a new version (the collections do the same for
+# themselves), the GET endpoints build their ETags from these versions
+def _touch(obj):
+    obj.version = next_version()
+
+
+# the texts of get_subscriber_stats and check_missingissues, written from their parts (see subscriber_stats_parts and
+# missing_issue_parts), which a sharded agency adds up from all shards first
+def subscriber_stats_text(parts: dict) -> str:
+    monthly_cost = parts["monthly_cost"]
+    special_issues = "".join(f"Issue with ID {issue_id} from '{name}', " for issue_id, name in parts["special_issues"])
+    return (f"Number of newspaper subscriptions: {parts['subscriptions']} "
+            f"Cost: {monthly_cost} monthly or {monthly_cost * 12} annually "  # special issues not included (Assuming special issues are paid directly) 
+            f"Number of Issues received from: {str([name+': '+str(count) for name, count in parts['received']])} "
+            f"Special issues without subscription: {special_issues}")
+
+
+def missing_issues_text(parts: List[list]) -> str:
+    undelivered = {name: ", ".join(str(issue_id) for issue_id in issue_ids) for name, issue_ids in parts}
+    return f"Undelivered Issues from: {[key+': Issues with ID '+str(value)+' ' for key, value in undelivered.items()]}"
+
+
+# the methods of the agency run under its lock (Agency.lock): any number of reading methods at a time or one changing
+# method, so a threaded server can't see (or make) half done changes. the lock is reentrant, so the methods can call
+# each other and the API can hold the lock around a compound operation (look up, check, change) to make it atomic
+def _reads(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+    return locked
+
+
+def _writes(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+            self.commit()  # the log records of the change are written once the (outermost) lock is released
+    return locked
 
 
 class Agency(object):
     singleton_instance = None
+    _singleton_lock = Lock()
 
     def __init__(self):
-        self.newspapers: List[Newspaper] = []
-        self.editors: List[Editor] = []
-        self.subscribers: List[Subscriber] = []
+        # ID indexed, so looking up an object by its ID doesn't have to scan the whole list
+        # (and paged, for the cursor pagination of the list endpoints)
+        self.newspapers: Collection = Collection(attrgetter("paper_id"), paged=True)
+        self.editors: Collection = Collection(attrgetter("ID"), paged=True)
+        self.subscribers: Collection = Collection(attrgetter("ID"), paged=True)
+        # content_key() -> count, to reject duplicates (same name, address, ...) in O(1)
+        self.newspaper_contents: Dict[tuple, int] = {}
+        self.editor_contents: Dict[tuple, int] = {}
+        self.subscriber_contents: Dict[tuple, int] = {}
+        # IDs for new objects (the issue IDs are handed out by each newspaper)
+        self.newspaper_ids = IdAllocator()
+        self.editor_ids = IdAllocator()
+        # paper_id -> {editor ID: number of issues of that paper the editor supervises}, to find a successor for an editor
+        self.paper_editors: Dict[int, Dict[int, int]] = {}
+        # paper_id -> {subscriber ID: None} of the subscribers who received issues of that paper that are still in it
+        # (with or without a subscription), to find the received counts of a removed issue or newspaper
+        self.paper_receivers: Dict[int, Dict[int, None]] = {}
+        # paper_id -> {issue ID: number of subscribers who received it} of the removed issues that are still in the issue
+        # lists of subscribers: their IDs aren't handed out again (also not by a new newspaper with the same ID) until
+        # nobody has them anymore, so the Issue.key() of a delivered issue never stands for another issue
+        self.removed_deliveries: Dict[int, Dict[int, int]] = {}
+        # paper_id -> number of released issues of that paper its subscribers haven't received yet (the missing issues
+        # of the paper added up over the subscribers), for the undelivered count of issue_stats
+        self.paper_undelivered: Dict[int, int] = {}
+        self.subscriber_ids = IdAllocator()
+        # if set, every newspaper also keeps its issues as columns (see enable_issue_columns)
+        self.columnar_issues: bool = False
+        self.lock = ReadWriteLock()
+        # the write-ahead log every change is recorded in (see persistence.py), None: the data is only kept in memory
+        self.log = None
 
     @staticmethod
     def get_instance():
         if Agency.singleton_instance is None:
-            Agency.singleton_instance = Agency()
+            with Agency._singleton_lock:  # two threads of the first requests mustn't create two agencies
+                if Agency.singleton_instance is None:
+                    Agency.singleton_instance = Agency()
         return Agency.singleton_instance
 
+    # the changing methods append a record (the name of the method and the IDs and fields it needs) to the log,
+    # replaying the records in the same order on the same state makes the same changes (see persistence.replay)
+    def _log(self, *record):
+        if self.log is not None:
+            self.log.append(list(record))
+
+    def commit(self):
+        # waits until the logged changes are written (how durable depends on the fsync policy of the log),
+        # threads that hold the write lock don't commit, so the lock isn't held while other threads join the commit
+        if self.log is not None and not self.lock.is_writing():
+            self.log.commit()
+
+    @_writes
     def add_newspaper(self, new_paper: Newspaper):
-        for paper in self.newspapers:
-            if paper == new_paper:
-                # I used raise ValueError() instead of abort() in agency.py for better testing purposes
-                raise ValueError(f"Newspaper named {new_paper.name} already exists")
-            elif paper.paper_id == new_paper.paper_id:  # this shouldn't be possible if data was added only over the swagger interface
-                raise ValueError(f'A newspaper with ID {new_paper.paper_id} already exists')
-        self.newspapers.append(new_paper)
+        if new_paper.content_key() in self.newspaper_contents:
+            # I used raise ValueError() instead of abort() in agency.py for better testing purposes
+            raise ValueError(f"Newspaper named {new_paper.name} already exists")
+        if new_paper.paper_id in self.newspapers.keys():  # this shouldn't be possible if data was added only over the swagger interface
+            raise ValueError(f'A newspaper with ID {new_paper.paper_id} already exists')
+        new_paper.issue_ids.claim_all(self.removed_deliveries.get(new_paper.paper_id, ()))
+        if self.columnar_issues:
+            new_paper.columns = IssueColumns.build(new_paper.paper_id, new_paper.issues)
+        _touch(new_paper)
+        self.newspapers.add(new_paper)
+        self.newspaper_ids.claim(new_paper.paper_id)
+        _count_key(self.newspaper_contents, new_paper.content_key())
+        self._log("add_newspaper", new_paper.paper_id, new_paper.name, new_paper.frequency, new_paper.price)
         return new_paper
 
+    # (looking up one object by its ID is a single dict lookup, that can't see a half done change, so it isn't locked)
     def get_newspaper(self, paper_id: int) -> Optional[Newspaper]:
-        for paper in self.newspapers:
-            if paper.paper_id == paper_id:
-                return paper
+        return self.newspapers.get(paper_id)
 
+    @_reads
     def all_newspapers(self) -> List[Newspaper]:
-        return self.newspapers
+        return self.newspapers.to_list()
 
+    @_writes
     def remove_newspaper(self, paper: Newspaper):
+        for subscriber in paper.subscribers:
+            subscriber.newspaper_list.remove(paper)  # stops all subscriptions of the deleted paper
+            subscriber.missing.pop(paper.paper_id, None)
+            self._update_monthly_cost(subscriber)
+            _touch(subscriber)
+        self.paper_undelivered.pop(paper.paper_id, None)
+        # the issues stay in the issue lists of the subscribers who received them
+        received = {}
+        for subscriber_id in list(self.paper_receivers.get(paper.paper_id, ())):
+            subscriber = self.subscribers.get(subscriber_id)
+            for issue in [issue for issue in subscriber.issues_list
+                          if issue.newspaper_id == paper.paper_id and issue.issue_id in paper.issues.keys()]:
+                self._forget_received(subscriber, issue)
+                received[issue.issue_id] = received.get(issue.issue_id, 0) + 1
+        if received:
+            self.removed_deliveries.setdefault(paper.paper_id, {}).update(received)
+        for issue in paper.issues:  # the editors no longer supervise the issues of the deleted paper
+            if issue.editor_id != 0:
+                self._unassign_issue(self.get_editor(issue.editor_id), issue)
+        self.paper_editors.pop(paper.paper_id, None)
         self.newspapers.remove(paper)
+        self.newspaper_ids.release(paper.paper_id)
+        _uncount_key(self.newspaper_contents, paper.content_key())
+        self._log("remove_newspaper", paper.paper_id)
 
+    @_writes
     def update_newspaper(self, targeted_paper, updated_paper):
         if targeted_paper == updated_paper:
             raise ValueError("Newspaper already up to date")
         # insuring that the paper keeps its subscriptions and issues
         updated_paper.issues = targeted_paper.issues
+        updated_paper.issue_contents = targeted_paper.issue_contents
+        updated_paper.issue_ids = targeted_paper.issue_ids
+        updated_paper.issues_added = targeted_paper.issues_added
         updated_paper.subscribers = targeted_paper.subscribers
-        self.newspapers[self.newspapers.index(targeted_paper)] = updated_paper
+        updated_paper.columns = targeted_paper.columns
+        _touch(updated_paper)
+        for subscriber in updated_paper.subscribers:
+            subscriber.newspaper_list.replace(updated_paper)  # so the subscribers see the new name and price
+            if updated_paper.price != targeted_paper.price:
+                self._update_monthly_cost(subscriber)
+            _touch(subscriber)  # the stats show the name of the paper
+        self.newspapers.replace(updated_paper)
+        _uncount_key(self.newspaper_contents, targeted_paper.content_key())
+        _count_key(self.newspaper_contents, updated_paper.content_key())
+        self._log("update_newspaper", updated_paper.paper_id, updated_paper.name, updated_paper.frequency, updated_paper.price)
         return updated_paper
 
 # issues:
+    @_writes
     def add_issue(self, targeted_paper, new_issue):
-        for issue in targeted_paper.issues:
-            if issue == new_issue:
-                raise ValueError("Issue already exists")
-            elif issue.issue_id == new_issue.issue_id:
-                raise ValueError(f'A issue with ID {issue.issue_id} already exists')
+        if new_issue.newspaper_id is None:
+            new_issue.newspaper_id = targeted_paper.paper_id
+        if new_issue.content_key() in targeted_paper.issue_contents:
+            raise ValueError("Issue already exists")
+        elif new_issue.issue_id in targeted_paper.issues.keys():
+            raise ValueError(f'A issue with ID {new_issue.issue_id} already exists')
+        elif new_issue.issue_id in self.removed_deliveries.get(new_issue.newspaper_id, ()):
+            raise ValueError(f"The ID {new_issue.issue_id} belongs to a removed issue that subscribers have received")
         # check if editor exists or still has to get assigned:
         if new_issue.editor_id != 0:
-            editor = Agency.get_instance().get_editor(new_issue.editor_id)
+            editor = self.get_editor(new_issue.editor_id)
             if not editor:
                 raise ValueError(f"Editor with ID {new_issue.editor_id} was not found")
-            editor.issues_list.append(new_issue)  # if editor exists
-        targeted_paper.issues.append(new_issue)
+            self._assign_issue(editor, new_issue)  # if editor exists
+        new_issue.position = targeted_paper.issues_added
+        targeted_paper.issues_added += 1
+        targeted_paper.issues.add(new_issue)
+        targeted_paper.issue_ids.claim(new_issue.issue_id)
+        self._index_issue_content(targeted_paper, new_issue)
+        self._log("add_issue", targeted_paper.paper_id, new_issue.issue_id, new_issue.releasedate, new_issue.released,
+                  new_issue.editor_id, new_issue.pages, new_issue.newspaper_id)
         return new_issue
 
     def get_issue(self, paper, issue_id):
-        for issue in paper.issues:
-            if issue.issue_id == issue_id:
-                return issue
+        return paper.issues.get(issue_id)
 
+    @_reads
     def all_issues(self, paper):
-        return paper.issues
-
+        return paper.issues.to_list()
+
+    # the content index (and the issue columns) have to follow every change of the fields compared by Issue.__eq__
+    # (and so does the version of the issue, of the issue list of the paper and of the issue list of the editor)
+    def _index_issue_content(self, paper, issue):
+        _touch(issue)
+        editor = self.editors.get(issue.editor_id)
+        if editor is not None:
+            editor.issues_list.touch()
+        if paper is not None:  # the issue might not be part of a newspaper (anymore)
+            _count_key(paper.issue_contents, issue.content_key())
+            paper.issues.touch()
+            if paper.columns is not None:
+                paper.columns.put(issue)
+
+    def _unindex_issue_content(self, paper, issue):
+        if paper is not None:
+            _uncount_key(paper.issue_contents, issue.content_key())
+
+    @_writes
     def update_issue(self, targeted_paper, issue, updated_issue):
         if issue == updated_issue:
             raise ValueError("Issue already up to date")
 
         if updated_issue.editor_id != 0:
-            editor = Agency.get_instance().get_editor(updated_issue.editor_id)
+            editor = self.get_editor(updated_issue.editor_id)
             if not editor:
                 raise ValueError(f"Editor with ID {updated_issue.editor_id} was not found")
-            if issue.editor_id == updated_issue.editor_id:  # no change
-                editor.issues_list[editor.issues_list.index(issue)] = updated_issue  # replacing the old issue with updated version
-            else:
-                editor.issues_list.append(updated_issue)  # add issue to new editor
-                if issue.editor_id != 0:  # check if there used to be another editor before
-                    old_editor = Agency.get_instance().get_editor(issue.editor_id)
-                    old_editor.issues_list.remove(issue)  # remove old issue from old editor
-
-        targeted_paper.issues[targeted_paper.issues.index(issue)] = updated_issue  # replacing the old issue with updated version
+        if issue.editor_id == updated_issue.editor_id:  # no change
+            if issue.editor_id != 0:
+                editor.issues_list.replace(updated_issue)  # replacing the old issue with updated version
+        else:
+            if issue.editor_id != 0:  # check if there used to be another editor before
+                old_editor = self.get_editor(issue.editor_id)
+                self._unassign_issue(old_editor, issue)  # remove old issue from old editor
+            if updated_issue.editor_id != 0:
+                self._assign_issue(editor, updated_issue)  # add issue to new editor
+
+        self._unindex_issue_content(targeted_paper, issue)
+        updated_issue.position = issue.position
+        targeted_paper.issues.replace(updated_issue)  # replacing the old issue with updated version (same ID, same position)
+        self._index_issue_content(targeted_paper, updated_issue)
+        if issue.released:  # the subscribers who received the issue get the updated version as well
+            for subscriber_id in self.paper_receivers.get(issue.newspaper_id, ()):
+                subscriber = self.subscribers.get(subscriber_id)
+                if issue.key() in subscriber.delivered:
+                    subscriber.issues_list.replace(updated_issue)
+        self._log("update_issue", targeted_paper.paper_id, issue.issue_id, updated_issue.issue_id, updated_issue.releasedate,
+                  updated_issue.released, updated_issue.editor_id, updated_issue.pages, updated_issue.newspaper_id)
         return updated_issue
 
+    @_writes
     def remove_issue(self, targeted_paper, issue):
         targeted_paper.issues.remove(issue)
+        self._unindex_issue_content(targeted_paper, issue)
+        if targeted_paper.columns is not None:
+            targeted_paper.columns.remove(issue.issue_id)
+        received = 0
+        if issue.released:
+            for subscriber in targeted_paper.subscribers:
+                self._remove_missing(subscriber, issue)
+            # the issue stays in the issue lists of the subscribers who received it
+            for subscriber_id in list(self.paper_receivers.get(issue.newspaper_id, ())):
+                subscriber = self.subscribers.get(subscriber_id)
+                if issue.key() in subscriber.delivered:
+                    self._forget_received(subscriber, issue)
+                    received += 1
+        if received:
+            self.removed_deliveries.setdefault(issue.newspaper_id, {})[issue.issue_id] = received
+        else:
+            targeted_paper.issue_ids.release(issue.issue_id)
         if issue.editor_id != 0:
-            editor = Agency.get_instance().get_editor(issue.editor_id)
-            editor.issues_list.remove(issue)
+            editor = self.get_editor(issue.editor_id)
+            self._unassign_issue(editor, issue)
+        self._log("remove_issue", targeted_paper.paper_id, issue.issue_id)
         return jsonify(f"Issue with ID {issue.issue_id} was removed")
 
+    @_writes
     def release_issue(self, issue):
         if issue.released:
             raise ValueError("Issue already released")
         elif issue.editor_id == 0:
             raise ValueError("Editor not yet specified!")
+        paper = self.get_newspaper(issue.newspaper_id)
+        self._unindex_issue_content(paper, issue)
         issue.released = True
+        self._index_issue_content(paper, issue)
+        if paper is not None:
+            for subscriber in paper.subscribers:
+                if issue.key() not in subscriber.delivered:
+                    self._add_missing(subscriber, issue)
+        self._log("release_issue", issue.newspaper_id, issue.issue_id)
         return issue
 
+    @_writes
     def add_editor_to_issue(self, issue, editor):
         if issue.editor_id == 0:
+            paper = self.get_newspaper(issue.newspaper_id)
+            self._unindex_issue_content(paper, issue)
             issue.editor_id = editor.ID
-            editor.issues_list.append(issue)
+            self._index_issue_content(paper, issue)
+            self._assign_issue(editor, issue)
+            self._log("add_editor_to_issue", issue.newspaper_id, issue.issue_id, editor.ID)
             return issue
         raise ValueError(f"Editor with ID {issue.editor_id} is already the editor of this Issue")
 
+    @_writes
     def deliver_issue(self, subscriber, issue, targeted_paper):
         if not issue.released:
             raise ValueError(f"Issue {issue.issue_id} hasn't been released yet")
         # the subscriber can subscribe/receive special issues, therefore the next two lines are not necessary
         # elif targeted_paper not in subscriber.newspaper_list:
             # raise ValueError(f"The Subscriber has no subscription for the newspaper {targeted_paper.name}")
-        elif issue in subscriber.issues_list:
+        elif issue.key() in subscriber.delivered:
             raise ValueError(f"Issue {issue.issue_id} has already been delivered")
-        subscriber.issues_list.append(issue)
+        self._deliver(subscriber, issue)
+        self._log("deliver_issue", subscriber.ID, targeted_paper.paper_id, issue.issue_id)
         return jsonify(f"Issue {issue.issue_id} from {targeted_paper.name} delivered")
 
+    @_writes
+    def deliver_issue_to_subscribers(self, issue, targeted_paper, subscriber_ids: Optional[List[int]] = None):
+        # delivers the issue to all subscribers of the paper (or the given subscribers) in one pass,
+        # subscribers who already have the issue are skipped instead of raising an error
+        if not issue.released:
+            raise ValueError(f"Issue {issue.issue_id} hasn't been released yet")
+        counts = {"delivered": 0, "already_delivered": 0, "not_found": 0}
+        if subscriber_ids is None:
+            subscribers = targeted_paper.subscribers.to_list()
+        else:
+            subscribers = []
+            for subscriber_id in dict.fromkeys(subscriber_ids):  # every subscriber only once
+                subscriber = self.subscribers.get(subscriber_id)
+                if subscriber is None:
+                    counts["not_found"] += 1
+                else:
+                    subscribers.append(subscriber)
+        key = issue.key()
+        for subscriber in subscribers:
+            if key in subscriber.delivered:
+                counts["already_delivered"] += 1
+            else:
+                self._deliver(subscriber, issue)
+                counts["delivered"] += 1
+        if counts["delivered"]:
+            self._log("deliver_issue_to_subscribers", targeted_paper.paper_id, issue.issue_id, subscriber_ids)
+        return jsonify(counts)
+
+    def _deliver(self, subscriber, issue):
+        _touch(subscriber)
+        subscriber.issues_list.add(issue)
+        self._remove_missing(subscriber, issue)
+        subscriber.received[issue.newspaper_id] = subscriber.received.get(issue.newspaper_id, 0) + 1
+        if issue.newspaper_id not in subscriber.newspaper_list.keys():
+            subscriber.special_issues.setdefault(issue.newspaper_id, {})[issue.issue_id] = None
+        self.paper_receivers.setdefault(issue.newspaper_id, {})[subscriber.ID] = None
+
+    def _forget_received(self, subscriber, issue):
+        # a removed issue is no longer counted as received (or as a special issue) in the stats of the subscriber
+        _touch(subscriber)
+        if subscriber.received[issue.newspaper_id] > 1:
+            subscriber.received[issue.newspaper_id] -= 1
+        else:
+            del subscriber.received[issue.newspaper_id]
+            receivers = self.paper_receivers[issue.newspaper_id]
+            del receivers[subscriber.ID]
+            if not receivers:
+                del self.paper_receivers[issue.newspaper_id]
+        special = subscriber.special_issues.get(issue.newspaper_id)
+        if special is not None:
+            special.pop(issue.issue_id, None)
+            if not special:
+                del subscriber.special_issues[issue.newspaper_id]
+
+    def _forget_removed_delivery(self, paper_id: int, issue_id: int):
+        # one subscriber less has the removed issue, once nobody has it its ID can be handed out again
+        removed = self.removed_deliveries[paper_id]
+        if removed[issue_id] > 1:
+            removed[issue_id] -= 1
+            return
+        del removed[issue_id]
+        if not removed:
+            del self.removed_deliveries[paper_id]
+        paper = self.newspapers.get(paper_id)
+        if paper is not None:
+            paper.issue_ids.release(issue_id)
+
+    @_writes
+    def enable_issue_columns(self):
+        # builds the columns for the existing newspapers, newspapers added later get them in add_newspaper
+        self.columnar_issues = True
+        for paper in self.newspapers:
+            if paper.columns is None:
+                paper.columns = IssueColumns.build(paper.paper_id, paper.issues)
+
+    @_reads
+    def issue_stats(self, paper):
+        columns = paper.columns
+        if columns is not None:  # vectorized over the columns
+            stats = {"issues": len(columns),
+                     "released": columns.released_count(),
+                     "pages": columns.pages_total(),
+                     "released_pages": columns.pages_total(released_only=True),
+                     "editors": columns.editor_workload()}
+        else:
+            stats = {"issues": len(paper.issues), "released": 0, "pages": 0, "released_pages": 0, "editors": {}}
+            for issue in paper.issues:
+                stats["pages"] += issue.pages
+                if issue.released:
+                    stats["released"] += 1
+                    stats["released_pages"] += issue.pages
+                if issue.editor_id != 0:
+                    workload = stats["editors"].setdefault(issue.editor_id, {"issues": 0, "pages": 0})
+                    workload["issues"] += 1
+                    workload["pages"] += issue.pages
+        stats["undelivered"] = self.undelivered_count(paper)
+        return stats
+
+    def undelivered_count(self, paper) -> int:
+        # released issues of the paper that haven't reached a subscriber yet (counted by _add_missing and _remove_missing)
+        return self.paper_undelivered.get(paper.paper_id, 0)
+
+    @_reads
     def newspaper_stats(self, paper):
-        subscriber_number = len(paper.subscribers)
+        subscriber_number = len(paper.subscribers)  # the subscriber collection keeps its own size, so this is O(1)
+        stats = self.issue_stats(paper)
+        editors = [f"{editor_id}: {workload['issues']} issues, {workload['pages']} pages"
+                   for editor_id, workload in stats["editors"].items()]
         return jsonify(f"{paper.name} stats: "
                        f"Number of Subscribers: {subscriber_number} "
                        f"Monthly revenue: {subscriber_number * paper.price} "
-                       f"Annual revenue: {subscriber_number * paper.price * 12}")
+                       f"Annual revenue: {subscriber_number * paper.price * 12} "
+                       f"Number of Issues: {stats['issues']} (released: {stats['released']}, "
+                       f"undelivered: {stats['undelivered']}) "
+                       f"Pages: {stats['pages']} (released: {stats['released_pages']}) "
+                       f"Editors: {editors}")
 
 # editor:
+    @_writes
     def add_editor(self, new_editor: Editor):
-        for editor in self.editors:
-            if new_editor == editor:
-                raise ValueError(f"Editor {new_editor.name} already exists")
-            elif new_editor.ID == editor.ID:
-                raise ValueError(f"A editor with ID {new_editor.ID} already exists")
-        self.editors.append(new_editor)
+        if new_editor.content_key() in self.editor_contents:
+            raise ValueError(f"Editor {new_editor.name} already exists")
+        if new_editor.ID in self.editors.keys():
+            raise ValueError(f"A editor with ID {new_editor.ID} already exists")
+        _touch(new_editor)
+        self.editors.add(new_editor)
+        self.editor_ids.claim(new_editor.ID)
+        _count_key(self.editor_contents, new_editor.content_key())
+        self._log("add_editor", new_editor.ID, new_editor.name, new_editor.address)
         return new_editor
 
+    @_reads
     def all_editors(self):
-        return self.editors
+        return self.editors.to_list()
 
     def get_editor(self, editor_id: int):
-        for editor in self.editors:
-            if editor.ID == editor_id:
-                return editor
+        return self.editors.get(editor_id)
 
+    @_writes
     def update_editor(self, targeted_editor, updated_editor):
         if targeted_editor == updated_editor:
             raise ValueError("No changes made")
         # insuring the editor keeps its issues and newspaper lists:
         updated_editor.issues_list = targeted_editor.issues_list
         updated_editor.newspaper_list = targeted_editor.newspaper_list
-        self.editors[self.editors.index(targeted_editor)] = updated_editor
+        _touch(updated_editor)
+        self.editors.replace(updated_editor)
+        _uncount_key(self.editor_contents, targeted_editor.content_key())
+        _count_key(self.editor_contents, updated_editor.content_key())
+        self._log("update_editor", updated_editor.ID, updated_editor.name, updated_editor.address)
         return updated_editor
 
+    @_writes
     def remove_editor(self, editor: Editor):
         self.editors.remove(editor)
-        if len(editor.issues_list) != 0 and len(self.editors) != 0:  # if the editor had issues in his/her supervision  # and there are other editors
-            for issue in editor.issues_list:
-                for new_editor in self.editors:
-                    newspaper_list = [x.newspaper_id for x in new_editor.issues_list]  # id_list of all newspapers an editor works for
-                    if issue.newspaper_id in newspaper_list:
-                        new_editor.issues_list.append(issue)  # transferring issues of the deleted editor to another editor
-                        break
-
+        self.editor_ids.release(editor.ID)
+        _uncount_key(self.editor_contents, editor.content_key())
+        # the editor no longer counts as working for his/her newspapers:
+        for paper_id in {issue.newspaper_id for issue in editor.issues_list}:
+            self.paper_editors[paper_id].pop(editor.ID, None)
+        for issue in editor.issues_list:  # if the editor had issues in his/her supervision
+            candidates = self.paper_editors.get(issue.newspaper_id)
+            # transferring issues of the deleted editor to another editor of the same newspaper (if there is one),
+            # otherwise the issue is waiting for a new editor again
+            new_editor = self.get_editor(next(iter(candidates))) if candidates else None
+            paper = self.get_newspaper(issue.newspaper_id)
+            self._unindex_issue_content(paper, issue)
+            issue.editor_id = new_editor.ID if new_editor else 0
+            self._index_issue_content(paper, issue)
+            if new_editor:
+                self._assign_issue(new_editor, issue)
+        self._log("remove_editor", editor.ID)
+
+    # editor.issues_list and self.paper_editors always change together
+    def _assign_issue(self, editor: Editor, issue):
+        editor.issues_list.add(issue)
+        editors = self.paper_editors.setdefault(issue.newspaper_id, {})
+        editors[editor.ID] = editors.get(editor.ID, 0) + 1
+
+    def _unassign_issue(self, editor: Editor, issue):
+        editor.issues_list.remove(issue)
+        editors = self.paper_editors[issue.newspaper_id]
+        if editors[editor.ID] > 1:
+            editors[editor.ID] -= 1
+        else:
+            del editors[editor.ID]
+
+    @_reads
     def get_editor_issues(self, editor: Editor):
-        return editor.issues_list
+        return editor.issues_list.to_list()
 
 # subscriber:
+    @_writes
     def add_subscriber(self, new_subscriber: Subscriber):
-        for subscriber in self.subscribers:
-            if new_subscriber.ID == subscriber.ID:
-                raise ValueError(f"A subscriber with ID {new_subscriber.ID} already exists")
-            elif new_subscriber == subscriber:
-                raise ValueError(f"Subscriber {new_subscriber.name} already exists")
-        self.subscribers.append(new_subscriber)
+        if new_subscriber.ID in self.subscribers.keys():
+            raise ValueError(f"A subscriber with ID {new_subscriber.ID} already exists")
+        if new_subscriber.content_key() in self.subscriber_contents:
+            raise ValueError(f"Subscriber {new_subscriber.name} already exists")
+        _touch(new_subscriber)
+        self.subscribers.add(new_subscriber)
+        self.subscriber_ids.claim(new_subscriber.ID)
+        _count_key(self.subscriber_contents, new_subscriber.content_key())
+        self._log("add_subscriber", new_subscriber.ID, new_subscriber.name, new_subscriber.address)
         return new_subscriber
 
+    @_reads
     def all_subscribers(self) -> List[Subscriber]:
-        return self.subscribers
+        return self.subscribers.to_list()
 
     def get_subscriber(self, subscriber_id: int):
-        for subscriber in self.subscribers:
-            if subscriber.ID == subscriber_id:
-                return subscriber
+        return self.subscribers.get(subscriber_id)
 
+    @_writes
     def update_subscriber(self, targeted_subscriber, updated_subscriber):
         if targeted_subscriber == updated_subscriber:
             raise ValueError(f"No changes made")
         # insuring the subscriber keeps its issues and newspaper lists:
         updated_subscriber.issues_list = targeted_subscriber.issues_list
+        updated_subscriber.missing = targeted_subscriber.missing
+        updated_subscriber.monthly_cost = targeted_subscriber.monthly_cost
+        updated_subscriber.received = targeted_subscriber.received
+        updated_subscriber.special_issues = targeted_subscriber.special_issues
         updated_subscriber.newspaper_list = targeted_subscriber.newspaper_list
-        self.subscribers[self.subscribers.index(targeted_subscriber)] = updated_subscriber
+        _touch(updated_subscriber)
+        for paper in updated_subscriber.newspaper_list:
+            paper.subscribers.replace(updated_subscriber)
+        self.subscribers.replace(updated_subscriber)
+        _uncount_key(self.subscriber_contents, targeted_subscriber.content_key())
+        _count_key(self.subscriber_contents, updated_subscriber.content_key())
+        self._log("update_subscriber", updated_subscriber.ID, updated_subscriber.name, updated_subscriber.address)
         return updated_subscriber
 
+    @_writes
     def remove_subscriber(self, subscriber: Subscriber):
-        for paper in self.newspapers:
-            if subscriber in paper.subscribers:
-                paper.subscribers.remove(subscriber)  # stops all subscriptions when subscriber is deleted
+        for paper in subscriber.newspaper_list:
+            paper.subscribers.remove(subscriber)  # stops all subscriptions when subscriber is deleted
+        for paper_id in subscriber.received:
+            receivers = self.paper_receivers[paper_id]
+            del receivers[subscriber.ID]
+            if not receivers:
+                del self.paper_receivers[paper_id]
+        for paper_id, missing in subscriber.missing.items():  # nobody waits for these issues anymore
+            if self.paper_undelivered[paper_id] > len(missing):
+                self.paper_undelivered[paper_id] -= len(missing)
+            else:
+                del self.paper_undelivered[paper_id]
+        for issue in subscriber.issues_list if self.removed_deliveries else ():
+            removed = self.removed_deliveries.get(issue.newspaper_id)
+            if removed is not None and issue.issue_id in removed:
+                self._forget_removed_delivery(issue.newspaper_id, issue.issue_id)
         self.subscribers.remove(subscriber)
+        self.subscriber_ids.release(subscriber.ID)
+        _uncount_key(self.subscriber_contents, subscriber.content_key())
+        self._log("remove_subscriber", subscriber.ID)
 
+    @_writes
     def subscribe_to_paper(self, subscriber, paper):
         if subscriber not in paper.subscribers:
-            paper.subscribers.append(subscriber)
+            paper.subscribers.add(subscriber)
             # then paper also not in subscriber.newspaper_list:
-            subscriber.newspaper_list.append(paper)
+            subscriber.newspaper_list.add(paper)
+            subscriber.monthly_cost += paper.price
+            _touch(subscriber)
+            subscriber.special_issues.pop(paper.paper_id, None)  # issues of the paper are no longer special issues
+            for issue in paper.issues:
+                if issue.released and issue.key() not in subscriber.delivered:
+                    self._add_missing(subscriber, issue)
+            self._log("subscribe_to_paper", subscriber.ID, paper.paper_id)
             return jsonify("Done!")
         raise ValueError(f"Subscriber {subscriber.ID} already has a subscription of the Newspaper {paper.name}")
 
-    def get_subscriber_stats(self, subscriber):
-        newspaper_number = len(subscriber.newspaper_list)
-        monthly_cost = 0
+    def _update_monthly_cost(self, subscriber):
+        # summed up again in subscription order (instead of subtracting), so the float total matches a fresh sum
+        subscriber.monthly_cost = sum([x.price for x in subscriber.newspaper_list])
+
+    @_reads
+    def subscriber_stats_parts(self, subscriber, positions: bool = False) -> dict:
+        # the numbers of get_subscriber_stats, kept apart so the parts of several shards can be added up (see sharding.py)
+        # the counts are kept up to date by subscribe_to_paper, deliver_issue, update_newspaper, remove_issue and
+        # remove_newspaper (the issues that were removed aren't counted anymore)
+        # with positions the received counts are [position of the paper in the subscription list, name, count] for
+        # every paper, the router adds them up by name in that order (like below)
         newspaper_issues = {}
+        received = []
         # subscriptions:
-        if newspaper_number != 0:
-            monthly_cost = sum([x.price for x in subscriber.newspaper_list])
-            for paper in subscriber.newspaper_list:
-                for issue in paper.issues:
-                    if issue in subscriber.issues_list:
-                        newspaper_issues.update({paper.name: 1 + newspaper_issues.get(paper.name,0)})
+        for position, paper in enumerate(subscriber.newspaper_list):
+            if subscriber.received.get(paper.paper_id):
+                received.append([position, paper.name, subscriber.received[paper.paper_id]])
+                newspaper_issues.update({paper.name: subscriber.received[paper.paper_id] + newspaper_issues.get(paper.name, 0)})
 
         # special issues are not in the newspaper_list:
-        special_issues = ""
-        if subscriber.issues_list != 0:
-            newspaper_IDs = [paper.paper_id for paper in subscriber.newspaper_list]
-            for issue in subscriber.issues_list:
-                if issue.newspaper_id not in newspaper_IDs:
-                    paper = Agency.get_instance().get_newspaper(issue.newspaper_id)
-                    special_issues += f"Issue with ID {issue.issue_id} from '{paper.name}', "
-
-        return jsonify(f"Number of newspaper subscriptions: {newspaper_number} "
-                       f"Cost: {monthly_cost} monthly or {monthly_cost * 12} annually "  # special issues not included (Assuming special issues are paid directly) 
-                       f"Number of Issues received from: {str([key+': '+str(value) for key, value in newspaper_issues.items()])} "
-                       f"Special issues without subscription: {special_issues}")
+        special_issues = []
+        for paper_id, issue_ids in subscriber.special_issues.items():
+            paper = self.get_newspaper(paper_id)
+            if paper is None:  # the newspaper was deleted in the meantime
+                continue
+            special_issues += [[issue_id, paper.name] for issue_id in issue_ids]
+        return {"subscriptions": len(subscriber.newspaper_list), "monthly_cost": subscriber.monthly_cost,
+                "received": received if positions else [[name, count] for name, count in newspaper_issues.items()],
+                "special_issues": special_issues}
+
+    def get_subscriber_stats(self, subscriber):
+        return jsonify(subscriber_stats_text(self.subscriber_stats_parts(subscriber)))
+
+    # subscriber.missing is kept up to date by release_issue, deliver_issue, subscribe_to_paper, remove_issue and
+    # remove_newspaper, so check_missingissues doesn't have to compare every issue with the delivered ones
+    def _add_missing(self, subscriber, issue):
+        _touch(subscriber)
+        missing = subscriber.missing.setdefault(issue.newspaper_id, {})
+        if issue.issue_id not in missing:
+            missing[issue.issue_id] = None
+            _count_key(self.paper_undelivered, issue.newspaper_id)
+
+    def _remove_missing(self, subscriber, issue):
+        missing = subscriber.missing.get(issue.newspaper_id)
+        if missing is not None:
+            _touch(subscriber)
+            if issue.issue_id in missing:
+                del missing[issue.issue_id]
+                _uncount_key(self.paper_undelivered, issue.newspaper_id)
+            if not missing:
+                del subscriber.missing[issue.newspaper_id]
+
+    @_reads
+    def missing_issue_parts(self, subscriber, positions: bool = False) -> List[list]:
+        # [newspaper name, [issue IDs]] of check_missingissues, in the order of the subscriptions and of the issues of
+        # each paper (subscriber.missing is in the order of the releases, so only the missing IDs get sorted)
+        # with positions every part starts with the position of the paper in the subscription list, so the router of a
+        # sharded agency can put the parts of all shards in that order
+        parts = []
+        for position, paper in enumerate(subscriber.newspaper_list):
+            missing = subscriber.missing.get(paper.paper_id)
+            if missing:
+                issue_ids = sorted(missing, key=lambda issue_id: paper.issues.get(issue_id).position)
+                parts.append([position, paper.name, issue_ids] if positions else [paper.name, issue_ids])
+        return parts
 
     def check_missingissues(self, subscriber):
-        undelivered = {}
-        for paper in subscriber.newspaper_list:
-            for issue in paper.issues:
-                if issue.released and (issue not in subscriber.issues_list):  # and ({paper.name: str(issue)} not in undelivered):
-                    undelivered.update({paper.name: str(issue.issue_id) + undelivered.get(' '+paper.name, "")})
-        return f"Undelivered Issues from: {[key+': Issues with ID '+str(value)+' ' for key, value in undelivered.items()]}"
+        return missing_issues_text(self.missing_issue_parts(subscriber))
+
+# bulk imports:
+    @_writes
+    def add_batch(self, add, objects: List) -> Dict[int, str]:
+        # adds the objects with add (e.g. self.add_newspaper) for bulk imports, an object that can't be added doesn't stop
+        # the batch, its error message is returned by its position in the batch instead
+        errors = {}
+        for position, obj in enumerate(objects):
+            try:
+                add(obj)
+            except ValueError as error:
+                errors[position] = str(error)
+        return errors
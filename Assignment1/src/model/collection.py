@@ -0,0 +1,84 @@
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .sorted_keys import SortedKeys
+from .versions import next_version
+
+
+# an insertion ordered collection of model objects, indexed by a key (e.g. the ID)
+# iterating it works like a list, but looking up, replacing and removing an object by its key is O(1)
+# with paged=True the keys are also kept sorted, so a page of the collection can be read in key order (see page)
+# the version changes with every object that is added, replaced or removed (and with touch), for the ETags of the list endpoints
+class Collection(object):
+    __slots__ = ("key", "_items", "_sorted", "version")
+
+    def __init__(self, key: Callable[[object], Hashable], paged: bool = False):
+        self.key = key
+        self._items: Dict[Hashable, object] = {}
+        self._sorted: Optional[SortedKeys] = SortedKeys() if paged else None
+        self.version: int = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._items.values())
+
+    def __contains__(self, item) -> bool:
+        return self.key(item) in self._items
+
+    def __eq__(self, other):
+        if isinstance(other, (Collection, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Collection({list(self)!r})"
+
+    def get(self, key: Hashable) -> Optional[object]:
+        return self._items.get(key)
+
+    def keys(self):
+        return self._items.keys()
+
+    def add(self, item):
+        key = self.key(item)
+        if self._sorted is not None and key not in self._items:
+            self._sorted.add(key)
+        self._items[key] = item
+        self.version = next_version()
+        return item
+
+    def replace(self, item):
+        # dicts keep the position of an existing key, so the updated object keeps its place in the listing
+        return self.add(item)
+
+    def remove(self, item):
+        key = self.key(item)
+        try:
+            del self._items[key]
+        except KeyError:
+            raise ValueError(f"{item!r} is not in the collection") from None
+        if self._sorted is not None:
+            self._sorted.remove(key)
+        self.version = next_version()
+
+    def load(self, items: Dict[Hashable, object]):
+        # replaces the objects with the key -> object dict in one go (for loading a snapshot, see snapshot.py)
+        self._items = items
+        if self._sorted is not None:
+            self._sorted = SortedKeys.from_sorted(sorted(items))
+        self.version = next_version()
+
+    def touch(self):
+        # for changes of an object in the collection (e.g. a released issue)
+        self.version = next_version()
+
+    def page(self, after: Optional[Hashable], limit: int) -> Tuple[List, Optional[Hashable]]:
+        # up to limit objects with a key bigger than after, in key order, and the key to continue after (None at the end)
+        # objects added or removed between two pages don't move the other objects, so no object is skipped or repeated
+        keys = self._sorted.after(after, limit + 1)
+        next_key = keys[limit - 1] if len(keys) > limit else None
+        return [self._items[key] for key in keys[:limit]], next_key
+
+    def to_list(self) -> List:
+        return list(self._items.values())
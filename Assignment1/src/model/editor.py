@@ -3,6 +3,9 @@ from .subscriber import Subscriber
 
 # editor inherits Subscriber
 class Editor(Subscriber):
+    __slots__ = ()
+
     def __init__(self, ID: int, name: str, address: str):
-        super().__init__(ID, name, address)
-        # also inherits issue_list and newspaper_list
+        # also inherits issue_list (here: the issues in his/her supervision, paged for GET /editor/<editor_id>/issues)
+        # and newspaper_list
+        super().__init__(ID, name, address, paged_issues=True)
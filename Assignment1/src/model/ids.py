@@ -0,0 +1,99 @@
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import chain
+from typing import Iterable, List
+
+
+# hands out unique IDs for one collection (newspapers, editors, subscribers or the issues of one newspaper)
+# the used IDs are stored as sorted runs [start, end], so the next free ID is found with a binary search
+# instead of probing id += 1 against a list of all IDs
+class IdAllocator(object):
+    __slots__ = ("_starts", "_ends", "_lock")
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []  # inclusive
+        self._lock = threading.Lock()
+
+    def __contains__(self, ID: int) -> bool:
+        with self._lock:
+            return self._run_of(ID) is not None
+
+    def _run_of(self, ID: int):
+        i = bisect_right(self._starts, ID) - 1
+        if i >= 0 and self._ends[i] >= ID:
+            return i
+        return None
+
+    def _claim(self, ID: int):
+        i = bisect_right(self._starts, ID) - 1
+        if i >= 0 and self._ends[i] >= ID:
+            return  # already used
+        joins_left = i >= 0 and self._ends[i] + 1 == ID
+        joins_right = i + 1 < len(self._starts) and self._starts[i + 1] - 1 == ID
+        if joins_left and joins_right:  # the ID closes the gap between two runs
+            self._ends[i] = self._ends[i + 1]
+            del self._starts[i + 1]
+            del self._ends[i + 1]
+        elif joins_left:
+            self._ends[i] = ID
+        elif joins_right:
+            self._starts[i + 1] = ID
+        else:
+            self._starts.insert(i + 1, ID)
+            self._ends.insert(i + 1, ID)
+
+    def allocate(self, requested: int) -> int:
+        # the requested ID if it is still free, otherwise the next free ID after it (like the old id += 1 loop)
+        with self._lock:
+            i = self._run_of(requested)
+            ID = requested if i is None else self._ends[i] + 1
+            self._claim(ID)
+            return ID
+
+    def claim(self, ID: int):
+        with self._lock:
+            self._claim(ID)
+
+    def claim_all(self, IDs: Iterable[int]):
+        # claims many IDs at once (when a snapshot is loaded), the runs are built in one pass over the sorted IDs
+        with self._lock:
+            starts: List[int] = []
+            ends: List[int] = []
+            for start, end in sorted(chain(zip(self._starts, self._ends), ((ID, ID) for ID in IDs))):
+                if ends and start <= ends[-1] + 1:
+                    if end > ends[-1]:
+                        ends[-1] = end
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._starts, self._ends = starts, ends
+
+    def release(self, ID: int):
+        with self._lock:
+            i = self._run_of(ID)
+            if i is None:
+                return
+            start, end = self._starts[i], self._ends[i]
+            if start == end:
+                del self._starts[i]
+                del self._ends[i]
+            elif ID == start:
+                self._starts[i] = ID + 1
+            elif ID == end:
+                self._ends[i] = ID - 1
+            else:  # split the run
+                self._ends[i] = ID - 1
+                self._starts.insert(i + 1, ID + 1)
+                self._ends.insert(i + 1, end)
+
+    @contextmanager
+    def reserve(self, requested: int):
+        # allocates an ID for a new object and gives it back if creating the object fails
+        ID = self.allocate(requested)
+        try:
+            yield ID
+        except BaseException:
+            self.release(ID)
+            raise
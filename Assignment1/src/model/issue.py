@@ -1,5 +1,9 @@
 
 class Issue(object):
+    # no per-instance __dict__, there can be millions of issues
+    __slots__ = ("issue_id", "releasedate", "released", "editor_id", "pages", "newspaper_id", "_key", "position", "version",
+                 "__weakref__")
+
     def __init__(self, releasedate, issue_id: int = 0, released: bool = False, editor_id: int = None, pages: int = 0, newspaper_id=None):
         self.issue_id: int = issue_id
         self.releasedate = releasedate
@@ -7,6 +11,21 @@ class Issue(object):
         self.editor_id = editor_id
         self.pages: int = pages
         self.newspaper_id = newspaper_id  # the newspaper the issue is from
+        self._key = None
+        self.position: int = 0  # set by the agency, orders the issues of a newspaper the way they were added
+        self.version: int = 0  # set by the agency on every change (for ETags)
+
+    def key(self):
+        # identifies the issue across all newspapers
+        # the tuple is cached, so every subscriber's record of a delivered issue shares the same key object
+        key = self._key
+        if key is None or key[0] != self.newspaper_id or key[1] != self.issue_id:
+            key = self._key = (self.newspaper_id, self.issue_id)
+        return key
+
+    def content_key(self):
+        # the fields that make two issues equal, as a hashable tuple (used to index the issues of a newspaper)
+        return self.releasedate, self.released, self.editor_id, self.pages, self.newspaper_id
 
     def __eq__(self, other):
-        return (self.releasedate == other.releasedate) and (self.released == other.released) and (self.editor_id == other.editor_id) and (self.pages == other.pages) and (self.newspaper_id == other.newspaper_id)
+        return self.content_key() == other.content_key()
@@ -0,0 +1,146 @@
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, without it the aggregates run over the array columns in Python
+    np = None
+
+
+# the issues of one newspaper as parallel columns (one entry per issue in each column), so aggregates like the
+# number of released issues or the pages per editor don't have to visit every Issue object
+# the Issue objects stay the source of truth, the agency writes every change of an issue through to the columns
+class IssueColumns(object):
+    __slots__ = ("newspaper_id", "issue_id", "releasedate", "released", "editor_id", "pages", "_rows")
+
+    def __init__(self, newspaper_id: int):
+        self.newspaper_id = newspaper_id
+        # array.array keeps the numbers unboxed and numpy can read it without copying (np.frombuffer)
+        self.issue_id = array("q")
+        self.releasedate: List = []  # the release dates are strings, nothing to vectorize there
+        self.released = array("b")
+        self.editor_id = array("q")
+        self.pages = array("q")
+        self._rows: Dict[int, int] = {}  # issue ID -> row
+
+    @classmethod
+    def build(cls, newspaper_id: int, issues: Iterable):
+        columns = cls(newspaper_id)
+        for issue in issues:
+            columns.put(issue)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, issue_id: int) -> bool:
+        return issue_id in self._rows
+
+    def put(self, issue):
+        # adds the issue or overwrites its row with the current values
+        row = self._rows.get(issue.issue_id)
+        if row is None:
+            self._rows[issue.issue_id] = len(self.issue_id)
+            self.issue_id.append(issue.issue_id)
+            self.releasedate.append(issue.releasedate)
+            self.released.append(bool(issue.released))
+            self.editor_id.append(issue.editor_id or 0)
+            self.pages.append(issue.pages or 0)
+        else:
+            self.releasedate[row] = issue.releasedate
+            self.released[row] = bool(issue.released)
+            self.editor_id[row] = issue.editor_id or 0
+            self.pages[row] = issue.pages or 0
+
+    def remove(self, issue_id: int):
+        # the last row is moved into the gap, so removing doesn't shift the rows behind it
+        row = self._rows.pop(issue_id)
+        last = len(self.issue_id) - 1
+        if row != last:
+            self._rows[self.issue_id[last]] = row
+            for column in (self.issue_id, self.releasedate, self.released, self.editor_id, self.pages):
+                column[row] = column[last]
+        for column in (self.issue_id, self.releasedate, self.released, self.editor_id, self.pages):
+            column.pop()
+
+    def view(self, issue_id: int):
+        return IssueView(self, issue_id) if issue_id in self._rows else None
+
+    def views(self) -> Iterator:
+        # in row order, which is the insertion order until an issue is removed
+        for issue_id in self.issue_id:
+            yield IssueView(self, issue_id)
+
+# aggregates:
+    def released_count(self) -> int:
+        if np is not None and self.released:
+            return int(np.count_nonzero(np.frombuffer(self.released, dtype=np.int8)))
+        return sum(self.released)
+
+    def pages_total(self, released_only: bool = False) -> int:
+        if not self.pages:
+            return 0
+        if np is not None:
+            pages = np.frombuffer(self.pages, dtype=np.int64)
+            if released_only:
+                pages = pages[np.frombuffer(self.released, dtype=np.int8).astype(bool)]
+            return int(pages.sum())
+        if released_only:
+            return sum(pages for pages, released in zip(self.pages, self.released) if released)
+        return sum(self.pages)
+
+    def editor_workload(self) -> Dict[int, Dict[str, int]]:
+        # editor ID -> number of issues and pages the editor supervises (issues without an editor are left out)
+        if not self.editor_id:
+            return {}
+        if np is not None:
+            editor_ids, rows = np.unique(np.frombuffer(self.editor_id, dtype=np.int64), return_inverse=True)
+            issues = np.bincount(rows)
+            pages = np.bincount(rows, weights=np.frombuffer(self.pages, dtype=np.int64))
+            return {int(editor_id): {"issues": int(issues[i]), "pages": int(pages[i])}
+                    for i, editor_id in enumerate(editor_ids) if editor_id != 0}
+        issues = Counter(self.editor_id)
+        pages = Counter()
+        for editor_id, issue_pages in zip(self.editor_id, self.pages):
+            pages[editor_id] += issue_pages
+        return {editor_id: {"issues": count, "pages": pages[editor_id]}
+                for editor_id, count in issues.items() if editor_id != 0}
+
+
+# reads one row of the columns, with the same attributes as an Issue (so it can be marshalled with the issue_model)
+class IssueView(object):
+    __slots__ = ("_columns", "issue_id")
+
+    def __init__(self, columns: IssueColumns, issue_id: int):
+        self._columns = columns
+        self.issue_id = issue_id
+
+    @property
+    def newspaper_id(self):
+        return self._columns.newspaper_id
+
+    @property
+    def releasedate(self):
+        return self._columns.releasedate[self._columns._rows[self.issue_id]]
+
+    @property
+    def released(self) -> bool:
+        return bool(self._columns.released[self._columns._rows[self.issue_id]])
+
+    @property
+    def editor_id(self) -> int:
+        return self._columns.editor_id[self._columns._rows[self.issue_id]]
+
+    @property
+    def pages(self) -> int:
+        return self._columns.pages[self._columns._rows[self.issue_id]]
+
+    def key(self):
+        return self.newspaper_id, self.issue_id
+
+    def content_key(self):
+        return self.releasedate, self.released, self.editor_id, self.pages, self.newspaper_id
+
+    def __eq__(self, other):
+        return self.content_key() == other.content_key()
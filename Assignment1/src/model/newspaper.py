@@ -1,17 +1,33 @@
-from typing import List
+from operator import attrgetter
+from typing import Dict, List, Optional
 from flask_restx import Model
 
+from .collection import Collection
+from .ids import IdAllocator
 from .issue import Issue
+from .issue_columns import IssueColumns
 
 
 class Newspaper(object):
+    __slots__ = ("paper_id", "name", "frequency", "price", "issues", "issue_contents", "issue_ids", "subscribers", "columns",
+                 "issues_added", "version", "__weakref__")
+
     def __init__(self, paper_id: int, name: str, frequency: int, price: float):
         self.paper_id: int = paper_id
         self.name: str = name
         self.frequency: int = frequency  # the issue frequency (in days)
         self.price: float = price  # the monthly price
-        self.issues: List[Issue] = []
-        self.subscribers = []
+        self.issues: Collection = Collection(attrgetter("issue_id"), paged=True)  # indexed by issue ID
+        self.issue_contents: Dict[tuple, int] = {}  # Issue.content_key() -> number of issues with that content
+        self.issue_ids = IdAllocator()
+        self.issues_added: int = 0  # the position of the next added issue (see Issue.position)
+        self.subscribers: Collection = Collection(attrgetter("ID"))  # indexed by subscriber ID
+        self.columns: Optional[IssueColumns] = None  # only set if the agency keeps columnar issue data
+        self.version: int = 0  # set by the agency on every change (for ETags)
+
+    def content_key(self):
+        # the fields that make two newspapers equal, as a hashable tuple (used to detect duplicates)
+        return self.name, self.frequency, self.price
 
     def __eq__(self, other):
-        return (self.name == other.name) and (self.frequency == other.frequency) and (self.price == other.price)
+        return self.content_key() == other.content_key()
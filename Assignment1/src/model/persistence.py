@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from .agency import Agency
+from .editor import Editor
+from .issue import Issue
+from .newspaper import Newspaper
+from .snapshot import dump_snapshot, load_snapshot
+from .subscriber import Subscriber
+from .wal import WriteAheadLog, read_log
+
+
+# the data directory of an agency:
+#   snapshot-<n>.snap  the whole state after the first n log records (see snapshot.py, the latest one is loaded at startup)
+#   log-<n>.wal        the log records after the first n (see wal.py), replayed on top of the snapshot
+# every snapshot starts a new log segment, the older snapshots and segments are removed once it is written
+class Persistence(object):
+    def __init__(self, directory: str, fsync: str = "always", snapshot_every: int = 1_000_000, interval: float = 1.0):
+        self.directory = directory
+        self.fsync = fsync
+        self.interval = interval
+        self.snapshot_every = snapshot_every  # log records after which a new snapshot is taken
+        self.records = 0  # log records since the first start (so the number of the last record)
+        self.snapshot_records = 0  # log records included in the latest snapshot
+        self.agency: Optional[Agency] = None
+        self.wal: Optional[WriteAheadLog] = None
+        self._snapshotting = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, prefix: str, records: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{prefix}{records:020d}{suffix}")
+
+    def _files(self, prefix: str, suffix: str) -> List[Tuple[int, str]]:
+        pattern = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$")
+        found = [(int(match.group(1)), os.path.join(self.directory, name))
+                 for name in os.listdir(self.directory) for match in [pattern.match(name)] if match]
+        return sorted(found)
+
+    def open(self, agency: Agency):
+        # loads the latest snapshot and replays the log after it into the (empty) agency,
+        # from then on the changes of the agency are logged (agency.log)
+        snapshots = self._files("snapshot-", ".snap")
+        if snapshots:
+            self.snapshot_records, path = snapshots[-1]
+            load_snapshot(agency, path)
+        self.records = self.snapshot_records
+        # segments before the snapshot are left over from a crash between writing the snapshot and removing them
+        segments = [(start, path) for start, path in self._files("log-", ".wal") if start >= self.snapshot_records]
+        with agency.lock.write():  # once for the whole replay, the agency methods only count up the reentrant lock
+            for i, (start, path) in enumerate(segments):
+                if start != self.records:
+                    raise ValueError(f"{path} doesn't continue the log, {self.records} records were read before it")
+                for record in read_log(path, truncate=i == len(segments) - 1):
+                    replay(agency, record)
+                    self.records += 1
+        self.wal = WriteAheadLog(self._path("log-", self.records, ".wal"), self.fsync, self.interval)
+        _fsync_directory(self.directory)
+        self.agency = agency
+        agency.log = self
+
+    def append(self, record: list):
+        # called by the agency while it holds its write lock, so the records are numbered in the order of the changes
+        self.records += 1
+        self.wal.append(record)
+
+    def commit(self):
+        self.wal.commit()
+        if self.records - self.snapshot_records >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        # the state is written under the read lock of the agency (the changes wait), to a temporary file that
+        # replaces the snapshot only once it is complete
+        if not self._snapshotting.acquire(blocking=False):
+            return  # another thread is taking one
+        try:
+            with self.agency.lock.read():
+                self.wal.close()
+                records = self.records
+                self.wal = WriteAheadLog(self._path("log-", records, ".wal"), self.fsync, self.interval)
+                _fsync_directory(self.directory)
+                path = self._path("snapshot-", records, ".snap")
+                with open(path + ".tmp", "wb") as file:
+                    dump_snapshot(self.agency, file)
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_directory(self.directory)
+            self.snapshot_records = records
+            for start, old in self._files("snapshot-", ".snap") + self._files("log-", ".wal"):
+                if start < records:
+                    os.remove(old)
+        finally:
+            self._snapshotting.release()
+
+    def close(self):
+        if self.agency is not None:
+            self.agency.log = None
+        self.wal.close()
+
+
+def _fsync_directory(directory: str):
+    # makes new and renamed files in the directory durable (not possible on every platform, e.g. Windows)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# log records: the agency method that made the change, called again with the objects looked up by their IDs
+def _issue(agency: Agency, paper_id: int, issue_id: int) -> Issue:
+    return agency.get_newspaper(paper_id).issues.get(issue_id)
+
+
+def _deliver(agency: Agency, subscriber_id: int, paper_id: int, issue_id: int):
+    # the change deliver_issue makes (it was checked when it was logged), without the jsonify of its answer
+    # (the most frequent record, Persistence.open holds the write lock during the replay)
+    agency._deliver(agency.get_subscriber(subscriber_id), _issue(agency, paper_id, issue_id))
+
+
+_REPLAY = {
+    "add_newspaper": lambda agency, *fields: agency.add_newspaper(Newspaper(*fields)),
+    "update_newspaper": lambda agency, paper_id, *fields: agency.update_newspaper(agency.get_newspaper(paper_id),
+                                                                                  Newspaper(paper_id, *fields)),
+    "remove_newspaper": lambda agency, paper_id: agency.remove_newspaper(agency.get_newspaper(paper_id)),
+    "add_issue": lambda agency, paper_id, issue_id, releasedate, released, editor_id, pages, newspaper_id:
+        agency.add_issue(agency.get_newspaper(paper_id), Issue(releasedate, issue_id, released, editor_id, pages, newspaper_id)),
+    "update_issue": lambda agency, paper_id, old_id, issue_id, releasedate, released, editor_id, pages, newspaper_id:
+        agency.update_issue(agency.get_newspaper(paper_id), _issue(agency, paper_id, old_id),
+                            Issue(releasedate, issue_id, released, editor_id, pages, newspaper_id)),
+    "remove_issue": lambda agency, paper_id, issue_id: agency.remove_issue(agency.get_newspaper(paper_id),
+                                                                           _issue(agency, paper_id, issue_id)),
+    "release_issue": lambda agency, paper_id, issue_id: agency.release_issue(_issue(agency, paper_id, issue_id)),
+    "add_editor_to_issue": lambda agency, paper_id, issue_id, editor_id:
+        agency.add_editor_to_issue(_issue(agency, paper_id, issue_id), agency.get_editor(editor_id)),
+    "deliver_issue": _deliver,
+    "deliver_issue_to_subscribers": lambda agency, paper_id, issue_id, subscriber_ids:
+        agency.deliver_issue_to_subscribers(_issue(agency, paper_id, issue_id), agency.get_newspaper(paper_id), subscriber_ids),
+    "add_editor": lambda agency, *fields: agency.add_editor(Editor(*fields)),
+    "update_editor": lambda agency, ID, *fields: agency.update_editor(agency.get_editor(ID), Editor(ID, *fields)),
+    "remove_editor": lambda agency, ID: agency.remove_editor(agency.get_editor(ID)),
+    "add_subscriber": lambda agency, *fields: agency.add_subscriber(Subscriber(*fields)),
+    "update_subscriber": lambda agency, ID, *fields: agency.update_subscriber(agency.get_subscriber(ID), Subscriber(ID, *fields)),
+    "remove_subscriber": lambda agency, ID: agency.remove_subscriber(agency.get_subscriber(ID)),
+    "subscribe_to_paper": lambda agency, subscriber_id, paper_id:
+        agency.subscribe_to_paper(agency.get_subscriber(subscriber_id), agency.get_newspaper(paper_id)),
+}
+
+
+def replay(agency: Agency, record: list):
+    operation, *values = record
+    _REPLAY[operation](agency, *values)
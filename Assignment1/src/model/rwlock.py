@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from threading import Condition, Lock, get_ident
+from typing import Dict, Optional
+
+
+# many readers or one writer at a time
+# reentrant: a thread can take the read or write lock again while it holds it, and a writer can also read
+# (a reader can't become a writer, two readers waiting for each other to leave would deadlock, so that raises)
+# writers are preferred: new readers wait while a writer is waiting, so steady GET traffic can't starve the writers
+class ReadWriteLock(object):
+    __slots__ = ("_condition", "_readers", "_writer", "_writes", "_waiting_writers")
+
+    def __init__(self):
+        self._condition = Condition(Lock())
+        self._readers: Dict[int, int] = {}  # thread ident -> how often it holds the read lock
+        self._writer: Optional[int] = None  # thread ident of the writer
+        self._writes = 0  # how often the writer holds the write lock
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        me = get_ident()
+        with self._condition:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = get_ident()
+        with self._condition:
+            count = self._readers[me] - 1
+            if count:
+                self._readers[me] = count
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self):
+        me = get_ident()
+        if self._writer == me:  # only this thread changes the writer and the count while it holds the lock
+            self._writes += 1
+            return
+        with self._condition:
+            if me in self._readers:
+                raise RuntimeError("A thread holding the read lock can't take the write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self):
+        if self._writes > 1:
+            self._writes -= 1
+            return
+        with self._condition:
+            self._writes = 0
+            self._writer = None
+            self._condition.notify_all()
+
+    def is_writing(self) -> bool:
+        # if the calling thread holds the write lock
+        return self._writer == get_ident()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
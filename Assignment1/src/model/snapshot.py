@@ -0,0 +1,334 @@
+import gc
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import accumulate, filterfalse, islice
+from operator import methodcaller
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from .agency import Agency
+from .editor import Editor
+from .issue import Issue
+from .newspaper import Newspaper
+from .subscriber import Subscriber
+from .versions import next_version
+
+# binary snapshots of the whole agency state, loaded at startup (see persistence.py)
+#
+# the file starts with MAGIC, the format and a table of sections (offset and size in bytes of each), the sections are
+# fixed-width little-endian records, so the loader reads them straight from a memory map without parsing:
+#   strings               all distinct strings once (names, addresses, release dates), the records refer to them by
+#                         their index, index 0 is None. the text is UTF-8, the offsets count characters
+#   newspapers, issues, editors, subscribers   one record per object, in the order of their collections
+#   paper issues, editor issues, subscriptions, deliveries, paper subscribers
+#                         the relations as indexes into the issue, newspaper and subscriber records, every object
+#                         record says how many of the next entries belong to it
+#   missing, received, special issues, paper editors   the running totals and indexes of the agency, as groups
+#                         (e.g. a paper and its number of editors) followed by their entries
+# an issue that is in several lists (a newspaper, its editor and every subscriber who received it) is stored once and
+# is one object again after loading, also the removed issues that are only left in the lists of subscribers
+MAGIC = b"PAPERBAK"
+SNAPSHOT_FORMAT = 2  # 1 was the JSON lines format of the first snapshots
+
+_HEADER = struct.Struct("<8sII")  # magic, format, number of sections
+_SECTION = struct.Struct("<QQ")  # offset, size
+_NEWSPAPER = struct.Struct("<qIqdBII")  # paper_id, name, frequency, price, flags, issues, subscribers
+_ISSUE = struct.Struct("<qqIBqq")  # newspaper_id, issue_id, releasedate, flags, editor_id, pages
+_EDITOR = struct.Struct("<qIII")  # ID, name, address, issues
+_SUBSCRIBER = struct.Struct("<qIIdBIIIII")  # ID, name, address, monthly_cost, flags, subscriptions, deliveries, missing,
+                                             # received, special issues
+_GROUP = struct.Struct("<qI")  # paper_id, number of entries (missing and special issues of a subscriber, editors of a paper)
+_COUNT = struct.Struct("<qq")  # paper_id or editor ID, number of issues (received, paper editors)
+
+# flags
+_INT = 1  # price or monthly cost is an int (the sums start at 0), so it comes back as one
+_RELEASED = 1
+_NO_EDITOR = 2  # editor_id is None
+_NO_NEWSPAPER = 4  # newspaper_id is None
+
+(_STRING_OFFSETS, _STRING_TEXT, _NEWSPAPERS, _ISSUES, _PAPER_ISSUES, _EDITORS, _EDITOR_ISSUES, _SUBSCRIBERS,
+ _SUBSCRIPTIONS, _DELIVERIES, _MISSING, _MISSING_IDS, _RECEIVED_COUNTS, _SPECIAL, _SPECIAL_IDS, _PAPER_SUBSCRIBERS,
+ _PAPER_EDITORS, _PAPER_EDITOR_COUNTS) = range(18)
+_SECTIONS = 18
+
+
+def dump_snapshot(agency: Agency, file: BinaryIO):
+    # writes the state of the agency (the caller holds its read lock)
+    strings: Dict[object, int] = {None: 0}
+    issues: List[Issue] = []
+    issue_indexes: Dict[int, int] = {}  # id() of the issue -> its record
+
+    def string(value) -> int:
+        index = strings.get(value)
+        if index is None:
+            if not isinstance(value, str):
+                raise ValueError(f"Can't write {value!r} to a snapshot, only strings")
+            index = strings[value] = len(strings)
+        return index
+
+    def issue_index(issue: Issue) -> int:
+        index = issue_indexes.get(id(issue))
+        if index is None:
+            index = issue_indexes[id(issue)] = len(issues)
+            issues.append(issue)
+        return index
+
+    def issue_indexes_of(listed) -> List[int]:
+        try:  # usually all issues are known already (from their newspaper), then the lookups run without a Python loop
+            return list(map(issue_indexes.__getitem__, map(id, listed)))
+        except KeyError:
+            return [issue_index(issue) for issue in listed]
+
+    def flag(value, bit: int) -> int:
+        return bit if isinstance(value, int) else 0
+
+    sections = [bytearray() for _ in range(_SECTIONS)]
+    paper_issues, editor_issues = array("I"), array("I")
+    subscriptions, deliveries, paper_subscribers = array("I"), array("I"), array("I")
+    missing_ids, special_ids = array("q"), array("q")
+    paper_indexes = {paper.paper_id: i for i, paper in enumerate(agency.newspapers)}
+    subscriber_indexes = {subscriber.ID: i for i, subscriber in enumerate(agency.subscribers)}
+    try:
+        for paper in agency.newspapers:
+            sections[_NEWSPAPERS] += _NEWSPAPER.pack(paper.paper_id, string(paper.name), paper.frequency, paper.price,
+                                                     flag(paper.price, _INT), len(paper.issues), len(paper.subscribers))
+            paper_issues.extend(issue_indexes_of(paper.issues))
+            paper_subscribers.extend(map(subscriber_indexes.__getitem__, paper.subscribers.keys()))
+        for editor in agency.editors:
+            sections[_EDITORS] += _EDITOR.pack(editor.ID, string(editor.name), string(editor.address), len(editor.issues_list))
+            editor_issues.extend(issue_indexes_of(editor.issues_list))
+        for subscriber in agency.subscribers:
+            sections[_SUBSCRIBERS] += _SUBSCRIBER.pack(
+                subscriber.ID, string(subscriber.name), string(subscriber.address), subscriber.monthly_cost,
+                flag(subscriber.monthly_cost, _INT), len(subscriber.newspaper_list), len(subscriber.issues_list),
+                len(subscriber.missing), len(subscriber.received), len(subscriber.special_issues))
+            subscriptions.extend(map(paper_indexes.__getitem__, subscriber.newspaper_list.keys()))
+            deliveries.extend(issue_indexes_of(subscriber.issues_list))
+            for paper_id, issue_ids in subscriber.missing.items():
+                sections[_MISSING] += _GROUP.pack(paper_id, len(issue_ids))
+                missing_ids.extend(issue_ids)
+            for paper_id, count in subscriber.received.items():
+                sections[_RECEIVED_COUNTS] += _COUNT.pack(paper_id, count)
+            for paper_id, issue_ids in subscriber.special_issues.items():
+                sections[_SPECIAL] += _GROUP.pack(paper_id, len(issue_ids))
+                special_ids.extend(issue_ids)
+        for paper_id, editors in agency.paper_editors.items():
+            sections[_PAPER_EDITORS] += _GROUP.pack(paper_id, len(editors))
+            for editor_id, count in editors.items():
+                sections[_PAPER_EDITOR_COUNTS] += _COUNT.pack(editor_id, count)
+        for issue in issues:
+            flags = (_RELEASED if issue.released else 0) | (_NO_EDITOR if issue.editor_id is None else 0) | \
+                    (_NO_NEWSPAPER if issue.newspaper_id is None else 0)
+            sections[_ISSUES] += _ISSUE.pack(issue.newspaper_id or 0, issue.issue_id, string(issue.releasedate), flags,
+                                             issue.editor_id or 0, issue.pages)
+    except KeyError as error:
+        raise ValueError(f"Can't write a snapshot, {error} is listed but not in the agency") from None
+    except struct.error as error:
+        raise ValueError(f"Can't write a snapshot: {error}") from None
+
+    text = list(strings)[1:]
+    sections[_STRING_OFFSETS] = _little_endian(array("I", accumulate(map(len, text), initial=0)))
+    sections[_STRING_TEXT] = "".join(text).encode("utf-8", "surrogatepass")
+    for index, values in [(_PAPER_ISSUES, paper_issues), (_EDITOR_ISSUES, editor_issues), (_SUBSCRIPTIONS, subscriptions),
+                          (_DELIVERIES, deliveries), (_MISSING_IDS, missing_ids), (_SPECIAL_IDS, special_ids),
+                          (_PAPER_SUBSCRIBERS, paper_subscribers)]:
+        sections[index] = _little_endian(values)
+
+    offset = _HEADER.size + _SECTION.size * _SECTIONS
+    table = []
+    for section in sections:
+        offset += -offset % 8  # the sections start 8 byte aligned, so the memory map can be read as arrays
+        table.append(_SECTION.pack(offset, len(section)))
+        offset += len(section)
+    file.write(_HEADER.pack(MAGIC, SNAPSHOT_FORMAT, _SECTIONS) + b"".join(table))
+    position = _HEADER.size + _SECTION.size * _SECTIONS
+    for section in sections:
+        file.write(bytes(-position % 8))
+        position += -position % 8
+        file.write(section)
+        position += len(section)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Sections(object):
+    # the sections of a memory mapped snapshot, the views are released before the map is closed
+    def __init__(self, data: mmap.mmap):
+        self._data = memoryview(data)
+        self._views: List[memoryview] = [self._data]
+        magic, snapshot_format, count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a snapshot file")
+        if snapshot_format != SNAPSHOT_FORMAT or count != _SECTIONS:
+            raise ValueError(f"Unknown snapshot format {snapshot_format}")
+        self._table = [_SECTION.unpack_from(data, _HEADER.size + i * _SECTION.size) for i in range(count)]
+        if any(offset + size > len(data) for offset, size in self._table):
+            raise ValueError("The snapshot file is truncated")
+
+    def bytes(self, section: int) -> memoryview:
+        offset, size = self._table[section]
+        view = self._data[offset:offset + size]
+        self._views.append(view)
+        return view
+
+    def numbers(self, section: int, typecode: str):
+        # the section as an array of numbers (on big-endian machines a swapped copy)
+        view = self.bytes(section)
+        if sys.byteorder != "little":
+            values = array(typecode, view)
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def records(self, section: int, layout: struct.Struct) -> Iterator[tuple]:
+        return layout.iter_unpack(self.bytes(section))
+
+    def release(self):
+        for view in reversed(self._views):
+            view.release()
+
+
+def load_snapshot(agency: Agency, path: str):
+    # fills the (empty) agency and its indexes with the objects of the snapshot, every collection is built in one go
+    # (instead of the add_* methods, which check and index every object on its own)
+    if len(agency.newspapers) or len(agency.editors) or len(agency.subscribers):
+        raise ValueError("A snapshot can only be loaded into an empty agency")
+    with open(path, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    sections = _Sections(data)
+    # the load creates millions of objects and no garbage, the collections the garbage collector would start on the way
+    # (each visiting all objects created so far) would take about as long as the load itself
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        _load(agency, sections)
+    finally:
+        if collecting:
+            gc.enable()
+    sections.release()
+    data.close()  # (after an error the map is closed once the views of the failed load are gone)
+    if agency.columnar_issues:
+        agency.enable_issue_columns()
+
+
+def _load(agency: Agency, sections: _Sections):
+    version = next_version()  # all loaded objects get the same version, every change after the load a newer one
+    offsets = sections.numbers(_STRING_OFFSETS, "I")
+    text = str(sections.bytes(_STRING_TEXT), "utf-8", "surrogatepass")
+    strings: List = [None]
+    strings.extend(map(text.__getitem__, map(slice, offsets[:-1], offsets[1:])))
+
+    issues: List[Issue] = []
+    for newspaper_id, issue_id, releasedate, flags, editor_id, pages in sections.records(_ISSUES, _ISSUE):
+        issue = Issue(strings[releasedate], issue_id, bool(flags & _RELEASED), None if flags & _NO_EDITOR else editor_id,
+                      pages, None if flags & _NO_NEWSPAPER else newspaper_id)
+        issue.version = version
+        issues.append(issue)
+    issue_pairs = [(issue.key(), issue) for issue in issues]  # the key of Issue.key() indexed lists, with the issue
+
+    papers: List[Newspaper] = []
+    paper_counts: List[int] = []  # the number of subscribers of each newspaper
+    paper_issues = sections.numbers(_PAPER_ISSUES, "I")
+    start = 0
+    for paper_id, name, frequency, price, flags, issue_count, subscriber_count in sections.records(_NEWSPAPERS, _NEWSPAPER):
+        paper = Newspaper(paper_id, strings[name], frequency, int(price) if flags & _INT else price)
+        listed = [issues[i] for i in paper_issues[start:start + issue_count]]
+        start += issue_count
+        paper.issues.load({issue.issue_id: issue for issue in listed})
+        for position, issue in enumerate(listed):
+            issue.position = position
+        paper.issues_added = len(listed)
+        paper.issue_ids.claim_all(paper.issues.keys())
+        paper.issue_contents.update(Counter(map(Issue.content_key, listed)))
+        paper.version = version
+        papers.append(paper)
+        paper_counts.append(subscriber_count)
+    paper_pairs = [(paper.paper_id, paper) for paper in papers]
+
+    editors: List[Editor] = []
+    editor_issues = sections.numbers(_EDITOR_ISSUES, "I")
+    start = 0
+    for ID, name, address, issue_count in sections.records(_EDITORS, _EDITOR):
+        editor = Editor(ID, strings[name], strings[address])
+        editor.issues_list.load(dict(map(issue_pairs.__getitem__, editor_issues[start:start + issue_count])))
+        start += issue_count
+        editor.version = version
+        editors.append(editor)
+
+    subscribers: List[Subscriber] = []
+    subscriptions = sections.numbers(_SUBSCRIPTIONS, "I")
+    deliveries = sections.numbers(_DELIVERIES, "I")
+    missing, missing_ids = sections.records(_MISSING, _GROUP), sections.numbers(_MISSING_IDS, "q")
+    special, special_ids = sections.records(_SPECIAL, _GROUP), sections.numbers(_SPECIAL_IDS, "q")
+    received = sections.records(_RECEIVED_COUNTS, _COUNT)
+    subscription, delivery, missing_start, special_start = 0, 0, 0, 0
+    for (ID, name, address, monthly_cost, flags, subscription_count, delivery_count, missing_count, received_count,
+         special_count) in sections.records(_SUBSCRIBERS, _SUBSCRIBER):
+        subscriber = Subscriber(ID, strings[name], strings[address])
+        if subscription_count:
+            subscriber.newspaper_list.load(
+                dict(map(paper_pairs.__getitem__, subscriptions[subscription:subscription + subscription_count])))
+            subscription += subscription_count
+        if delivery_count:
+            subscriber.issues_list.load(dict(map(issue_pairs.__getitem__, deliveries[delivery:delivery + delivery_count])))
+            delivery += delivery_count
+        if missing_count:
+            subscriber.missing, missing_start = _groups(missing, missing_count, missing_ids, missing_start)
+            for paper_id, issue_ids in subscriber.missing.items():  # (so are the undelivered counts of the papers)
+                agency.paper_undelivered[paper_id] = agency.paper_undelivered.get(paper_id, 0) + len(issue_ids)
+        if received_count:
+            subscriber.received = dict(islice(received, received_count))
+            for paper_id in subscriber.received:  # (the receivers of the papers are derived from the counts)
+                agency.paper_receivers.setdefault(paper_id, {})[ID] = None
+        if special_count:
+            subscriber.special_issues, special_start = _groups(special, special_count, special_ids, special_start)
+        subscriber.monthly_cost = int(monthly_cost) if flags & _INT else monthly_cost
+        subscriber.version = version
+        subscribers.append(subscriber)
+    subscriber_pairs = [(subscriber.ID, subscriber) for subscriber in subscribers]
+    # the deliveries of removed issues (not in the issue list of their newspaper), their IDs stay taken
+    papers_by_id = dict(paper_pairs)
+    for i in filterfalse(set(paper_issues).__contains__, deliveries):
+        newspaper_id, issue_id = issues[i].key()
+        paper = papers_by_id.get(newspaper_id)
+        if paper is None or issue_id not in paper.issues.keys():
+            removed = agency.removed_deliveries.setdefault(newspaper_id, {})
+            removed[issue_id] = removed.get(issue_id, 0) + 1
+    for paper_id, removed in agency.removed_deliveries.items():
+        if paper_id in papers_by_id:
+            papers_by_id[paper_id].issue_ids.claim_all(removed)
+
+    paper_subscribers = sections.numbers(_PAPER_SUBSCRIBERS, "I")
+    start = 0
+    for paper, subscriber_count in zip(papers, paper_counts):
+        paper.subscribers.load(dict(map(subscriber_pairs.__getitem__, paper_subscribers[start:start + subscriber_count])))
+        start += subscriber_count
+    counts = sections.records(_PAPER_EDITOR_COUNTS, _COUNT)
+    for paper_id, editor_count in sections.records(_PAPER_EDITORS, _GROUP):
+        agency.paper_editors[paper_id] = dict(islice(counts, editor_count))
+
+    for collection, ids, contents, objects in [
+            (agency.newspapers, agency.newspaper_ids, agency.newspaper_contents, papers),
+            (agency.editors, agency.editor_ids, agency.editor_contents, editors),
+            (agency.subscribers, agency.subscriber_ids, agency.subscriber_contents, subscribers)]:
+        collection.load(dict(zip(map(collection.key, objects), objects)))
+        ids.claim_all(collection.keys())
+        contents.update(Counter(map(methodcaller("content_key"), objects)))
+
+
+def _groups(groups: Iterator[tuple], count: int, ids, start: int) -> Tuple[Dict[int, Dict[int, None]], int]:
+    # the next count groups (paper_id -> issue IDs) of a subscriber, and where the issue IDs of the next one start
+    result = {}
+    for paper_id, length in islice(groups, count):
+        result[paper_id] = dict.fromkeys(ids[start:start + length])
+        start += length
+    return result, start
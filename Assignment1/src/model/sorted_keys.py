@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Hashable, List, Optional
+
+
+# the keys of a collection in sorted order, to find the keys after a given key (a page) with a binary search
+# the keys are kept in blocks of a few hundred, so adding or removing a key only shifts the keys of one block
+class SortedKeys(object):
+    __slots__ = ("_blocks", "_maxes")
+
+    BLOCK_SIZE = 512
+
+    def __init__(self):
+        self._blocks: List[list] = []
+        self._maxes: List = []  # the largest key of each block
+
+    @classmethod
+    def from_sorted(cls, keys: List[Hashable]):
+        # all keys at once (already sorted and unique), cut into full blocks
+        sorted_keys = cls()
+        sorted_keys._blocks = [keys[i:i + cls.BLOCK_SIZE] for i in range(0, len(keys), cls.BLOCK_SIZE)]
+        sorted_keys._maxes = [block[-1] for block in sorted_keys._blocks]
+        return sorted_keys
+
+    def add(self, key: Hashable):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        if key > self._maxes[-1]:  # bigger than all keys (e.g. the next ID), appended to the last block
+            i = len(self._blocks) - 1
+            block = self._blocks[i]
+            block.append(key)
+        else:
+            i = bisect_left(self._maxes, key)
+            block = self._blocks[i]
+            insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [block[self.BLOCK_SIZE - 1], block[-1]]
+
+    def remove(self, key: Hashable):
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def after(self, key: Optional[Hashable], limit: int) -> list:
+        # up to limit keys that are bigger than key (from the start if key is None)
+        if key is None:
+            i, j = 0, 0
+        else:
+            i = bisect_right(self._maxes, key)
+            if i == len(self._blocks):
+                return []
+            j = bisect_right(self._blocks[i], key)
+        keys = self._blocks[i][j:j + limit] if i < len(self._blocks) else []
+        for block in self._blocks[i + 1:i + 1 + limit]:  # not more blocks than keys that are still needed
+            if len(keys) >= limit:
+                break
+            keys.extend(block[:limit - len(keys)])
+        return keys
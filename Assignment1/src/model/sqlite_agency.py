@@ -0,0 +1,978 @@
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from operator import attrgetter
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from flask import jsonify
+
+from .agency import Agency
+from .editor import Editor
+from .ids import IdAllocator
+from .issue import Issue
+from .newspaper import Newspaper
+from .subscriber import Subscriber
+
+# the tables of a SqliteAgency. the data columns have no type (no affinity), so ints, floats and strings come back as
+# they were stored. every table has a seq column in insertion order, the lists are read in that order (like the
+# insertion ordered Collections of the Agency). a removed issue (or the issues of a removed newspaper) is deleted
+# with its row in the list of its editor, unless subscribers received it: then it stays (with paper_id NULL) in their
+# lists and its ID isn't handed out again until the last of them is removed (like Agency.removed_deliveries)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters VALUES ('version', 0), ('newspapers', 0), ('editors', 0), ('subscribers', 0);
+
+CREATE TABLE IF NOT EXISTS newspapers (seq INTEGER PRIMARY KEY AUTOINCREMENT, paper_id NOT NULL UNIQUE, name, frequency,
+    price, version INTEGER, issues_version INTEGER, subscribers_version INTEGER);
+CREATE INDEX IF NOT EXISTS newspaper_contents ON newspapers (name, frequency, price);
+
+CREATE TABLE IF NOT EXISTS issues (seq INTEGER PRIMARY KEY AUTOINCREMENT, paper_id, newspaper_id, issue_id, releasedate,
+    released INTEGER NOT NULL, editor_id, pages, version INTEGER);
+CREATE UNIQUE INDEX IF NOT EXISTS issues_of_papers ON issues (paper_id, issue_id) WHERE paper_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS issue_contents ON issues (paper_id, releasedate);
+CREATE INDEX IF NOT EXISTS removed_issues ON issues (newspaper_id, issue_id) WHERE paper_id IS NULL;
+
+CREATE TABLE IF NOT EXISTS editors (seq INTEGER PRIMARY KEY AUTOINCREMENT, ID NOT NULL UNIQUE, name, address,
+    version INTEGER, issues_version INTEGER);
+CREATE INDEX IF NOT EXISTS editor_contents ON editors (name, address);
+CREATE TABLE IF NOT EXISTS editor_issues (seq INTEGER PRIMARY KEY AUTOINCREMENT, editor_id NOT NULL,
+    issue_row INTEGER NOT NULL UNIQUE);
+CREATE INDEX IF NOT EXISTS editor_issues_of_editors ON editor_issues (editor_id);
+CREATE TABLE IF NOT EXISTS paper_editors (seq INTEGER PRIMARY KEY AUTOINCREMENT, paper_id NOT NULL, editor_id NOT NULL,
+    count INTEGER NOT NULL, UNIQUE (paper_id, editor_id));
+
+CREATE TABLE IF NOT EXISTS subscribers (seq INTEGER PRIMARY KEY AUTOINCREMENT, ID NOT NULL UNIQUE, name, address,
+    monthly_cost, version INTEGER);
+CREATE INDEX IF NOT EXISTS subscriber_contents ON subscribers (name, address);
+CREATE TABLE IF NOT EXISTS subscriptions (seq INTEGER PRIMARY KEY AUTOINCREMENT, subscriber_id NOT NULL, paper_id NOT NULL,
+    UNIQUE (subscriber_id, paper_id));
+CREATE INDEX IF NOT EXISTS subscriptions_of_papers ON subscriptions (paper_id);
+CREATE TABLE IF NOT EXISTS deliveries (seq INTEGER PRIMARY KEY AUTOINCREMENT, subscriber_id NOT NULL,
+    issue_row INTEGER NOT NULL, newspaper_id, issue_id, UNIQUE (subscriber_id, newspaper_id, issue_id));
+CREATE INDEX IF NOT EXISTS deliveries_of_issues ON deliveries (issue_row);
+"""
+
+_NEWSPAPER = "n.paper_id, n.name, n.frequency, n.price, n.version"
+_ISSUE = "i.seq, i.issue_id, i.releasedate, i.released, i.editor_id, i.pages, i.newspaper_id, i.version"
+_EDITOR = "e.ID, e.name, e.address, e.version"
+_SUBSCRIBER = "s.ID, s.name, s.address, s.monthly_cost, s.version"
+
+# released issues of the subscribed papers that weren't delivered to the subscriber (the missing issues, set-based)
+_UNDELIVERED = """
+FROM subscriptions t JOIN issues i ON i.paper_id = t.paper_id
+WHERE {} AND i.released AND NOT EXISTS (SELECT 1 FROM deliveries d WHERE d.subscriber_id = t.subscriber_id
+                                        AND d.newspaper_id = i.newspaper_id AND d.issue_id = i.issue_id)
+"""
+# the subscribers of a paper that haven't got an issue (newspaper_id, issue_id) yet
+_WITHOUT_ISSUE = """
+SELECT t.subscriber_id FROM subscriptions t WHERE t.paper_id = ? AND NOT EXISTS (
+    SELECT 1 FROM deliveries d WHERE d.subscriber_id = t.subscriber_id AND d.newspaper_id = ? AND d.issue_id = ?)
+"""
+
+
+# the lock of a SqliteAgency, with the methods of ReadWriteLock: the outermost read or write lock a thread takes is a
+# transaction on a connection of the pool (BEGIN for reading, BEGIN IMMEDIATE for writing, so SQLite serializes the
+# writers of all threads and processes while the readers go on with WAL), the nested ones only count up
+# with the context managers a nested write is a savepoint, so a failing agency method takes back its changes (like the
+# checks of the Agency methods, that come before the changes), a failing outermost write rolls back the transaction
+class _Transactions(object):
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        self._connect = connect
+        self._idle: List[sqlite3.Connection] = []  # the pool, a connection is used by one thread at a time
+        self._idle_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _begin(self, writing: bool):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth:
+            if writing and not local.writing:
+                raise RuntimeError("A thread holding the read lock can't take the write lock")
+            local.depth = depth + 1
+            return
+        with self._idle_lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            if writing:
+                connection.execute("BEGIN IMMEDIATE")
+                # every write transaction gives its changes one new version (for the ETags)
+                local.version = connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'version' "
+                                                   "RETURNING value").fetchall()[0][0]
+            else:
+                connection.execute("BEGIN")
+        except BaseException:
+            self._put_back(connection)
+            raise
+        local.connection, local.writing, local.depth = connection, writing, 1
+
+    def _end(self, failed: bool = False):
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        connection, local.connection = local.connection, None
+        try:
+            connection.execute("COMMIT" if local.writing and not failed else "ROLLBACK")
+        finally:
+            self._put_back(connection)
+
+    def _put_back(self, connection: sqlite3.Connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self._idle_lock:
+            self._idle.append(connection)
+
+    def acquire_read(self):
+        self._begin(False)
+
+    def release_read(self):
+        self._end()
+
+    def acquire_write(self):
+        self._begin(True)
+
+    def release_write(self):
+        self._end()
+
+    def is_writing(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0 and self._local.writing
+
+    @contextmanager
+    def read(self):
+        self._begin(False)
+        try:
+            yield
+        finally:
+            self._end()
+
+    @contextmanager
+    def write(self):
+        self._begin(True)
+        connection = self._local.connection
+        nested = self._local.depth > 1
+        if nested:
+            connection.execute("SAVEPOINT nested")
+        try:
+            yield
+        except BaseException:
+            if nested:
+                connection.execute("ROLLBACK TO nested")
+                connection.execute("RELEASE nested")
+            self._end(failed=True)
+            raise
+        if nested:
+            connection.execute("RELEASE nested")
+        self._end()
+
+    def connection(self) -> sqlite3.Connection:
+        # the connection of the transaction of this thread
+        return self._local.connection
+
+    def version(self) -> int:
+        # the version of the write transaction of this thread
+        return self._local.version
+
+    def close(self):
+        with self._idle_lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle.clear()
+
+
+def _transaction(method):
+    @wraps(method)
+    def in_transaction(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return in_transaction
+
+
+def _consistent(method):
+    @wraps(method)
+    def in_transaction(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return in_transaction
+
+
+# the SQL for one list of objects (the issues of a newspaper, the subscribers of a newspaper, ...), the parameters
+# that select the list (e.g. the paper_id) come first
+class _ListQuery(object):
+    def __init__(self, columns: str, tables: str, where: str, order: str, key_columns: Tuple[str, ...],
+                 key: Callable[[object], Hashable], make: str, version: str):
+        select = f"SELECT {columns} FROM {tables} WHERE {where}"
+        keys = ", ".join(key_columns)
+        self.all = f"{select} ORDER BY {order}"
+        self.get = f"{select} AND " + " AND ".join(f"{column} = ?" for column in key_columns)
+        self.contains = f"SELECT 1 FROM {tables} WHERE {where} AND " + " AND ".join(f"{column} = ?" for column in key_columns)
+        self.count = f"SELECT COUNT(*) FROM {tables} WHERE {where}"
+        self.keys = f"SELECT {keys} FROM {tables} WHERE {where} ORDER BY {order}"
+        self.first_page = f"{select} ORDER BY {keys} LIMIT ?"
+        self.next_page = f"{select} AND ({keys}) > ({', '.join('?' * len(key_columns))}) ORDER BY {keys} LIMIT ?"
+        self.version = version
+        self.compound = len(key_columns) > 1
+        self.key = key
+        self.make = make  # the SqliteAgency method that turns a row into an object
+
+    def key_values(self, key) -> tuple:
+        return tuple(key) if self.compound else (key,)
+
+
+_NEWSPAPERS = _ListQuery(_NEWSPAPER, "newspapers n", "1", "n.seq", ("n.paper_id",), attrgetter("paper_id"),
+                         "_newspaper", "SELECT value FROM counters WHERE name = 'newspapers'")
+_EDITORS = _ListQuery(_EDITOR, "editors e", "1", "e.seq", ("e.ID",), attrgetter("ID"),
+                      "_editor", "SELECT value FROM counters WHERE name = 'editors'")
+_SUBSCRIBERS = _ListQuery(_SUBSCRIBER, "subscribers s", "1", "s.seq", ("s.ID",), attrgetter("ID"),
+                          "_subscriber", "SELECT value FROM counters WHERE name = 'subscribers'")
+_PAPER_ISSUES = _ListQuery(_ISSUE, "issues i", "i.paper_id = ?", "i.seq", ("i.issue_id",), attrgetter("issue_id"),
+                           "_issue", "SELECT issues_version FROM newspapers WHERE paper_id = ?")
+_PAPER_SUBSCRIBERS = _ListQuery(_SUBSCRIBER, "subscriptions t JOIN subscribers s ON s.ID = t.subscriber_id",
+                                "t.paper_id = ?", "t.seq", ("s.ID",), attrgetter("ID"),
+                                "_subscriber", "SELECT subscribers_version FROM newspapers WHERE paper_id = ?")
+_EDITOR_ISSUES = _ListQuery(_ISSUE, "editor_issues a JOIN issues i ON i.seq = a.issue_row", "a.editor_id = ?", "a.seq",
+                            ("i.newspaper_id", "i.issue_id"), Issue.key,
+                            "_issue", "SELECT issues_version FROM editors WHERE ID = ?")
+_SUBSCRIBED_PAPERS = _ListQuery(_NEWSPAPER, "subscriptions t JOIN newspapers n ON n.paper_id = t.paper_id",
+                                "t.subscriber_id = ?", "t.seq", ("n.paper_id",), attrgetter("paper_id"),
+                                "_newspaper", "SELECT version FROM subscribers WHERE ID = ?")
+_DELIVERED_ISSUES = _ListQuery(_ISSUE, "deliveries d JOIN issues i ON i.seq = d.issue_row", "d.subscriber_id = ?",
+                               "d.seq", ("d.newspaper_id", "d.issue_id"), Issue.key,
+                               "_issue", "SELECT version FROM subscribers WHERE ID = ?")
+
+
+# a list of a SqliteAgency, with the methods of Collection that are used for reading, every call reads the database
+# (the changes go through the SqliteAgency methods)
+class _StoredCollection(object):
+    __slots__ = ("_agency", "_query", "_params")
+
+    def __init__(self, agency: "SqliteAgency", query: _ListQuery, params: tuple = ()):
+        self._agency = agency
+        self._query = query
+        self._params = params
+
+    def _make(self, rows) -> List:
+        make = getattr(self._agency, self._query.make)
+        return [make(row) for row in rows]
+
+    def __len__(self) -> int:
+        return self._agency._value(self._query.count, self._params)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.to_list())
+
+    def __contains__(self, item) -> bool:
+        key = self._query.key(item)
+        return self._agency._value(self._query.contains, self._params + self._query.key_values(key)) is not None
+
+    def __eq__(self, other):
+        if isinstance(other, (_StoredCollection, list, tuple)) or hasattr(other, "to_list"):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"_StoredCollection({self.to_list()!r})"
+
+    def get(self, key: Hashable) -> Optional[object]:
+        row = self._agency._row(self._query.get, self._params + self._query.key_values(key))
+        return None if row is None else self._make([row])[0]
+
+    def keys(self) -> List:
+        rows = self._agency._rows(self._query.keys, self._params)
+        return [tuple(row) for row in rows] if self._query.compound else [row[0] for row in rows]
+
+    @property
+    def version(self) -> int:
+        return self._agency._value(self._query.version, self._params)
+
+    def page(self, after: Optional[Hashable], limit: int) -> Tuple[List, Optional[Hashable]]:
+        # like Collection.page, the page is read in key order with a row value comparison
+        if after is None:
+            rows = self._agency._rows(self._query.first_page, self._params + (limit + 1,))
+        else:
+            rows = self._agency._rows(self._query.next_page, self._params + self._query.key_values(after) + (limit + 1,))
+        objects = self._make(rows[:limit])
+        return objects, self._query.key(objects[-1]) if len(rows) > limit else None
+
+    def to_list(self) -> List:
+        return self._make(self._agency._rows(self._query.all, self._params))
+
+
+# a dict that is computed from the database whenever it is read (subscriber.missing, .received and .special_issues,
+# newspaper.issue_contents and agency.paper_editors of a SqliteAgency)
+class _Computed(object):
+    __slots__ = ("_compute",)
+
+    def __init__(self, compute: Callable[[], dict]):
+        self._compute = compute
+
+    def __getitem__(self, key):
+        return self._compute()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._compute()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._compute())
+
+    def __len__(self) -> int:
+        return len(self._compute())
+
+    def __eq__(self, other):
+        return self._compute() == (other._compute() if isinstance(other, _Computed) else other)
+
+    def __repr__(self):
+        return f"_Computed({self._compute()!r})"
+
+    def get(self, key, default=None):
+        return self._compute().get(key, default)
+
+    def keys(self):
+        return self._compute().keys()
+
+    def values(self):
+        return self._compute().values()
+
+    def items(self):
+        return self._compute().items()
+
+
+# an IdAllocator that also skips the IDs another process (sharing the database) has used in the meantime
+class _StoredIds(IdAllocator):
+    __slots__ = ("_taken",)
+
+    def __init__(self, taken: Callable[[int], bool], IDs: Iterable[int]):
+        super().__init__()
+        self._taken = taken
+        self.claim_all(IDs)
+
+    def allocate(self, requested: int) -> int:
+        ID = super().allocate(requested)
+        while self._taken(ID):
+            ID = super().allocate(ID + 1)
+        return ID
+
+
+# an Agency that keeps its data in a SQLite database instead of memory (selected with PAPERBACK_STORAGE=sqlite, see
+# create_app): the data can be bigger than the memory, and several processes can serve the same database
+# the objects it returns are the usual model objects, their lists (paper.issues, subscriber.newspaper_list, ...) read
+# the database when they are used, and the missing issues, received counts and special issues of a subscriber are
+# computed with set-based SQL instead of being kept up to date by every change. an object that is still in use is
+# returned again for the same row (a weak identity map), refreshed with the stored fields
+class SqliteAgency(Agency):
+    def __init__(self, path: str):
+        # (the collections and indexes of Agency.__init__ are tables here)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = _Transactions(self._connect)
+        self.log = None  # the database is the log
+        self.columnar_issues = False
+        self._objects = weakref.WeakValueDictionary()  # ("newspaper", paper_id), ("issue", seq), ... -> object
+        self._issue_ids: Dict[int, _StoredIds] = {}
+        self._issue_ids_lock = threading.Lock()
+        connection = self._connect()
+        connection.executescript(f"BEGIN IMMEDIATE; {_SCHEMA} COMMIT;")
+        connection.close()
+        self.newspapers = _StoredCollection(self, _NEWSPAPERS)
+        self.editors = _StoredCollection(self, _EDITORS)
+        self.subscribers = _StoredCollection(self, _SUBSCRIBERS)
+        self.newspaper_ids = _StoredIds(lambda ID: self._exists("SELECT 1 FROM newspapers WHERE paper_id = ?", ID),
+                                        self._column("SELECT paper_id FROM newspapers"))
+        self.editor_ids = _StoredIds(lambda ID: self._exists("SELECT 1 FROM editors WHERE ID = ?", ID),
+                                     self._column("SELECT ID FROM editors"))
+        self.subscriber_ids = _StoredIds(lambda ID: self._exists("SELECT 1 FROM subscribers WHERE ID = ?", ID),
+                                         self._column("SELECT ID FROM subscribers"))
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit mode (the transactions are made by the lock), the constant statements are prepared once per
+        # connection and kept in its statement cache
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False,
+                                     cached_statements=256)
+        connection.execute("PRAGMA journal_mode = WAL")  # the readers don't wait for the writer
+        connection.execute("PRAGMA synchronous = NORMAL")  # a crash keeps the committed transactions (fsync at checkpoints)
+        return connection
+
+    def close(self):
+        self.lock.close()
+
+    @property
+    def paper_editors(self):
+        return _Computed(self._paper_editors)
+
+    def _paper_editors(self) -> Dict[int, Dict[int, int]]:
+        editors: Dict[int, Dict[int, int]] = {}
+        for paper_id, editor_id, count in self._rows("SELECT paper_id, editor_id, count FROM paper_editors ORDER BY seq"):
+            editors.setdefault(paper_id, {})[editor_id] = count
+        return editors
+
+# reading and writing (the statements run in the transaction of the thread, or in one of their own):
+    def _rows(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self.lock.read():
+            return self.lock.connection().execute(sql, params).fetchall()
+
+    def _row(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self.lock.read():
+            return self.lock.connection().execute(sql, params).fetchone()
+
+    def _value(self, sql: str, params: tuple = ()):
+        row = self._row(sql, params)
+        return None if row is None else row[0]
+
+    def _exists(self, sql: str, *params) -> bool:
+        return self._row(sql, params) is not None
+
+    def _column(self, sql: str, params: tuple = ()) -> List:
+        return [row[0] for row in self._rows(sql, params)]
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        # only in the write transaction of an agency method
+        return self.lock.connection().execute(sql, params)
+
+    def _touch_list(self, name: str):
+        self._execute("UPDATE counters SET value = ? WHERE name = ?", (self.lock.version(), name))
+
+# rows -> objects:
+    def _newspaper(self, row: tuple) -> Newspaper:
+        paper_id, name, frequency, price, version = row
+        paper = self._objects.get(("newspaper", paper_id))
+        if paper is None:
+            paper = self._adopt_newspaper(Newspaper(paper_id, name, frequency, price))
+        else:
+            paper.name, paper.frequency, paper.price = name, frequency, price
+        paper.version = version
+        return paper
+
+    def _adopt_newspaper(self, paper: Newspaper) -> Newspaper:
+        paper.issues = _StoredCollection(self, _PAPER_ISSUES, (paper.paper_id,))
+        paper.subscribers = _StoredCollection(self, _PAPER_SUBSCRIBERS, (paper.paper_id,))
+        paper_id = paper.paper_id
+        paper.issue_contents = _Computed(lambda: self._issue_contents(paper_id))
+        paper.issue_ids = self._issue_ids_of(paper_id)
+        paper.columns = None
+        self._objects["newspaper", paper.paper_id] = paper
+        return paper
+
+    def _issue_contents(self, paper_id: int) -> Dict[tuple, int]:
+        rows = self._rows("SELECT releasedate, released, editor_id, pages, newspaper_id, COUNT(*) FROM issues "
+                          "WHERE paper_id = ? GROUP BY releasedate, released, editor_id, pages, newspaper_id", (paper_id,))
+        return Counter({(releasedate, bool(released), editor_id, pages, newspaper_id): count
+                        for releasedate, released, editor_id, pages, newspaper_id, count in rows})
+
+    def _issue_ids_of(self, paper_id: int) -> _StoredIds:
+        with self._issue_ids_lock:
+            ids = self._issue_ids.get(paper_id)
+            if ids is None:
+                # the IDs of its issues and of its removed issues that subscribers still have
+                ids = self._issue_ids[paper_id] = _StoredIds(
+                    lambda ID: self._exists("SELECT 1 FROM issues WHERE paper_id = ?1 AND issue_id = ?2 UNION ALL SELECT 1 "
+                                            "FROM issues WHERE paper_id IS NULL AND newspaper_id = ?1 AND issue_id = ?2",
+                                            paper_id, ID),
+                    self._column("SELECT issue_id FROM issues WHERE paper_id = ?1 UNION ALL SELECT issue_id FROM issues "
+                                 "WHERE paper_id IS NULL AND newspaper_id = ?1", (paper_id,)))
+            return ids
+
+    def _issue(self, row: tuple) -> Issue:
+        seq, issue_id, releasedate, released, editor_id, pages, newspaper_id, version = row
+        issue = self._objects.get(("issue", seq))
+        if issue is None:
+            issue = Issue(releasedate, issue_id, bool(released), editor_id, pages, newspaper_id)
+            self._objects["issue", seq] = issue
+        else:
+            issue.issue_id, issue.releasedate, issue.released = issue_id, releasedate, bool(released)
+            issue.editor_id, issue.pages, issue.newspaper_id = editor_id, pages, newspaper_id
+        issue.position = seq
+        issue.version = version
+        return issue
+
+    def _editor(self, row: tuple) -> Editor:
+        ID, name, address, version = row
+        editor = self._objects.get(("editor", ID))
+        if editor is None:
+            editor = self._adopt_editor(Editor(ID, name, address))
+        else:
+            editor.name, editor.address = name, address
+        editor.version = version
+        return editor
+
+    def _adopt_editor(self, editor: Editor) -> Editor:
+        editor.issues_list = _StoredCollection(self, _EDITOR_ISSUES, (editor.ID,))
+        self._objects["editor", editor.ID] = editor
+        return editor
+
+    def _subscriber(self, row: tuple) -> Subscriber:
+        ID, name, address, monthly_cost, version = row
+        subscriber = self._objects.get(("subscriber", ID))
+        if subscriber is None:
+            subscriber = self._adopt_subscriber(Subscriber(ID, name, address))
+        else:
+            subscriber.name, subscriber.address = name, address
+        subscriber.monthly_cost, subscriber.version = monthly_cost, version
+        return subscriber
+
+    def _adopt_subscriber(self, subscriber: Subscriber) -> Subscriber:
+        ID = subscriber.ID
+        subscriber.newspaper_list = _StoredCollection(self, _SUBSCRIBED_PAPERS, (ID,))
+        subscriber.issues_list = _StoredCollection(self, _DELIVERED_ISSUES, (ID,))
+        subscriber.missing = _Computed(lambda: self._missing(ID))
+        subscriber.received = _Computed(lambda: self._received(ID))
+        subscriber.special_issues = _Computed(lambda: self._special_issues(ID))
+        self._objects["subscriber", ID] = subscriber
+        return subscriber
+
+    def _fields(self, sql: str, key: tuple) -> tuple:
+        row = self._row(sql, key)
+        if row is None:
+            raise ValueError(f"{key!r} was not found")
+        return row
+
+# newspapers:
+    @_transaction
+    def add_newspaper(self, new_paper: Newspaper):
+        if self._exists("SELECT 1 FROM newspapers WHERE name = ? AND frequency = ? AND price = ?", *new_paper.content_key()):
+            raise ValueError(f"Newspaper named {new_paper.name} already exists")
+        if self._exists("SELECT 1 FROM newspapers WHERE paper_id = ?", new_paper.paper_id):
+            raise ValueError(f'A newspaper with ID {new_paper.paper_id} already exists')
+        version = self.lock.version()
+        self._execute("INSERT INTO newspapers (paper_id, name, frequency, price, version, issues_version, subscribers_version) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      (new_paper.paper_id, new_paper.name, new_paper.frequency, new_paper.price, version, version, version))
+        self._touch_list("newspapers")
+        self.newspaper_ids.claim(new_paper.paper_id)
+        new_paper.version = version
+        return self._adopt_newspaper(new_paper)
+
+    def get_newspaper(self, paper_id: int) -> Optional[Newspaper]:
+        return self.newspapers.get(paper_id)
+
+    def all_newspapers(self) -> List[Newspaper]:
+        return self.newspapers.to_list()
+
+    @_transaction
+    def remove_newspaper(self, paper: Newspaper):
+        version = self.lock.version()
+        self._execute("UPDATE subscribers SET version = ? WHERE ID IN (SELECT subscriber_id FROM subscriptions WHERE paper_id = ?) "
+                      "OR ID IN (SELECT d.subscriber_id FROM deliveries d JOIN issues i ON i.seq = d.issue_row WHERE i.paper_id = ?)",
+                      (version, paper.paper_id, paper.paper_id))
+        self._update_monthly_costs(paper.paper_id, without=paper.paper_id)
+        self._execute("DELETE FROM subscriptions WHERE paper_id = ?", (paper.paper_id,))
+        if not self._execute("DELETE FROM newspapers WHERE paper_id = ?", (paper.paper_id,)).rowcount:
+            raise ValueError(f"{paper!r} is not in the collection")
+        # the editors no longer supervise the issues of the deleted paper
+        self._execute("UPDATE editors SET issues_version = ? WHERE ID IN (SELECT a.editor_id FROM editor_issues a "
+                      "JOIN issues i ON i.seq = a.issue_row WHERE i.paper_id = ?)", (version, paper.paper_id))
+        self._execute("DELETE FROM editor_issues WHERE issue_row IN (SELECT seq FROM issues WHERE paper_id = ?)", (paper.paper_id,))
+        self._execute("DELETE FROM paper_editors WHERE paper_id = ?", (paper.paper_id,))
+        # the issues stay in the issue lists of the subscribers who received them
+        self._execute("UPDATE issues SET paper_id = NULL WHERE paper_id = ? AND seq IN (SELECT issue_row FROM deliveries)",
+                      (paper.paper_id,))
+        self._execute("DELETE FROM issues WHERE paper_id = ?", (paper.paper_id,))
+        self._touch_list("newspapers")
+        self.newspaper_ids.release(paper.paper_id)
+        with self._issue_ids_lock:
+            self._issue_ids.pop(paper.paper_id, None)
+
+    @_transaction
+    def update_newspaper(self, targeted_paper, updated_paper):
+        if targeted_paper == updated_paper:
+            raise ValueError("Newspaper already up to date")
+        version = self.lock.version()
+        self._execute("UPDATE newspapers SET name = ?, frequency = ?, price = ?, version = ? WHERE paper_id = ?",
+                      (updated_paper.name, updated_paper.frequency, updated_paper.price, version, targeted_paper.paper_id))
+        # the stats of the subscribers show the name of the paper
+        self._execute("UPDATE subscribers SET version = ? WHERE ID IN (SELECT subscriber_id FROM subscriptions WHERE paper_id = ?)",
+                      (version, targeted_paper.paper_id))
+        if updated_paper.price != targeted_paper.price:
+            self._update_monthly_costs(targeted_paper.paper_id)
+        self._touch_list("newspapers")
+        updated_paper.version = version
+        return self._adopt_newspaper(updated_paper)
+
+    def _update_monthly_costs(self, paper_id: int, without: Optional[int] = None):
+        # summed up again in subscription order for the subscribers of the paper (like Agency._update_monthly_cost),
+        # the subscription of the paper without (that is removed) isn't counted
+        prices = {ID: [] for ID in self._column("SELECT subscriber_id FROM subscriptions WHERE paper_id = ?", (paper_id,))}
+        for ID, price in self._execute("SELECT t.subscriber_id, n.price FROM subscriptions s "
+                                       "JOIN subscriptions t ON t.subscriber_id = s.subscriber_id "
+                                       "JOIN newspapers n ON n.paper_id = t.paper_id "
+                                       "WHERE s.paper_id = ? AND t.paper_id IS NOT ? ORDER BY t.seq", (paper_id, without)):
+            prices[ID].append(price)
+        costs = [(sum(paper_prices), ID) for ID, paper_prices in prices.items()]
+        self.lock.connection().executemany("UPDATE subscribers SET monthly_cost = ? WHERE ID = ?", costs)
+        for monthly_cost, ID in costs:
+            subscriber = self._objects.get(("subscriber", ID))
+            if subscriber is not None:
+                subscriber.monthly_cost = monthly_cost
+
+# issues:
+    def _listed(self, paper_id: int, issue_id: int) -> tuple:
+        # the row of an issue of a newspaper: seq, editor_id, released, newspaper_id
+        row = self._row("SELECT seq, editor_id, released, newspaper_id FROM issues WHERE paper_id = ? AND issue_id = ?",
+                        (paper_id, issue_id))
+        if row is None:
+            raise ValueError(f"Issue {issue_id} was not found")
+        return row
+
+    @_transaction
+    def add_issue(self, targeted_paper, new_issue):
+        if new_issue.newspaper_id is None:
+            new_issue.newspaper_id = targeted_paper.paper_id
+        if self._exists("SELECT 1 FROM issues WHERE paper_id = ? AND releasedate IS ? AND released = ? AND editor_id IS ? "
+                        "AND pages IS ? AND newspaper_id IS ?", targeted_paper.paper_id, *new_issue.content_key()):
+            raise ValueError("Issue already exists")
+        elif self._exists("SELECT 1 FROM issues WHERE paper_id = ? AND issue_id = ?", targeted_paper.paper_id, new_issue.issue_id):
+            raise ValueError(f'A issue with ID {new_issue.issue_id} already exists')
+        elif self._exists("SELECT 1 FROM issues WHERE paper_id IS NULL AND newspaper_id = ? AND issue_id = ?",
+                          new_issue.newspaper_id, new_issue.issue_id):
+            raise ValueError(f"The ID {new_issue.issue_id} belongs to a removed issue that subscribers have received")
+        # check if editor exists or still has to get assigned:
+        if new_issue.editor_id != 0 and not self._exists("SELECT 1 FROM editors WHERE ID = ?", new_issue.editor_id):
+            raise ValueError(f"Editor with ID {new_issue.editor_id} was not found")
+        version = self.lock.version()
+        seq = self._execute("INSERT INTO issues (paper_id, newspaper_id, issue_id, releasedate, released, editor_id, pages, "
+                            "version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (targeted_paper.paper_id, new_issue.newspaper_id, new_issue.issue_id, new_issue.releasedate,
+                             new_issue.released, new_issue.editor_id, new_issue.pages, version)).lastrowid
+        if new_issue.editor_id != 0:
+            self._assign_issue(new_issue.editor_id, seq, new_issue.newspaper_id)
+        self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, targeted_paper.paper_id))
+        targeted_paper.issue_ids.claim(new_issue.issue_id)
+        new_issue.version = version
+        self._objects["issue", seq] = new_issue
+        return new_issue
+
+    def get_issue(self, paper, issue_id):
+        return paper.issues.get(issue_id)
+
+    def all_issues(self, paper):
+        return paper.issues.to_list()
+
+    @_transaction
+    def update_issue(self, targeted_paper, issue, updated_issue):
+        seq, editor_id, released, newspaper_id = self._listed(targeted_paper.paper_id, issue.issue_id)
+        if issue == updated_issue:
+            raise ValueError("Issue already up to date")
+        if updated_issue.editor_id != 0 and not self._exists("SELECT 1 FROM editors WHERE ID = ?", updated_issue.editor_id):
+            raise ValueError(f"Editor with ID {updated_issue.editor_id} was not found")
+        version = self.lock.version()
+        if editor_id != updated_issue.editor_id:
+            if editor_id != 0:
+                self._unassign_issue(editor_id, seq, newspaper_id)
+            if updated_issue.editor_id != 0:
+                self._assign_issue(updated_issue.editor_id, seq, updated_issue.newspaper_id)
+        elif editor_id != 0 and newspaper_id != updated_issue.newspaper_id:  # the editor works for another paper now
+            self._unassign_issue(editor_id, seq, newspaper_id)
+            self._assign_issue(editor_id, seq, updated_issue.newspaper_id)
+        self._execute("UPDATE issues SET issue_id = ?, releasedate = ?, released = ?, editor_id = ?, pages = ?, "
+                      "newspaper_id = ?, version = ? WHERE seq = ?",
+                      (updated_issue.issue_id, updated_issue.releasedate, updated_issue.released, updated_issue.editor_id,
+                       updated_issue.pages, updated_issue.newspaper_id, version, seq))
+        self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, targeted_paper.paper_id))
+        self._execute("UPDATE editors SET issues_version = ? WHERE ID = ?", (version, updated_issue.editor_id))
+        updated_issue.version = version
+        self._objects["issue", seq] = updated_issue
+        return updated_issue
+
+    @_transaction
+    def remove_issue(self, targeted_paper, issue):
+        seq, editor_id, released, newspaper_id = self._listed(targeted_paper.paper_id, issue.issue_id)
+        version = self.lock.version()
+        if released:  # it isn't missing anymore, and it's no longer counted for the subscribers who received it
+            self._execute(f"UPDATE subscribers SET version = ? WHERE ID IN ({_WITHOUT_ISSUE}) "
+                          "OR ID IN (SELECT subscriber_id FROM deliveries WHERE issue_row = ?)",
+                          (version, targeted_paper.paper_id, newspaper_id, issue.issue_id, seq))
+        if editor_id != 0:
+            self._unassign_issue(editor_id, seq, newspaper_id)
+        # the issue stays in the issue lists of the subscribers who received it (and keeps its ID)
+        if self._exists("SELECT 1 FROM deliveries WHERE issue_row = ?", seq):
+            self._execute("UPDATE issues SET paper_id = NULL WHERE seq = ?", (seq,))
+        else:
+            self._execute("DELETE FROM issues WHERE seq = ?", (seq,))
+            targeted_paper.issue_ids.release(issue.issue_id)
+        self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, targeted_paper.paper_id))
+        return jsonify(f"Issue with ID {issue.issue_id} was removed")
+
+    @_transaction
+    def release_issue(self, issue):
+        seq, editor_id, released, newspaper_id = self._listed(issue.newspaper_id, issue.issue_id)
+        if released:
+            raise ValueError("Issue already released")
+        elif editor_id == 0:
+            raise ValueError("Editor not yet specified!")
+        version = self.lock.version()
+        self._execute("UPDATE issues SET released = 1, version = ? WHERE seq = ?", (version, seq))
+        self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, issue.newspaper_id))
+        self._execute("UPDATE editors SET issues_version = ? WHERE ID = ?", (version, editor_id))
+        # the subscribers that haven't got the issue are missing it now
+        self._execute(f"UPDATE subscribers SET version = ? WHERE ID IN ({_WITHOUT_ISSUE})",
+                      (version, issue.newspaper_id, newspaper_id, issue.issue_id))
+        issue.released, issue.version = True, version
+        self._objects["issue", seq] = issue
+        return issue
+
+    @_transaction
+    def add_editor_to_issue(self, issue, editor):
+        seq, editor_id, released, newspaper_id = self._listed(issue.newspaper_id, issue.issue_id)
+        if editor_id == 0:
+            version = self.lock.version()
+            self._execute("UPDATE issues SET editor_id = ?, version = ? WHERE seq = ?", (editor.ID, version, seq))
+            self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, issue.newspaper_id))
+            self._assign_issue(editor.ID, seq, newspaper_id)
+            issue.editor_id, issue.version = editor.ID, version
+            self._objects["issue", seq] = issue
+            return issue
+        raise ValueError(f"Editor with ID {editor_id} is already the editor of this Issue")
+
+    @_transaction
+    def deliver_issue(self, subscriber, issue, targeted_paper):
+        seq, editor_id, released, newspaper_id = self._listed(targeted_paper.paper_id, issue.issue_id)
+        if not released:
+            raise ValueError(f"Issue {issue.issue_id} hasn't been released yet")
+        elif self._exists("SELECT 1 FROM deliveries WHERE subscriber_id = ? AND newspaper_id = ? AND issue_id = ?",
+                          subscriber.ID, newspaper_id, issue.issue_id):
+            raise ValueError(f"Issue {issue.issue_id} has already been delivered")
+        self._execute("INSERT INTO deliveries (subscriber_id, issue_row, newspaper_id, issue_id) VALUES (?, ?, ?, ?)",
+                      (subscriber.ID, seq, newspaper_id, issue.issue_id))
+        self._execute("UPDATE subscribers SET version = ? WHERE ID = ?", (self.lock.version(), subscriber.ID))
+        return jsonify(f"Issue {issue.issue_id} from {targeted_paper.name} delivered")
+
+    @_transaction
+    def deliver_issue_to_subscribers(self, issue, targeted_paper, subscriber_ids: Optional[List[int]] = None):
+        # one INSERT ... SELECT for all subscribers of the paper (or the given subscribers, passed as a JSON array),
+        # subscribers who already have the issue are skipped instead of raising an error
+        seq, editor_id, released, newspaper_id = self._listed(targeted_paper.paper_id, issue.issue_id)
+        if not released:
+            raise ValueError(f"Issue {issue.issue_id} hasn't been released yet")
+        undelivered = ("NOT EXISTS (SELECT 1 FROM deliveries d WHERE d.subscriber_id = {} AND d.newspaper_id = ? "
+                       "AND d.issue_id = ?)")
+        last = self._value("SELECT COALESCE(MAX(seq), 0) FROM deliveries")
+        if subscriber_ids is None:
+            found = len(targeted_paper.subscribers)
+            not_found = 0
+            delivered = self._execute(
+                "INSERT INTO deliveries (subscriber_id, issue_row, newspaper_id, issue_id) SELECT t.subscriber_id, ?, ?, ? "
+                f"FROM subscriptions t WHERE t.paper_id = ? AND {undelivered.format('t.subscriber_id')} ORDER BY t.seq",
+                (seq, newspaper_id, issue.issue_id, targeted_paper.paper_id, newspaper_id, issue.issue_id)).rowcount
+        else:
+            wanted = json.dumps(list(dict.fromkeys(subscriber_ids)))  # every subscriber only once
+            found = self._value("SELECT COUNT(*) FROM json_each(?) j JOIN subscribers s ON s.ID = j.value", (wanted,))
+            not_found = len(dict.fromkeys(subscriber_ids)) - found
+            delivered = self._execute(
+                "INSERT INTO deliveries (subscriber_id, issue_row, newspaper_id, issue_id) SELECT s.ID, ?, ?, ? "
+                f"FROM json_each(?) j JOIN subscribers s ON s.ID = j.value WHERE {undelivered.format('s.ID')} ORDER BY j.key",
+                (seq, newspaper_id, issue.issue_id, wanted, newspaper_id, issue.issue_id)).rowcount
+        if delivered:
+            self._execute("UPDATE subscribers SET version = ? WHERE ID IN (SELECT subscriber_id FROM deliveries "
+                          "WHERE issue_row = ? AND seq > ?)", (self.lock.version(), seq, last))
+        return jsonify({"delivered": delivered, "already_delivered": found - delivered, "not_found": not_found})
+
+    def enable_issue_columns(self):
+        # the stats are aggregated by SQLite (see issue_stats), there are no columns to build
+        self.columnar_issues = True
+
+    @_consistent
+    def issue_stats(self, paper):
+        issues, released, pages, released_pages = self._row(
+            "SELECT COUNT(*), TOTAL(released), COALESCE(SUM(pages), 0), COALESCE(SUM(CASE WHEN released THEN pages END), 0) "
+            "FROM issues WHERE paper_id = ?", (paper.paper_id,))
+        editors = {editor_id: {"issues": count, "pages": editor_pages} for editor_id, count, editor_pages in self._rows(
+            "SELECT editor_id, COUNT(*), SUM(pages) FROM issues WHERE paper_id = ? AND editor_id IS NOT 0 "
+            "GROUP BY editor_id ORDER BY MIN(seq)", (paper.paper_id,))}
+        return {"issues": issues, "released": int(released), "pages": pages, "released_pages": released_pages,
+                "editors": editors, "undelivered": self.undelivered_count(paper)}
+
+    @_consistent
+    def undelivered_count(self, paper) -> int:
+        return self._value("SELECT COUNT(*) " + _UNDELIVERED.format("t.paper_id = ?"), (paper.paper_id,))
+
+# editor:
+    @_transaction
+    def add_editor(self, new_editor: Editor):
+        if self._exists("SELECT 1 FROM editors WHERE name = ? AND address = ?", *new_editor.content_key()):
+            raise ValueError(f"Editor {new_editor.name} already exists")
+        if self._exists("SELECT 1 FROM editors WHERE ID = ?", new_editor.ID):
+            raise ValueError(f"A editor with ID {new_editor.ID} already exists")
+        version = self.lock.version()
+        self._execute("INSERT INTO editors (ID, name, address, version, issues_version) VALUES (?, ?, ?, ?, ?)",
+                      (new_editor.ID, new_editor.name, new_editor.address, version, version))
+        self._touch_list("editors")
+        self.editor_ids.claim(new_editor.ID)
+        new_editor.version = version
+        return self._adopt_editor(new_editor)
+
+    def all_editors(self):
+        return self.editors.to_list()
+
+    def get_editor(self, editor_id: int):
+        return self.editors.get(editor_id)
+
+    @_transaction
+    def update_editor(self, targeted_editor, updated_editor):
+        if targeted_editor == updated_editor:
+            raise ValueError("No changes made")
+        version = self.lock.version()
+        self._execute("UPDATE editors SET name = ?, address = ?, version = ? WHERE ID = ?",
+                      (updated_editor.name, updated_editor.address, version, targeted_editor.ID))
+        self._touch_list("editors")
+        updated_editor.newspaper_list = targeted_editor.newspaper_list
+        updated_editor.version = version
+        return self._adopt_editor(updated_editor)
+
+    @_transaction
+    def remove_editor(self, editor: Editor):
+        if not self._execute("DELETE FROM editors WHERE ID = ?", (editor.ID,)).rowcount:
+            raise ValueError(f"{editor!r} is not in the collection")
+        self._touch_list("editors")
+        self.editor_ids.release(editor.ID)
+        # the editor no longer counts as working for his/her newspapers:
+        self._execute("DELETE FROM paper_editors WHERE editor_id = ?", (editor.ID,))
+        issues = self._rows("SELECT a.issue_row, i.newspaper_id, i.paper_id FROM editor_issues a "
+                            "JOIN issues i ON i.seq = a.issue_row WHERE a.editor_id = ? ORDER BY a.seq", (editor.ID,))
+        self._execute("DELETE FROM editor_issues WHERE editor_id = ?", (editor.ID,))
+        version = self.lock.version()
+        for seq, newspaper_id, paper_id in issues:
+            # transferring issues of the deleted editor to another editor of the same newspaper (if there is one),
+            # otherwise the issue is waiting for a new editor again
+            successor = self._value("SELECT editor_id FROM paper_editors WHERE paper_id = ? ORDER BY seq LIMIT 1",
+                                    (newspaper_id,))
+            self._execute("UPDATE issues SET editor_id = ?, version = ? WHERE seq = ?", (successor or 0, version, seq))
+            issue = self._objects.get(("issue", seq))
+            if issue is not None:  # (an object that is in use shows the change, like the shared issue of the Agency)
+                issue.editor_id, issue.version = successor or 0, version
+            self._execute("UPDATE newspapers SET issues_version = ? WHERE paper_id = ?", (version, paper_id))
+            if successor is not None:
+                self._assign_issue(successor, seq, newspaper_id)
+
+    # editor_issues and paper_editors always change together
+    def _assign_issue(self, editor_id: int, seq: int, newspaper_id):
+        self._execute("INSERT INTO editor_issues (editor_id, issue_row) VALUES (?, ?)", (editor_id, seq))
+        self._execute("INSERT INTO paper_editors (paper_id, editor_id, count) VALUES (?, ?, 1) "
+                      "ON CONFLICT (paper_id, editor_id) DO UPDATE SET count = count + 1", (newspaper_id, editor_id))
+        self._execute("UPDATE editors SET issues_version = ? WHERE ID = ?", (self.lock.version(), editor_id))
+
+    def _unassign_issue(self, editor_id: int, seq: int, newspaper_id):
+        self._execute("DELETE FROM editor_issues WHERE issue_row = ?", (seq,))
+        self._execute("UPDATE paper_editors SET count = count - 1 WHERE paper_id = ? AND editor_id = ?", (newspaper_id, editor_id))
+        self._execute("DELETE FROM paper_editors WHERE paper_id = ? AND editor_id = ? AND count = 0", (newspaper_id, editor_id))
+        self._execute("UPDATE editors SET issues_version = ? WHERE ID = ?", (self.lock.version(), editor_id))
+
+    def get_editor_issues(self, editor: Editor):
+        return editor.issues_list.to_list()
+
+# subscriber:
+    @_transaction
+    def add_subscriber(self, new_subscriber: Subscriber):
+        if self._exists("SELECT 1 FROM subscribers WHERE ID = ?", new_subscriber.ID):
+            raise ValueError(f"A subscriber with ID {new_subscriber.ID} already exists")
+        if self._exists("SELECT 1 FROM subscribers WHERE name = ? AND address = ?", *new_subscriber.content_key()):
+            raise ValueError(f"Subscriber {new_subscriber.name} already exists")
+        version = self.lock.version()
+        self._execute("INSERT INTO subscribers (ID, name, address, monthly_cost, version) VALUES (?, ?, ?, 0, ?)",
+                      (new_subscriber.ID, new_subscriber.name, new_subscriber.address, version))
+        self._touch_list("subscribers")
+        self.subscriber_ids.claim(new_subscriber.ID)
+        new_subscriber.monthly_cost, new_subscriber.version = 0, version
+        return self._adopt_subscriber(new_subscriber)
+
+    def all_subscribers(self) -> List[Subscriber]:
+        return self.subscribers.to_list()
+
+    def get_subscriber(self, subscriber_id: int):
+        return self.subscribers.get(subscriber_id)
+
+    @_transaction
+    def update_subscriber(self, targeted_subscriber, updated_subscriber):
+        if targeted_subscriber == updated_subscriber:
+            raise ValueError(f"No changes made")
+        version = self.lock.version()
+        self._execute("UPDATE subscribers SET name = ?, address = ?, version = ? WHERE ID = ?",
+                      (updated_subscriber.name, updated_subscriber.address, version, targeted_subscriber.ID))
+        self._execute("UPDATE newspapers SET subscribers_version = ? WHERE paper_id IN "
+                      "(SELECT paper_id FROM subscriptions WHERE subscriber_id = ?)", (version, targeted_subscriber.ID))
+        self._touch_list("subscribers")
+        updated_subscriber.monthly_cost = self._value("SELECT monthly_cost FROM subscribers WHERE ID = ?", (targeted_subscriber.ID,))
+        updated_subscriber.version = version
+        return self._adopt_subscriber(updated_subscriber)
+
+    @_transaction
+    def remove_subscriber(self, subscriber: Subscriber):
+        version = self.lock.version()
+        if not self._execute("DELETE FROM subscribers WHERE ID = ?", (subscriber.ID,)).rowcount:
+            raise ValueError(f"{subscriber!r} is not in the collection")
+        # stops all subscriptions when subscriber is deleted
+        self._execute("UPDATE newspapers SET subscribers_version = ? WHERE paper_id IN "
+                      "(SELECT paper_id FROM subscriptions WHERE subscriber_id = ?)", (version, subscriber.ID))
+        self._execute("DELETE FROM subscriptions WHERE subscriber_id = ?", (subscriber.ID,))
+        # the removed issues nobody else has are gone now, and their IDs can be handed out again
+        forgotten = self._execute(
+            "DELETE FROM issues WHERE paper_id IS NULL AND seq IN (SELECT issue_row FROM deliveries WHERE subscriber_id = ?1) "
+            "AND NOT EXISTS (SELECT 1 FROM deliveries d WHERE d.issue_row = issues.seq AND d.subscriber_id != ?1) "
+            "RETURNING newspaper_id, issue_id", (subscriber.ID,)).fetchall()
+        self._execute("DELETE FROM deliveries WHERE subscriber_id = ?", (subscriber.ID,))
+        self._touch_list("subscribers")
+        self.subscriber_ids.release(subscriber.ID)
+        with self._issue_ids_lock:
+            for newspaper_id, issue_id in forgotten:
+                ids = self._issue_ids.get(newspaper_id)
+                if ids is not None:
+                    ids.release(issue_id)
+
+    @_transaction
+    def subscribe_to_paper(self, subscriber, paper):
+        if not self._exists("SELECT 1 FROM subscriptions WHERE subscriber_id = ? AND paper_id = ?", subscriber.ID, paper.paper_id):
+            version = self.lock.version()
+            self._execute("INSERT INTO subscriptions (subscriber_id, paper_id) VALUES (?, ?)", (subscriber.ID, paper.paper_id))
+            subscriber.monthly_cost = self._execute(
+                "UPDATE subscribers SET monthly_cost = monthly_cost + (SELECT price FROM newspapers WHERE paper_id = ?), "
+                "version = ? WHERE ID = ? RETURNING monthly_cost", (paper.paper_id, version, subscriber.ID)).fetchall()[0][0]
+            subscriber.version = version
+            self._execute("UPDATE newspapers SET subscribers_version = ? WHERE paper_id = ?", (version, paper.paper_id))
+            return jsonify("Done!")
+        raise ValueError(f"Subscriber {subscriber.ID} already has a subscription of the Newspaper {paper.name}")
+
+    # the missing issues, received counts and special issues of a subscriber, set-based:
+    def _missing(self, subscriber_id: int) -> Dict[int, Dict[int, None]]:
+        missing: Dict[int, Dict[int, None]] = {}
+        for newspaper_id, issue_id in self._rows("SELECT i.newspaper_id, i.issue_id " + _UNDELIVERED.format("t.subscriber_id = ?")
+                                                 + "ORDER BY t.seq, i.seq", (subscriber_id,)):
+            missing.setdefault(newspaper_id, {})[issue_id] = None
+        return missing
+
+    def _received(self, subscriber_id: int) -> Dict[int, int]:
+        # (removed issues aren't counted)
+        return dict(self._rows("SELECT d.newspaper_id, COUNT(*) FROM deliveries d JOIN issues i ON i.seq = d.issue_row "
+                               "WHERE d.subscriber_id = ? AND i.paper_id IS NOT NULL GROUP BY d.newspaper_id "
+                               "ORDER BY MIN(d.seq)", (subscriber_id,)))
+
+    def _special_issues(self, subscriber_id: int) -> Dict[int, Dict[int, None]]:
+        # received issues of papers without a subscription (that weren't removed)
+        special: Dict[int, Dict[int, None]] = {}
+        for newspaper_id, issue_id in self._rows(
+                "SELECT d.newspaper_id, d.issue_id FROM deliveries d JOIN issues i ON i.seq = d.issue_row "
+                "WHERE d.subscriber_id = ? AND i.paper_id IS NOT NULL AND NOT EXISTS "
+                "(SELECT 1 FROM subscriptions t WHERE t.subscriber_id = d.subscriber_id AND t.paper_id = d.newspaper_id) "
+                "ORDER BY d.seq", (subscriber_id,)):
+            special.setdefault(newspaper_id, {})[issue_id] = None
+        return special
+
+    @_consistent
+    def missing_issue_parts(self, subscriber, positions: bool = False) -> List[list]:
+        # one query, already in the order of the subscriptions and of the issues (instead of an issue lookup per ID)
+        if positions:
+            position_of = {paper_id: position for position, paper_id in enumerate(self._column(
+                "SELECT paper_id FROM subscriptions WHERE subscriber_id = ? ORDER BY seq", (subscriber.ID,)))}
+        parts: List[list] = []
+        last = None
+        for paper_id, name, issue_id in self._rows(
+                "SELECT t.paper_id, (SELECT name FROM newspapers WHERE paper_id = t.paper_id), i.issue_id "
+                + _UNDELIVERED.format("t.subscriber_id = ?") + "ORDER BY t.seq, i.seq", (subscriber.ID,)):
+            if paper_id != last:
+                parts.append([position_of[paper_id], name, []] if positions else [name, []])
+                last = paper_id
+            parts[-1][-1].append(issue_id)
+        return parts
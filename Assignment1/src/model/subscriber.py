@@ -1,16 +1,38 @@
+from .collection import Collection
 from .issue import Issue
 from .newspaper import Newspaper
 
-from typing import List
+from operator import attrgetter
+from typing import Dict, KeysView
 
 
 class Subscriber:
-    def __init__(self, ID: int, name: str, address: str):
+    # no per-instance __dict__, there can be millions of subscribers
+    __slots__ = ("ID", "name", "address", "newspaper_list", "issues_list", "missing", "monthly_cost", "received",
+                 "special_issues", "version", "__weakref__")
+
+    def __init__(self, ID: int, name: str, address: str, paged_issues: bool = False):
         self.ID: int = ID
         self.name: str = name
         self.address: str = address
-        self.newspaper_list: List[Newspaper] = []  # subscription list
-        self.issues_list: List[Issue] = []  # all received issues (including issues without subscription)
+        self.newspaper_list: Collection = Collection(attrgetter("paper_id"))  # subscription list, indexed by paper ID
+        # all received issues (including issues without subscription) in the order of delivery, indexed by Issue.key()
+        self.issues_list: Collection = Collection(Issue.key, paged=paged_issues)
+        self.missing: Dict[int, Dict[int, None]] = {}  # paper_id -> IDs of released but undelivered issues of subscribed papers
+        # running totals for the stats:
+        self.monthly_cost: float = 0  # sum of the prices of the subscribed papers
+        self.received: Dict[int, int] = {}  # paper_id -> number of (not removed) issues received from that paper
+        self.special_issues: Dict[int, Dict[int, None]] = {}  # paper_id -> IDs of issues received without a subscription
+        self.version: int = 0  # set by the agency on every change (for ETags)
+
+    @property
+    def delivered(self) -> KeysView:
+        # Issue.key() of the received issues, to check for a delivery in O(1)
+        return self.issues_list.keys()
+
+    def content_key(self):
+        # the fields that make two subscribers (or editors) equal, as a hashable tuple (used to detect duplicates)
+        return self.name, self.address
 
     def __eq__(self, other):
-        return (self.name == other.name) and (self.address == other.address)
+        return self.content_key() == other.content_key()
@@ -0,0 +1,6 @@
+from itertools import count
+
+# one counter for the versions of all collections and objects, so a version is never handed out twice
+# (a newspaper that is deleted and added again can't get the version it had before)
+# next() on itertools.count is atomic, no lock needed
+next_version = count(1).__next__  # a new version each call (bound directly, it is called for every change)
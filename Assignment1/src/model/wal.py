@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from typing import BinaryIO, Iterator, List, Optional
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+# one file of the write-ahead log: one JSON array per line and record, e.g. ["deliver_issue", 7, 100, 3]
+# records are appended to a buffer (in the order the agency made the changes) and written by commit():
+# group commit, the first thread that commits writes the records of all threads that are waiting, with one write and
+# one fsync, while the others wait for it (and the records appended in the meantime go with the next group)
+# fsync policies: "always" fsyncs every group before commit returns, "interval" fsyncs at most every interval seconds
+# in the background (a crash loses up to interval seconds), "never" leaves it to the operating system
+class WriteAheadLog(object):
+    def __init__(self, path: str, fsync: str = "always", interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync}, use one of {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync = fsync
+        self.interval = interval
+        self._file: BinaryIO = open(path, "ab", buffering=0)
+        self._condition = threading.Condition(threading.Lock())
+        self._pending: List[bytes] = []
+        self._appended = 0  # records appended (to this log object)
+        self._committed = 0  # records written (and fsynced, with fsync="always")
+        self._committing = False
+        self._unsynced = False  # written but not fsynced yet (fsync="interval")
+        self._closed = False
+        self._sync_lock = threading.Lock()
+        if fsync == "interval":
+            threading.Thread(target=self._sync_periodically, daemon=True).start()
+
+    def append(self, record: list) -> int:
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._condition:
+            self._pending.append(line)
+            self._appended += 1
+            return self._appended
+
+    def commit(self):
+        # returns when the records appended so far are written (and fsynced, depending on the policy)
+        with self._condition:
+            target = self._appended
+            while self._committed < target and self._committing:
+                self._condition.wait()
+            if self._committed >= target:
+                return  # a group committed by another thread had the records
+            self._committing = True
+            lines, self._pending = self._pending, []
+            end = self._appended
+        try:
+            self._file.write(b"".join(lines))
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+            else:
+                self._unsynced = True
+        except BaseException:
+            with self._condition:
+                self._pending[:0] = lines  # tried again by the next commit
+                self._committing = False
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._committed = end
+            self._committing = False
+            self._condition.notify_all()
+
+    def _sync_periodically(self):
+        while not self._closed:
+            time.sleep(self.interval)
+            self.sync()
+
+    def sync(self):
+        # fsyncs what was written since the last sync (fsync="interval"), appending and writing go on meanwhile
+        with self._sync_lock:
+            if self._unsynced and not self._closed:
+                self._unsynced = False
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self.commit()
+        with self._sync_lock:
+            if not self._closed:
+                self._closed = True
+                if self.fsync != "never":
+                    os.fsync(self._file.fileno())
+                self._file.close()
+
+
+_decode = json.JSONDecoder().decode
+
+
+def read_log(path: str, truncate: bool = False) -> Iterator[list]:
+    # the records of a log file, a last record that was only partly written (a crash during the write) ends the log
+    # and is cut off with truncate=True, so the records appended after a restart follow a complete line
+    with open(path, "rb") as file:
+        offset = 0
+        for line in file:
+            record: Optional[list] = None
+            if line.endswith(b"\n"):
+                try:
+                    record = _decode(line.decode())
+                except ValueError:
+                    pass
+            if record is None:
+                if file.read(1):
+                    raise ValueError(f"{path} is damaged after {offset} bytes")
+                break
+            offset += len(line)
+            yield record
+    if truncate and os.path.getsize(path) != offset:
+        with open(path, "r+b") as file:
+            file.truncate(offset)
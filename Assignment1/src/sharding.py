@@ -0,0 +1,463 @@
+import asyncio
+import base64
+import binascii
+import json
+import multiprocessing
+import os
+from itertools import count
+from operator import itemgetter
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, quote, urlencode
+
+from .api.pagination import encode_cursor
+from .api.synchronization import READING_METHODS
+from .asyncio_server import CHUNK_SIZE, _chunked_body, _sized_body, serve
+from .model.agency import missing_issues_text, subscriber_stats_text
+
+START_TIMEOUT = 60.0  # seconds the worker processes have to start listening
+BUFFERED_BODY = 1024 * 1024  # request bodies up to this size are read before they are forwarded, bigger ones are streamed
+REPLICATED = ("newspaper", "editor", "subscriber")
+# headers of one connection, the router sets its own towards the shards and the asyncio server towards the clients
+HOP_BY_HOP = {b"connection", b"keep-alive", b"transfer-encoding", b"content-length", b"expect", b"te", b"trailer",
+              b"upgrade", b"proxy-connection"}
+
+# how the router handles a request (see route)
+ONE = "one"  # forwarded to one shard
+ANY = "any"  # forwarded to any shard (they all have the data)
+ALL = "all"  # forwarded to all shards, one replicated change after the other
+STATS = "stats"  # scatter-gather: the parts of all shards added up
+MISSING = "missing"  # scatter-gather
+EDITOR_ISSUES = "editor issues"  # scatter-gather, or one shard after the other for the pages
+
+
+# a sharded agency: every worker process runs the app (create_app behind the ASGI adapter, each with its own agency)
+# and the router, an ASGI app in front of them, forwards every request to the process that has its data
+#   - the issues of a newspaper and their deliveries are only kept by the shard of the newspaper (paper_id % shards),
+#     so the routes of one newspaper (/newspaper/<paper_id>/...) are handled by that process alone, and more processes
+#     handle more newspapers at the same time
+#   - the newspapers themselves (ID, name, frequency, price), the editors, the subscribers and the subscriptions are
+#     replicated: every shard has all of them, so a shard can check an editor or subscriber of its issues on its own,
+#     the IDs are handed out the same in every shard, duplicates are found among all newspapers and every shard has the
+#     subscription list of a subscriber in the same order. changing them is forwarded to every shard, one change after
+#     the other (the router waits for all shards), these are the rare writes
+#   - the subscriber stats and missing issues are put together from the parts of every shard (see shardNS.py),
+#     removing a subscriber removes it (and its subscriptions) in every shard, the issues of an editor are collected
+#     from all shards
+# the responses that are put together by the router have no ETag, the others keep the ETag of the shard
+class ShardRouter(object):
+    def __init__(self, shards: int, workers: int = 32):
+        if shards < 1:
+            raise ValueError("A sharded agency needs at least one shard")
+        self.count = shards
+        self.workers = workers  # request threads of every worker process
+        self.processes: List[multiprocessing.Process] = []
+        self.shards: List[_Shard] = []
+        self.replicated = asyncio.Lock()  # the changes of the replicated data reach the shards in the same order
+        self.turns = count()  # (round robin for the requests any shard can answer)
+        self.handlers: Dict[str, Callable] = {ONE: self._one, ANY: self._one, ALL: self._all,
+                                              STATS: self._stats, MISSING: self._missing,
+                                              EDITOR_ISSUES: self._editor_issues}
+
+    def start(self):
+        # starts the worker processes and waits until they listen. spawned, so a worker starts with an empty agency
+        # (or the data of its shard, see _serve_shard) instead of a copy of the agency of this process
+        context = multiprocessing.get_context("spawn")
+        ports = context.Queue()
+        self.processes = [context.Process(target=_serve_shard, args=(index, self.count, self.workers, ports),
+                                          name=f"paperback-shard-{index}", daemon=True) for index in range(self.count)]
+        for process in self.processes:
+            process.start()
+        try:
+            addresses = dict(ports.get(timeout=START_TIMEOUT) for _ in self.processes)
+        except Exception:
+            self.stop()
+            raise RuntimeError("The shards didn't start") from None
+        self.shards = [_Shard("127.0.0.1", addresses[index]) for index in range(self.count)]
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        for shard in self.shards:
+            shard.close()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+        started = []
+
+        async def respond(message: dict):
+            started.append(message)
+            await send(message)
+
+        kind, shard = route(scope["method"], scope["path"], self.count)
+        try:
+            await self.handlers[kind](scope, receive, respond, shard)
+        except (OSError, asyncio.IncompleteReadError):
+            if started:
+                raise  # the response is broken off
+            await _send_json(send, 502, {"message": "A shard of the agency is not available"})
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.stop)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _one(self, scope: dict, receive: Callable, send: Callable, shard: Optional[int],
+                   body: Union[bytes, AsyncIterator[bytes], None] = None):
+        if shard is None:
+            shard = next(self.turns) % self.count
+        if body is None:
+            body = await _request_body(scope, receive)
+        response = await self.shards[shard].request(scope["method"], _target(scope), _headers(scope), body)
+        await _relay(send, response)
+
+    async def _all(self, scope: dict, receive: Callable, send: Callable, shard: None):
+        async with self.replicated:
+            body = await _request_body(scope, receive)
+            pump = None
+            if isinstance(body, bytes):
+                bodies = [body] * self.count
+            else:
+                bodies, pump = _tee(body, self.count)
+            try:
+                responses = await asyncio.gather(*(shard.request(scope["method"], _target(scope), _headers(scope), copy)
+                                                   for shard, copy in zip(self.shards, bodies)))
+                contents = [await response.read() for response in responses]
+            finally:
+                if pump is not None:
+                    pump.cancel()
+        # every shard made the same change (or refused it for the same reason), the answer of the first one is sent
+        await _send(send, responses[0].status, _response_headers(responses[0]), contents[0])
+
+    async def _gather(self, scope: dict, target: bytes) -> Tuple[List["_Response"], List[bytes]]:
+        # GET target from every shard, the If-None-Match of the client is meant for the whole answer, not for a part
+        headers = [(name, value) for name, value in _headers(scope) if name != b"if-none-match"]
+        responses = await asyncio.gather(*(shard.request("GET", target, headers, b"") for shard in self.shards))
+        return responses, [await response.read() for response in responses]
+
+    async def _stats(self, scope: dict, receive: Callable, send: Callable, shard: None):
+        responses, contents = await self._gather(scope, f"/shard/subscriber/{_ID(scope)}/stats".encode())
+        if any(response.status != 200 for response in responses):
+            await self._one(scope, receive, send, 0)  # (the error, e.g. 404 for an unknown subscriber, as the route has it)
+            return
+        parts = [json.loads(content) for content in contents]
+        received = {}
+        # in the order of the subscriptions (a name can be used by newspapers of different shards, like in one agency)
+        for _, name, issues in sorted((paper for part in parts for paper in part["received"]), key=itemgetter(0)):
+            received[name] = received.get(name, 0) + issues
+        # (the subscriptions and their costs are the same in every shard)
+        stats = {"subscriptions": parts[0]["subscriptions"],
+                 "monthly_cost": parts[0]["monthly_cost"],
+                 "received": list(received.items()),
+                 "special_issues": [special for part in parts for special in part["special_issues"]]}
+        await _send_json(send, 200, subscriber_stats_text(stats))
+
+    async def _missing(self, scope: dict, receive: Callable, send: Callable, shard: None):
+        responses, contents = await self._gather(scope, f"/shard/subscriber/{_ID(scope)}/missingissues".encode())
+        if any(response.status != 200 for response in responses):
+            await self._one(scope, receive, send, 0)
+        else:  # in the order of the subscriptions, like in one agency
+            missing = sorted((paper for content in contents for paper in json.loads(content)["missing"]), key=itemgetter(0))
+            await _send_json(send, 200, missing_issues_text([paper[1:] for paper in missing]))
+
+    async def _editor_issues(self, scope: dict, receive: Callable, send: Callable, shard: None):
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if not any(name in ("limit", "cursor") for name, _ in query):
+            responses, contents = await self._gather(scope, _target(scope))
+            errors = [index for index, response in enumerate(responses) if response.status != 200]
+            if errors:  # (e.g. 404 for an unknown editor)
+                await _send(send, responses[errors[0]].status, _response_headers(responses[errors[0]]), contents[errors[0]])
+            else:
+                await _send_json(send, 200, {"editor": [issue for content in contents
+                                                        for issue in json.loads(content)["editor"]]})
+            return
+        # the pages go through the shards one after the other: the cursor of the router is the shard and the cursor
+        # within the shard, a page ends at the end of a shard (so it can be shorter than the limit)
+        cursor = dict(query).get("cursor")
+        try:
+            shard, inner = _decode_cursor(cursor) if cursor else (0, None)
+        except ValueError:
+            shard = self.count
+        if shard >= self.count:
+            await _send_json(send, 400, {"message": "Invalid cursor"})
+            return
+        query = [(name, value) for name, value in query if name != "cursor"] + ([("cursor", inner)] if inner else [])
+        target = _target(scope).partition(b"?")[0] + b"?" + urlencode(query).encode()
+        response = await self.shards[shard].request(scope["method"], target, _headers(scope), b"")
+        content = await response.read()
+        headers = [(name, value) for name, value in _response_headers(response) if name != b"x-next-cursor"]
+        if response.status == 200:
+            inner = response.header(b"x-next-cursor")
+            if inner is not None:
+                headers.append((b"x-next-cursor", encode_cursor([shard, inner.decode("latin-1")]).encode()))
+            elif shard + 1 < self.count:
+                headers.append((b"x-next-cursor", encode_cursor([shard + 1, None]).encode()))
+        await _send(send, response.status, headers, content)
+
+
+def shard_of(paper_id: int, shards: int) -> int:
+    return paper_id % shards
+
+
+def route(method: str, path: str, shards: int) -> Tuple[str, Optional[int]]:
+    # how a request is handled and by which shard (None if it isn't one shard)
+    parts = path.strip("/").split("/")
+    ID = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    if method not in READING_METHODS and parts[0] in REPLICATED and len(parts) <= 2:
+        return ALL, None  # adding, importing, updating or removing a newspaper, an editor or a subscriber
+    if parts[0] == "newspaper" and ID is not None:
+        return ONE, shard_of(ID, shards)  # (the newspaper itself is in every shard, its shard answers as well)
+    if parts[0] == "subscriber" and ID is not None and len(parts) == 3:
+        if parts[2] == "subscribe":
+            return ALL, None  # (the subscriptions are replicated as well)
+        if parts[2] == "stats":
+            return STATS, None
+        if parts[2] == "missingissues":
+            return MISSING, None
+    if parts[0] == "editor" and ID is not None and parts[2:] == ["issues"]:
+        return EDITOR_ISSUES, None
+    if ID is not None:  # an editor or subscriber, always the same shard, so it can answer with 304 Not Modified
+        return ONE, ID % shards
+    return ANY, None  # the lists and exports, the documentation
+
+
+def create_sharded_app(shards: int, workers: int = 32) -> ShardRouter:
+    # the router with its worker processes started (they are stopped with the lifespan shutdown of the server)
+    router = ShardRouter(shards, workers)
+    router.start()
+    return router
+
+
+def _serve_shard(index: int, shards: int, workers: int, ports: multiprocessing.Queue):
+    # a worker process: the app on a free port of the loopback interface, the port is put into ports
+    from .asgi import create_asgi_app
+    os.environ["PAPERBACK_SHARD"] = f"{index}/{shards}"
+    # every shard keeps its data apart (in a directory or database of its own), so it is loaded again at the next start
+    if os.environ.get("PAPERBACK_DATA_DIR"):
+        os.environ["PAPERBACK_DATA_DIR"] = os.path.join(os.environ["PAPERBACK_DATA_DIR"], f"shard-{index}")
+        os.makedirs(os.environ["PAPERBACK_DATA_DIR"], exist_ok=True)
+    if os.environ.get("PAPERBACK_SQLITE_PATH"):
+        root, extension = os.path.splitext(os.environ["PAPERBACK_SQLITE_PATH"])
+        os.environ["PAPERBACK_SQLITE_PATH"] = f"{root}-shard-{index}{extension}"
+    app = create_asgi_app(workers)
+    asyncio.run(serve(app, "127.0.0.1", 0, started=lambda server: ports.put((index, server.sockets[0].getsockname()[1]))))
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, Optional[str]]:
+    try:
+        shard, inner = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(shard, int) or shard < 0 or not (inner is None or isinstance(inner, str)):
+        raise ValueError("Invalid cursor")
+    return shard, inner
+
+
+def _ID(scope: dict) -> int:
+    return int(scope["path"].strip("/").split("/")[1])
+
+
+def _target(scope: dict) -> bytes:
+    target = scope.get("raw_path") or quote(scope["path"]).encode()
+    return target + b"?" + scope["query_string"] if scope.get("query_string") else target
+
+
+def _headers(scope: dict) -> List[Tuple[bytes, bytes]]:
+    return [(name, value) for name, value in scope.get("headers", []) if name not in HOP_BY_HOP]
+
+
+async def _body_chunks(receive: Callable) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            raise ConnectionError("The client disconnected")
+        if message.get("body"):
+            yield message["body"]
+        if not message.get("more_body", False):
+            return
+
+
+async def _request_body(scope: dict, receive: Callable) -> Union[bytes, AsyncIterator[bytes]]:
+    # the body read at once (it can be sent again on another connection), or streamed if it is chunked or big
+    fields = dict(scope.get("headers", []))
+    if b"chunked" in fields.get(b"transfer-encoding", b"").lower() or \
+            int(fields.get(b"content-length", b"0") or 0) > BUFFERED_BODY:
+        return _body_chunks(receive)
+    return b"".join([chunk async for chunk in _body_chunks(receive)])
+
+
+def _tee(body: AsyncIterator[bytes], copies: int) -> Tuple[List[AsyncIterator[bytes]], asyncio.Task]:
+    # a streamed body for every shard, read from the client once (the slowest shard sets the pace)
+    queues = [asyncio.Queue(maxsize=8) for _ in range(copies)]
+
+    async def pump():
+        end = None
+        try:
+            async for chunk in body:
+                for queue in queues:
+                    await queue.put(chunk)
+        except (ConnectionError, asyncio.IncompleteReadError) as error:
+            end = error  # the shards must not take a broken off body for a whole one
+        for queue in queues:
+            await queue.put(end)
+
+    async def copy(queue: asyncio.Queue) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    return [copy(queue) for queue in queues], asyncio.get_running_loop().create_task(pump())
+
+
+def _response_headers(response: "_Response") -> List[Tuple[bytes, bytes]]:
+    return [(name, value) for name, value in response.headers if name not in HOP_BY_HOP]
+
+
+async def _send(send: Callable, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+    if not any(name == b"content-length" for name, _ in headers):
+        headers = headers + [(b"content-length", b"%d" % len(body))]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+async def _send_json(send: Callable, status: int, data):
+    # written like the responses of the app (json.dumps and a newline, see serializers.py)
+    await _send(send, status, [(b"content-type", b"application/json")], (json.dumps(data) + "\n").encode())
+
+
+async def _relay(send: Callable, response: "_Response"):
+    # the response of a shard, streamed to the client if the shard streams it (the exports)
+    if not response.streamed:
+        length = response.header(b"content-length")  # (also the length of the body a HEAD request doesn't get)
+        headers = _response_headers(response) + ([(b"content-length", length)] if length is not None else [])
+        await _send(send, response.status, headers, await response.read())
+        return
+    await send({"type": "http.response.start", "status": response.status, "headers": _response_headers(response)})
+    async for chunk in response.body:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+# the keep-alive connections of the router to one worker process
+class _Shard(object):
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(self, method: str, target: bytes, headers: List[Tuple[bytes, bytes]],
+                      body: Union[bytes, AsyncIterator[bytes]]) -> "_Response":
+        while True:
+            # a streamed body can only be sent once, so it gets a new connection (an idle one might be closed already)
+            reused = bool(self.idle) and isinstance(body, bytes)
+            reader, writer = self.idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+            try:
+                await _write_request(writer, method, target, headers, body)
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue  # the worker closed the idle connection in the meantime, the request wasn't handled
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            return self._response(method, head, reader, writer)
+
+    def _response(self, method: str, head: bytes, reader: asyncio.StreamReader,
+                  writer: asyncio.StreamWriter) -> "_Response":
+        lines = head[:-4].split(b"\r\n")
+        status = int(lines[0].split(b" ", 2)[1])
+        headers = []
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            headers.append((name.strip().lower(), value.strip()))
+        fields = dict(headers)
+        keep_alive = b"close" not in fields.get(b"connection", b"").lower()
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            chunks = None
+        elif b"chunked" in fields.get(b"transfer-encoding", b"").lower():
+            chunks = _chunked_body(reader)
+        elif b"content-length" in fields:
+            chunks = _sized_body(reader, int(fields[b"content-length"]))
+        else:  # the body ends with the connection
+            chunks = _until_closed(reader)
+            keep_alive = False
+        return _Response(status, headers, self._body(chunks, reader, writer, keep_alive),
+                         streamed=chunks is not None and b"content-length" not in fields)
+
+    async def _body(self, chunks: Optional[AsyncIterator[bytes]], reader: asyncio.StreamReader,
+                    writer: asyncio.StreamWriter, keep_alive: bool) -> AsyncIterator[bytes]:
+        # the body of a response, the connection is used again once it is read to the end
+        complete = False
+        try:
+            if chunks is not None:
+                async for chunk in chunks:
+                    yield chunk
+            complete = True
+        finally:
+            if complete and keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class _Response(object):
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: AsyncIterator[bytes], streamed: bool):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.streamed = streamed  # sent in parts (chunked), without a length
+
+    def header(self, name: bytes) -> Optional[bytes]:
+        for header, value in self.headers:
+            if header == name:
+                return value
+        return None
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.body])
+
+
+async def _write_request(writer: asyncio.StreamWriter, method: str, target: bytes, headers: List[Tuple[bytes, bytes]],
+                         body: Union[bytes, AsyncIterator[bytes]]):
+    lines = [b"%s %s HTTP/1.1" % (method.encode("ascii"), target)] + [name + b": " + value for name, value in headers]
+    if isinstance(body, bytes):
+        lines.append(b"content-length: %d" % len(body))
+        writer.write(b"\r\n".join(lines) + b"\r\n\r\n" + body)
+    else:
+        lines.append(b"transfer-encoding: chunked")
+        writer.write(b"\r\n".join(lines) + b"\r\n\r\n")
+        async for chunk in body:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _until_closed(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await reader.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
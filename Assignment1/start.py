@@ -1,5 +1,16 @@
+import sys
+
 from src.app import create_app
 
 if __name__ == '__main__':
-    app = create_app()
-    create_app().run(debug=False, port=7890)
+    if "--shards" in sys.argv:  # the agency sharded by newspaper over worker processes (see src/sharding.py)
+        from src.sharding import create_sharded_app
+        from src.asyncio_server import run
+        run(create_sharded_app(int(sys.argv[sys.argv.index("--shards") + 1])), port=7890)
+    elif "--asgi" in sys.argv:  # the asyncio server, many keep-alive clients per process (see src/asyncio_server.py)
+        from src.asgi import create_asgi_app
+        from src.asyncio_server import run
+        run(create_asgi_app(), port=7890)
+    else:
+        app = create_app()
+        create_app().run(debug=False, port=7890)
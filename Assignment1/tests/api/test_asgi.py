@@ -0,0 +1,115 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from ...src.asgi import AsgiAdapter
+from ...src.asyncio_server import serve
+from ..fixtures import app, agency
+
+
+@pytest.fixture()
+def server(app, agency):
+    # the asyncio server on a free port, in a thread with its own event loop
+    started = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+
+        def listening(server):
+            state["port"] = server.sockets[0].getsockname()[1]
+            started.set()
+        state["task"] = loop.create_task(serve(AsgiAdapter(app, workers=4), port=0, started=listening))
+        try:
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield state["port"]
+    state["loop"].call_soon_threadsafe(state["task"].cancel)
+    thread.join(10)
+
+
+def call(app, method, path, body=b"", headers=()):
+    # the ASGI app called directly, like another ASGI server would
+    messages = []
+    parts = [{"type": "http.request", "body": body[:3], "more_body": True},
+             {"type": "http.request", "body": body[3:], "more_body": False}]
+
+    async def receive():
+        return parts.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "http_version": "1.1", "method": method, "path": path, "query_string": b"",
+             "headers": [(b"content-type", b"application/json")] + list(headers)}
+    asyncio.run(AsgiAdapter(app, workers=1)(scope, receive, send))
+    return messages
+
+
+def test_adapter_runs_the_routes(app, agency):
+    body = json.dumps({"paper_id": 5300, "name": "Async Gazette", "frequency": 1, "price": 2.5}).encode()
+    messages = call(app, "POST", "/newspaper/", body)
+    assert messages[0]["type"] == "http.response.start" and messages[0]["status"] == 200
+    assert json.loads(b"".join(m.get("body", b"") for m in messages[1:]))["newspaper"]["name"] == "Async Gazette"
+    assert messages[-1]["more_body"] is False
+    assert call(app, "GET", "/newspaper/5300")[0]["status"] == 200
+    assert call(app, "GET", "/nothing/here")[0]["status"] == 404
+
+
+def test_keep_alive_connection(server, agency):
+    connection = http.client.HTTPConnection("127.0.0.1", server, timeout=10)
+    connection.request("POST", "/newspaper/", json.dumps({"paper_id": 5301, "name": "Keep Alive Times", "frequency": 7,
+                                                          "price": 1.0}), {"Content-Type": "application/json"})
+    assert connection.getresponse().read() and connection.sock is not None
+    sock = connection.sock
+    for _ in range(3):  # the same connection answers every request
+        connection.request("GET", "/newspaper/5301")
+        response = connection.getresponse()
+        assert response.status == 200 and json.loads(response.read())["newspaper"]["name"] == "Keep Alive Times"
+        assert connection.sock is sock
+    connection.request("HEAD", "/newspaper/5301")
+    response = connection.getresponse()
+    assert response.status == 200 and response.read() == b""
+    connection.close()
+
+
+def test_streamed_upload_and_export(server, agency):
+    def rows():
+        for ID in (5302, 5303):
+            yield json.dumps({"paper_id": ID, "name": f"Streamed {ID}", "frequency": 1, "price": 1.0}).encode() + b"\n"
+
+    connection = http.client.HTTPConnection("127.0.0.1", server, timeout=10)
+    connection.request("POST", "/newspaper/import", rows(), {"Content-Type": "application/x-ndjson"}, encode_chunked=True)
+    assert json.loads(connection.getresponse().read())["imported"] == 2
+    connection.request("GET", "/newspaper/export")
+    exported = [json.loads(line) for line in connection.getresponse().read().splitlines()]
+    assert {5302, 5303} <= {paper["paper_id"] for paper in exported}
+
+
+def test_many_idle_connections(server, agency):
+    # idle keep-alive connections don't take a thread, a request still gets through
+    idle = [socket.create_connection(("127.0.0.1", server)) for _ in range(200)]
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server, timeout=10)
+        connection.request("GET", "/newspaper/")
+        assert connection.getresponse().status == 200
+    finally:
+        for sock in idle:
+            sock.close()
+
+
+def test_bad_requests(server):
+    with socket.create_connection(("127.0.0.1", server), timeout=10) as sock:
+        sock.sendall(b"NONSENSE\r\n\r\n")
+        assert sock.recv(1024).startswith(b"HTTP/1.1 400 ")
@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+
+from ...src.api import bulk_import
+from ...src.api.bulk_import import read_rows
+
+
+@pytest.fixture()
+def small_chunks(monkeypatch):
+    # rows are split across many reads
+    monkeypatch.setattr(bulk_import, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(bulk_import, "MAX_ROW_SIZE", 64)
+
+
+def rows(body, json_array=False):
+    return [(number, str(row) if isinstance(row, ValueError) else row)
+            for number, row in read_rows(io.BytesIO(body.encode()), json_array)]
+
+
+def test_read_ndjson_rows(small_chunks):
+    body = '{"name": "Käse", "ID": 1}\n\n{"name": broken}\n{"name": "B"}'
+    assert rows(body) == [(1, {"name": "Käse", "ID": 1}),
+                          (3, 'Invalid JSON: Expecting value: line 1 column 10 (char 9)'),
+                          (4, {"name": "B"})]
+
+
+def test_read_ndjson_skips_too_long_rows(small_chunks):
+    body = json.dumps({"name": "x" * 200}) + '\n{"name": "B"}\n'
+    assert rows(body) == [(1, "Row is longer than 64 bytes"), (2, {"name": "B"})]
+
+
+def test_read_json_array_rows(small_chunks):
+    body = ' [ {"name": "Käse", "ID": 1},\n {"name": "B"} ] '
+    assert rows(body, json_array=True) == [(1, {"name": "Käse", "ID": 1}), (2, {"name": "B"})]
+    assert rows("[]", json_array=True) == []
+
+
+def test_read_json_array_stops_at_a_broken_row(small_chunks):
+    first, broken = rows('[{"name": "A"}, {"name": broken}, {"name": "B"}]', json_array=True)
+    assert first == (1, {"name": "A"})
+    assert broken[0] == 2 and broken[1].startswith("Invalid JSON: Expecting value")
+    assert rows('{"name": "A"}', json_array=True) == [(1, "Invalid JSON: expected an array")]
+    assert rows('[{"name": "A"}', json_array=True) == [(1, {"name": "A"}), (2, "Invalid JSON: the array isn't closed")]
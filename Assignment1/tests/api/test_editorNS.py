@@ -1,3 +1,7 @@
+import json
+
+from ...src.api.pagination import encode_cursor
+
 # import the fixtures (this is necessary!)
 from ..fixtures import app, client, agency
 
@@ -118,3 +122,55 @@ def test_get_editor_issues_unknown_editor(client, agency):
 
     # test status code
     assert response.status_code == 404   # not found
+
+
+def test_post_import_editors(client, agency):
+    # prepare
+    editor_count_before = len(agency.editors)
+    rows = [{"ID": 5000, "name": "Import One", "address": "Bulk Street 1"},
+            {"ID": 5000, "name": "Import Two", "address": "Bulk Street 2"},  # the ID is taken, gets the next free one
+            {"name": "Import Three"},  # address missing
+            {"ID": 5002, "name": "Import One", "address": "Bulk Street 1"}]  # already exists
+
+    # act
+    response = client.post("/editor/import", data="\n".join(json.dumps(row) for row in rows),
+                           content_type="application/x-ndjson")
+    assert response.status_code == 200
+
+    # verify
+    parsed = response.get_json()
+    assert parsed["imported"] == 2
+    assert parsed["failed"] == 2
+    assert [error["row"] for error in parsed["errors"]] == [3, 4]
+    assert "address" in parsed["errors"][0]["error"]
+    assert len(agency.editors) == editor_count_before + 2
+    assert agency.get_editor(5001).name == "Import Two"
+    assert 5002 not in agency.editor_ids  # the ID of the failed row was given back
+
+
+def test_get_export_editors(client, agency):
+    response = client.get("/editor/export")
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert rows == client.get("/editor/").get_json()["editor"]
+
+
+def test_get_editor_issues_in_pages(client, agency):
+    editor = agency.get_editor(1)  # using testdata
+    keys = []
+    response = client.get("/editor/1/issues?limit=2")
+    while True:
+        assert response.status_code == 200
+        keys += [issue["issue_id"] for issue in response.get_json()["editor"]]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        response = client.get(f"/editor/1/issues?limit=2&cursor={response.headers['X-Next-Cursor']}")
+    assert keys == [issue_id for paper_id, issue_id in sorted(editor.issues_list.keys())]
+
+
+def test_get_editor_issues_with_invalid_cursors(client, agency):
+    # the cursor has to be a (newspaper ID, issue ID) pair
+    for key in [1, "abc", {"ID": 1}, [1], [1, "2"], [1, 2, 3], [True, 2], None]:
+        response = client.get(f"/editor/1/issues?limit=2&cursor={encode_cursor(key)}")
+        assert response.status_code == 400 and response.get_json()["message"] == "Invalid cursor"
+    assert client.get(f"/editor/1/issues?limit=2&cursor={encode_cursor([100, 1])}").status_code == 200
@@ -1,3 +1,5 @@
+import json
+
 # import the fixtures (this is necessary!)
 from ..fixtures import app, client, agency
 
@@ -444,6 +446,32 @@ def test_post_deliver_issue_with_unknown_issue(client, agency):
     assert response.status_code == 404  # not found
 
 
+def test_post_deliver_issue_to_all_subscribers(client, agency, app):
+    with app.app_context():
+        # arrange
+        newspaper = agency.get_newspaper(100)
+        issue = agency.get_issue(newspaper, 95)
+        expected = sum(1 for subscriber in newspaper.subscribers if issue.key() not in subscriber.delivered)
+
+        # send request
+        response = client.post("/newspaper/100/issue/95/deliver/bulk", json={})
+        # test status code
+        assert response.status_code == 200
+
+        # every subscriber got the issue once
+        assert response.get_json()["delivered"] == expected
+        assert all(issue.key() in subscriber.delivered for subscriber in newspaper.subscribers)
+        response = client.post("/newspaper/100/issue/95/deliver/bulk", json={"IDs": [103, 10333]})
+        assert response.get_json() == {"delivered": 0, "already_delivered": 1, "not_found": 1}
+
+
+def test_post_deliver_issue_to_all_subscribers_with_unknown_issue(client, agency):
+    # act
+    response = client.post("/newspaper/100/issue/795/deliver/bulk", json={})
+    # test status code
+    assert response.status_code == 404  # not found
+
+
 def test_get_info_about_a_specific_paper(client, agency):
     # send request
     response = client.get("/newspaper/100/stats")
@@ -452,10 +480,34 @@ def test_get_info_about_a_specific_paper(client, agency):
     assert response.status_code == 200
 
     parsed = response.get_json()
-    assert parsed == (f"The New York Times stats: "
-                      f"Number of Subscribers: 1 "
-                      f"Monthly revenue: 13.14 "
-                      f"Annual revenue: 157.68")
+    assert parsed.startswith(f"The New York Times stats: "
+                             f"Number of Subscribers: 1 "
+                             f"Monthly revenue: 13.14 "
+                             f"Annual revenue: 157.68 ")
+    stats = agency.issue_stats(agency.get_newspaper(100))
+    assert (f"Number of Issues: {stats['issues']} (released: {stats['released']}, undelivered: {stats['undelivered']}) "
+            f"Pages: {stats['pages']} (released: {stats['released_pages']}) ") in parsed
+
+
+def test_get_info_about_the_issues_of_a_paper(client, agency):
+    client.post("/newspaper/", json={"paper_id": 9500, "name": "Counted Times", "frequency": 1, "price": 2.0})
+    for ID in [9500, 9501]:
+        client.post("/subscriber/", json={"ID": ID, "name": f"Counted Reader {ID}", "address": "Count Street"})
+        client.post(f"/subscriber/{ID}/subscribe", json={"paper_id": 9500})
+    for issue_id, pages in [(1, 10), (2, 20), (3, 30)]:
+        client.post("/newspaper/9500/issue", json={"issue_id": issue_id, "releasedate": f"2026-10-{issue_id}",
+                                                   "released": False, "editor_id": 1, "pages": pages})
+    client.post("/newspaper/9500/issue/1/release")
+    client.post("/newspaper/9500/issue/2/release")
+    client.post("/newspaper/9500/issue/1/deliver", json={"ID": 9500})
+    # issue 1 is missing for one subscriber, issue 2 for both
+    assert client.get("/newspaper/9500/stats").get_json() == (
+        "Counted Times stats: Number of Subscribers: 2 Monthly revenue: 4.0 Annual revenue: 48.0 "
+        "Number of Issues: 3 (released: 2, undelivered: 3) Pages: 60 (released: 30) Editors: ['1: 3 issues, 60 pages']")
+    client.delete("/subscriber/9501")
+    assert "(released: 2, undelivered: 1)" in client.get("/newspaper/9500/stats").get_json()
+    client.delete("/newspaper/9500")
+    client.delete("/subscriber/9500")
 
 
 def test_get_info_about_a_specific_paper_with_unknown_paper(client, agency):
@@ -464,3 +516,110 @@ def test_get_info_about_a_specific_paper_with_unknown_paper(client, agency):
 
     # test status code
     assert response.status_code == 404  # not found
+
+
+def test_post_import_newspapers_and_issues(client, agency):
+    # prepare
+    paper_count_before = len(agency.newspapers)
+    papers = [{"paper_id": 5200, "name": "Imported Daily", "frequency": 1, "price": 2.5},
+              {"paper_id": 5201, "name": "Imported Weekly", "frequency": "weekly", "price": 4.0}]
+
+    # act
+    response = client.post("/newspaper/import", data="\n".join(json.dumps(row) for row in papers),
+                           content_type="application/x-ndjson")
+
+    # verify
+    assert response.status_code == 200
+    assert response.get_json()["imported"] == 1
+    assert response.get_json()["failed"] == 1
+    assert len(agency.newspapers) == paper_count_before + 1
+
+    issues = [{"issue_id": 1, "releasedate": "2026-04-01", "editor_id": 1, "pages": 20},
+              {"issue_id": 1, "releasedate": "2026-04-02", "editor_id": 1, "pages": 20},
+              {"issue_id": 3, "releasedate": "2026-04-03", "editor_id": 999999, "pages": 20}]
+    response = client.post("/newspaper/5200/issue/import", data="\n".join(json.dumps(row) for row in issues),
+                           content_type="application/x-ndjson")
+    assert response.status_code == 200
+    parsed = response.get_json()
+    assert parsed["imported"] == 2
+    assert parsed["errors"] == [{"row": 3, "error": "Editor with ID 999999 was not found"}]
+    paper = agency.get_newspaper(5200)
+    assert [issue.issue_id for issue in agency.all_issues(paper)] == [1, 2]
+    assert not any(issue.released for issue in agency.all_issues(paper))
+
+    response = client.post("/newspaper/1000000/issue/import", data="", content_type="application/x-ndjson")
+    assert response.status_code == 404  # not found
+
+
+def test_get_export_newspapers_and_issues(client, agency):
+    # the json format is the same document as the list endpoint
+    response = client.get("/newspaper/export?format=json")
+    assert response.status_code == 200
+    assert response.data == client.get("/newspaper/").data
+
+    response = client.get("/newspaper/100/issue/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert rows == client.get("/newspaper/100/issue").get_json()["issues"]
+
+    response = client.get("/newspaper/1000000/issue/export")
+    assert response.status_code == 404  # not found
+
+
+def test_get_newspapers_and_issues_in_pages(client, agency):
+    response = client.get("/newspaper/?limit=2")
+    assert [paper["paper_id"] for paper in response.get_json()["newspapers"]] == sorted(agency.newspapers.keys())[:2]
+    response = client.get(f"/newspaper/?cursor={response.headers['X-Next-Cursor']}")
+    assert [paper["paper_id"] for paper in response.get_json()["newspapers"]] == sorted(agency.newspapers.keys())[2:]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/newspaper/100/issue?limit=3")
+    issue_ids = sorted(agency.get_newspaper(100).issues.keys())
+    assert [issue["issue_id"] for issue in response.get_json()["issues"]] == issue_ids[:3]
+
+
+def test_get_newspaper_and_issues_with_fields(client, agency):
+    response = client.get("/newspaper/100?fields= name , paper_id")
+    assert response.status_code == 200
+    assert response.get_json() == {"newspaper": {"paper_id": 100, "name": agency.get_newspaper(100).name}}
+
+    response = client.get("/newspaper/100/issue?fields=issue_id,released")
+    assert [list(issue) for issue in response.get_json()["issues"]] == [["issue_id", "released"]] * len(agency.get_newspaper(100).issues)
+
+    # the projection is built once per field set
+    from ...src.api.projection import project
+    from ...src.api.newspaperNS import paper_model
+    assert project(paper_model, "name,paper_id") is project(paper_model, "paper_id,name,name")
+
+    # the documentation lists the parameter
+    assert "fields" in json.dumps(client.get("/swagger.json").get_json()["paths"]["/newspaper/"]["get"])
+
+
+def test_get_newspapers_and_issues_with_etags(client, agency):
+    response = client.get("/newspaper/")
+    etag = response.headers["ETag"]
+    response = client.get("/newspaper/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b"" and response.headers["ETag"] == etag
+    # every query has its own ETag
+    assert client.get("/newspaper/?limit=2").headers["ETag"] != etag
+    assert client.get("/newspaper/?limit=2", headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/newspaper/", json={"paper_id": 4700, "name": "ETag Times", "frequency": 7, "price": 3.5})
+    response = client.get("/newspaper/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    # a released issue changes the issue, the issue list of its paper, but not the paper itself
+    client.post("/newspaper/4700/issue", json={"issue_id": 1, "releasedate": "2026-10-17", "released": False, "editor_id": 0, "pages": 8})
+    etags = {url: client.get(url).headers["ETag"] for url in ["/newspaper/4700", "/newspaper/4700/issue", "/newspaper/4700/issue/1"]}
+    assert all(client.get(url, headers={"If-None-Match": etag}).status_code == 304 for url, etag in etags.items())
+    editor_id = next(iter(agency.editors.keys()))
+    client.post("/newspaper/4700/issue/1/editor", json={"ID": editor_id})
+    client.post("/newspaper/4700/issue/1/release")
+    assert [client.get(url, headers={"If-None-Match": etag}).status_code for url, etag in etags.items()] == [304, 200, 200]
+    assert client.get("/newspaper/4700/issue/1").get_json()["issue"]["released"] is True
+
+    # unknown objects have no ETag
+    assert "ETag" not in client.get("/newspaper/4799/issue/1").headers
@@ -0,0 +1,58 @@
+from ...src.api.response_cache import ResponseCache
+# import the fixtures (this is necessary!)
+from ..fixtures import app, client, agency
+
+
+def test_cache_drops_least_recently_used_entries():
+    cache = ResponseCache(maxsize=2)
+    cache.put("a", (1,), b"A")
+    cache.put("b", (2,), b"B")
+    assert cache.get("a", (1,)) == b"A"  # "a" is now the most recently used
+    cache.put("c", (3,), b"C")
+    assert cache.get("b", (2,)) is None
+    assert cache.get("a", (1,)) == b"A" and cache.get("c", (3,)) == b"C"
+    assert cache.get("a", (4,)) is None  # a newer version
+    assert cache.stats() == {"hits": 3, "misses": 2, "evictions": 1, "size": 2, "maxsize": 2}
+
+
+def test_stats_are_cached_until_they_change(client, agency):
+    editor_id = next(iter(agency.editors.keys()))
+    client.post("/newspaper/", json={"paper_id": 4800, "name": "Cached Times", "frequency": 7, "price": 2.0})
+    client.post("/subscriber/", json={"ID": 90020, "name": "Cached Reader", "address": "Cache Street"})
+    urls = ["/newspaper/4800/stats", "/subscriber/90020/stats", "/subscriber/90020/missingissues"]
+
+    def get_all():
+        responses = [client.get(url) for url in urls]
+        return [response.headers.get("X-Cache") for response in responses], [response.get_json() for response in responses]
+
+    first = get_all()
+    assert first[0] == ["MISS"] * 3
+    assert get_all() == (["HIT"] * 3, first[1])
+
+    client.post("/subscriber/90020/subscribe", json={"paper_id": 4800})
+    caching, (paper_stats, _, _) = get_all()
+    assert caching == ["MISS"] * 3
+    assert "Number of Subscribers: 1 " in paper_stats
+
+    client.post("/newspaper/4800/issue", json={"issue_id": 1, "releasedate": "2026-10-17", "released": False, "editor_id": editor_id, "pages": 8})
+    client.post("/newspaper/4800/issue/1/release")
+    caching, (paper_stats, _, missing) = get_all()
+    assert caching == ["MISS"] * 3
+    assert "(released: 1, undelivered: 1)" in paper_stats and "Cached Times: Issues with ID 1" in missing
+
+    client.post("/newspaper/4800/issue/1/deliver", json={"ID": 90020})
+    caching, (paper_stats, subscriber_stats, missing) = get_all()
+    assert caching == ["MISS"] * 3  # the paper stats count the undelivered issues
+    assert "(released: 1, undelivered: 0)" in paper_stats
+    assert "Cached Times: 1" in subscriber_stats and "Cached Times" not in missing
+    assert get_all()[0] == ["HIT"] * 3
+
+    client.post("/newspaper/4800", json={"paper_id": 4800, "name": "Cached Times", "frequency": 7, "price": 3.0})
+    caching, (paper_stats, subscriber_stats, _) = get_all()
+    assert caching == ["MISS"] * 3
+    assert "Monthly revenue: 3.0 " in paper_stats and "Cost: 3.0 monthly" in subscriber_stats
+
+    client.delete("/newspaper/4800")
+    caching, (_, subscriber_stats, _) = get_all()
+    assert caching == [None, "MISS", "MISS"]  # the paper answers 404, errors aren't cached
+    assert "Number of newspaper subscriptions: 0 " in subscriber_stats
@@ -0,0 +1,60 @@
+import json
+
+from flask_restx import marshal
+
+from ...src.api.editorNS import editor_model
+from ...src.api.newspaperNS import paper_model, issue_model
+from ...src.api.serializers import encode
+from ...src.app import create_app
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.subscriber import Subscriber
+# import the fixtures (this is necessary!)
+from ..fixtures import app, client, agency
+
+
+def test_encoders_write_what_marshal_writes():
+    objects = [(Newspaper(paper_id=1, name="Die Zeit – Ausgabe \"Wien\"\n", frequency=7, price=3), paper_model),
+               (Newspaper(paper_id=2, name=None, frequency=True, price=float("inf")), paper_model),
+               (Newspaper(paper_id=3, name="x", frequency=1, price=0.1 + 0.2), paper_model),
+               (Issue(releasedate=2024-10-15, issue_id=4, released=1, editor_id=None, pages="12"), issue_model),
+               (Issue(releasedate="😀", issue_id=5, released="false", editor_id=0, pages=0), issue_model),
+               (Subscriber(ID=6, name="Zoë", address="Straße 1"), editor_model)]
+    for obj, model in objects:
+        assert encode(obj, model) == json.dumps(marshal(obj, model))
+        assert encode([obj, obj], model, "envelope") == json.dumps(marshal([obj, obj], model, "envelope"))
+    assert encode(None, paper_model, "newspaper") == json.dumps(marshal(None, paper_model, "newspaper"))
+    assert encode([], paper_model, "newspapers") == json.dumps(marshal([], paper_model, "newspapers"))
+
+
+def test_responses_are_the_same_as_with_marshal(client, agency, app):
+    urls = ["/newspaper/", "/newspaper/100", "/newspaper/999999", "/newspaper/100/issue", "/newspaper/100/issue/93",
+            "/newspaper/?fields=name&limit=2", "/editor/", "/editor/1", "/editor/1/issues", "/subscriber/",
+            "/subscriber/103", "/subscriber/?fields=ID"]
+    for url in urls:
+        compiled = client.get(url)
+        app.config["COMPILED_SERIALIZERS"] = False
+        marshalled = client.get(url)
+        app.config["COMPILED_SERIALIZERS"] = True
+        assert compiled.status_code == marshalled.status_code == 200
+        assert compiled.data == marshalled.data
+        assert compiled.headers == marshalled.headers
+
+
+def test_compiled_serializers_from_the_environment(monkeypatch, agency):
+    monkeypatch.delenv("PAPERBACK_COMPILED_SERIALIZERS", raising=False)  # (the tests can run with either)
+    assert create_app().config["COMPILED_SERIALIZERS"] is True
+    monkeypatch.setenv("PAPERBACK_COMPILED_SERIALIZERS", "0")
+    app = create_app()
+    assert app.config["COMPILED_SERIALIZERS"] is False
+    monkeypatch.setenv("PAPERBACK_COMPILED_SERIALIZERS", "1")
+    compiled = create_app().test_client().get("/newspaper/100")
+    assert app.test_client().get("/newspaper/100").data == compiled.data
+
+
+def test_responses_fall_back_to_marshal(client, agency, app):
+    # the X-Fields mask and the indentation in debug mode are left to flask_restx
+    response = client.get("/newspaper/100", headers={"X-Fields": "name"})
+    assert response.get_json() == {"newspaper": {"name": agency.get_newspaper(100).name}}
+    app.debug = True
+    assert client.get("/newspaper/100").data.startswith(b'{\n    "newspaper": {\n')
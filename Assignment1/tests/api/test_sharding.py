@@ -0,0 +1,138 @@
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+from ...src.asyncio_server import serve
+from ...src.sharding import create_sharded_app, route, ONE, ANY, ALL, STATS, MISSING, EDITOR_ISSUES
+from ..fixtures import app, client, agency
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    # the router with two worker processes, served on a free port in a thread with its own event loop
+    router = create_sharded_app(2, workers=4)
+    started = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+
+        def listening(server):
+            state["port"] = server.sockets[0].getsockname()[1]
+            started.set()
+        state["task"] = loop.create_task(serve(router, port=0, started=listening))
+        try:
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(60)
+    yield router, state["port"]
+    state["loop"].call_soon_threadsafe(state["task"].cancel)
+    thread.join(30)
+    router.stop()
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.request(method, path, json.dumps(body) if body is not None else None, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data, response.getheader("X-Next-Cursor")
+
+
+def test_routes():
+    assert route("POST", "/newspaper/", 4) == (ALL, None)
+    assert route("POST", "/subscriber/import", 4) == (ALL, None)
+    assert route("DELETE", "/subscriber/7", 4) == (ALL, None)
+    assert route("POST", "/newspaper/9/issue/1/deliver", 4) == (ONE, 1)
+    assert route("GET", "/newspaper/6", 4) == (ONE, 2)
+    assert route("POST", "/subscriber/7/subscribe", 4) == (ALL, None)
+    assert route("GET", "/subscriber/7/stats", 4) == (STATS, None)
+    assert route("GET", "/subscriber/7/missingissues", 4) == (MISSING, None)
+    assert route("GET", "/editor/7/issues", 4) == (EDITOR_ISSUES, None)
+    assert route("GET", "/subscriber/7", 4) == (ONE, 3)
+    assert route("GET", "/newspaper/export", 4) == (ANY, None)
+
+
+def test_same_answers_as_one_agency(sharded, client, agency):
+    # the same requests to the sharded agency and to one agency (the newspapers 8400 and 8401 are in different shards)
+    _, port = sharded
+    steps = [("POST", "/newspaper/", {"paper_id": 8400, "name": "Sharded Daily", "frequency": 1, "price": 1.5}),
+             ("POST", "/newspaper/", {"paper_id": 8401, "name": "Sharded Weekly", "frequency": 7, "price": 2.25}),
+             ("POST", "/editor/", {"ID": 8400, "name": "Shard Editor", "address": "Shard Street 1"}),
+             ("POST", "/subscriber/", {"ID": 8400, "name": "Shard Reader", "address": "Shard Street 2"}),
+             ("POST", "/subscriber/", {"ID": 8401, "name": "Other Shard Reader", "address": "Shard Street 3"}),
+             ("POST", "/subscriber/8400/subscribe", {"paper_id": 8400}),
+             ("POST", "/subscriber/8400/subscribe", {"paper_id": 8401}),
+             ("POST", "/subscriber/8401/subscribe", {"paper_id": 8401})]
+    for paper_id in (8400, 8401):
+        for issue_id in (1, 2, 3):
+            steps += [("POST", f"/newspaper/{paper_id}/issue", {"issue_id": issue_id, "releasedate": "2024-01-01",
+                                                                 "editor_id": 8400, "pages": 10 + issue_id}),
+                      ("POST", f"/newspaper/{paper_id}/issue/{issue_id}/release", None)]
+        steps += [("POST", f"/newspaper/{paper_id}/issue/1/deliver", {"ID": 8400}),
+                  ("POST", f"/newspaper/{paper_id}/issue/2/deliver/bulk", {})]
+    steps += [("POST", "/newspaper/8400/issue/3/deliver", {"ID": 8401}),  # a special issue
+              ("GET", "/subscriber/8400/stats", None), ("GET", "/subscriber/8401/stats", None),
+              ("GET", "/subscriber/8400/missingissues", None), ("GET", "/subscriber/8401/missingissues", None),
+              # subscribed to the newspaper of the second shard first, the missing issues keep that order
+              ("POST", "/subscriber/8401/subscribe", {"paper_id": 8400}),
+              ("GET", "/subscriber/8401/missingissues", None), ("GET", "/subscriber/8401/stats", None),
+              ("GET", "/editor/8400/issues", None), ("GET", "/newspaper/8401/stats", None),
+              ("POST", "/newspaper/8401", {"name": "Sharded Weekly", "frequency": 7, "price": 3.5}),
+              ("GET", "/subscriber/8400/stats", None),
+              ("DELETE", "/editor/8400", None), ("GET", "/newspaper/8401/issue/1", None),
+              ("DELETE", "/newspaper/8400", None), ("GET", "/subscriber/8400/missingissues", None),
+              ("DELETE", "/subscriber/8400", None), ("GET", "/newspaper/8401/stats", None)]
+    statuses = []
+    for method, path, body in steps:
+        status, data, _ = request(port, method, path, body)
+        expected = client.open(path, method=method, json=body)
+        assert (status, data) == (expected.status_code, expected.data), (method, path)
+        statuses.append(status)
+    assert statuses.count(200) == len(steps)
+    assert request(port, "GET", "/subscriber/8400/stats")[0] == 404
+
+
+def test_issues_stay_in_their_shard(sharded):
+    router, port = sharded
+    request(port, "POST", "/newspaper/", {"paper_id": 8411, "name": "Odd Shard News", "frequency": 1, "price": 1.0})
+    request(port, "POST", "/editor/", {"ID": 8410, "name": "Odd Editor", "address": "Odd Street"})
+    status, _, _ = request(port, "POST", "/newspaper/8411/issue", {"issue_id": 1, "releasedate": "2024-01-01",
+                                                                    "editor_id": 8410, "pages": 4})
+    assert status == 200
+    # every shard has the newspaper, only shard 1 (8411 % 2) its issues
+    assert json.loads(request(router.shards[0].port, "GET", "/newspaper/8411/issue")[1])["issues"] == []
+    assert len(json.loads(request(router.shards[1].port, "GET", "/newspaper/8411/issue")[1])["issues"]) == 1
+    assert all(request(shard.port, "GET", "/newspaper/8411")[0] == 200 for shard in router.shards)
+
+
+def test_editor_issue_pages(sharded):
+    _, port = sharded
+    request(port, "POST", "/editor/", {"ID": 8420, "name": "Paging Editor", "address": "Page Street"})
+    for paper_id in (8420, 8421, 8422):
+        request(port, "POST", "/newspaper/", {"paper_id": paper_id, "name": f"Paged {paper_id}", "frequency": 1,
+                                              "price": 1.0})
+        for issue_id in (1, 2):
+            request(port, "POST", f"/newspaper/{paper_id}/issue", {"issue_id": issue_id, "releasedate": "2024-01-01",
+                                                                   "editor_id": 8420, "pages": issue_id})
+    everything = json.loads(request(port, "GET", "/editor/8420/issues")[1])["editor"]
+    assert len(everything) == 6
+    pages, cursor = [], None
+    while True:
+        status, data, cursor = request(port, "GET", "/editor/8420/issues?limit=3" + (f"&cursor={cursor}" if cursor else ""))
+        assert status == 200
+        pages += json.loads(data)["editor"]
+        if cursor is None:
+            break
+    assert pages == everything
+    assert request(port, "GET", "/editor/8420/issues?limit=3&cursor=nonsense")[0] == 400
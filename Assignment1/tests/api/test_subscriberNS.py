@@ -1,3 +1,7 @@
+import json
+
+from ...src.api.pagination import encode_cursor
+
 # import the fixtures (this is necessary!)
 from ..fixtures import app, client, agency
 
@@ -237,3 +241,103 @@ def test_check_missingissues_with_unknown_subscriber(client, agency):
 
     # test status code
     assert response.status_code == 404  # not found
+
+
+def test_post_import_subscribers_as_json_array(client, agency):
+    # prepare
+    subscriber_count_before = len(agency.subscribers)
+    rows = [{"ID": 5100 + i, "name": f"Imported Reader {i}", "address": "Bulk Street"} for i in range(2500)]
+    rows.insert(1000, {"ID": "wrong", "name": "Broken", "address": "Bulk Street"})
+
+    # act (more rows than fit into one batch)
+    response = client.post("/subscriber/import", data=json.dumps(rows), content_type="application/json")
+    assert response.status_code == 200
+
+    # verify
+    parsed = response.get_json()
+    assert parsed["imported"] == 2500
+    assert parsed["failed"] == 1
+    assert parsed["errors"][0]["row"] == 1001
+    assert len(agency.subscribers) == subscriber_count_before + 2500
+    assert agency.get_subscriber(7599).name == "Imported Reader 2499"
+
+
+def test_get_export_subscribers(client, agency):
+    response = client.get("/subscriber/export?format=json")
+    assert response.status_code == 200
+    assert response.data == client.get("/subscriber/").data
+
+    response = client.get("/subscriber/export?format=xml")
+    assert response.status_code == 400  # unknown format
+
+
+def test_get_subscribers_in_pages(client, agency):
+    # walking through all pages gives every subscriber once (in ID order)
+    IDs = []
+    response = client.get("/subscriber/?limit=1000")
+    while True:
+        assert response.status_code == 200
+        page = [subscriber["ID"] for subscriber in response.get_json()["subscriber"]]
+        assert 0 < len(page) <= 1000
+        IDs += page
+        if "X-Next-Cursor" not in response.headers:
+            break
+        response = client.get(f"/subscriber/?limit=1000&cursor={response.headers['X-Next-Cursor']}")
+    assert IDs == sorted(agency.subscribers.keys())
+
+
+def test_get_subscribers_in_pages_with_changes_in_between(client, agency, app):
+    for ID in [90001, 90002, 90003, 90005]:
+        client.post("/subscriber/", json={"ID": ID, "name": f"Page Reader {ID}", "address": "Page Street"})
+    app.config["MAX_PAGE_SIZE"] = 2  # a bigger limit is cut down
+    response = client.get(f"/subscriber/?limit=50&cursor={encode_cursor(90000)}")
+    assert [subscriber["ID"] for subscriber in response.get_json()["subscriber"]] == [90001, 90002]
+    # removing a subscriber of the first page and adding one behind it doesn't shift the next page
+    client.delete("/subscriber/90001")
+    client.post("/subscriber/", json={"ID": 90004, "name": "Page Reader 90004", "address": "Page Street"})
+    response = client.get(f"/subscriber/?cursor={response.headers['X-Next-Cursor']}")
+    assert [subscriber["ID"] for subscriber in response.get_json()["subscriber"]] == [90003, 90004]
+
+
+def test_get_subscribers_with_invalid_page_parameters(client, agency):
+    assert client.get("/subscriber/?cursor=not-a-cursor").status_code == 400
+    # cursors that decode, but not to a subscriber ID
+    for key in ["abc", {"ID": 1}, [1, 2], True, 1.5, None]:
+        response = client.get(f"/subscriber/?cursor={encode_cursor(key)}")
+        assert response.status_code == 400 and response.get_json()["message"] == "Invalid cursor"
+    assert client.get("/subscriber/?limit=0").status_code == 400
+    assert client.get("/subscriber/?limit=many").status_code == 400
+
+
+def test_get_subscribers_with_fields(client, agency):
+    response = client.get("/subscriber/?fields=ID,name")
+    assert response.status_code == 200
+    subscribers = response.get_json()["subscriber"]
+    assert len(subscribers) == len(agency.subscribers)
+    assert all(list(subscriber) == ["ID", "name"] for subscriber in subscribers)
+
+    # together with a page
+    response = client.get("/subscriber/?fields=name&limit=2")
+    assert [list(subscriber) for subscriber in response.get_json()["subscriber"]] == [["name"], ["name"]]
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get("/subscriber/export?fields=ID")
+    assert json.loads(response.data.decode().splitlines()[0]) == {"ID": min(agency.subscribers.keys())}
+
+    response = client.get("/subscriber/?fields=ID,password")
+    assert response.status_code == 400  # unknown field
+
+
+def test_get_subscriber_with_etags(client, agency):
+    client.post("/subscriber/", json={"ID": 90010, "name": "ETag Reader", "address": "ETag Street"})
+    urls = ["/subscriber/90010", "/subscriber/90010/stats", "/subscriber/90010/missingissues"]
+    etags = {url: client.get(url).headers["ETag"] for url in urls}
+    assert all(client.get(url, headers={"If-None-Match": etag}).status_code == 304 for url, etag in etags.items())
+    assert client.get("/subscriber/90010", headers={"If-None-Match": "*"}).status_code == 304
+
+    client.post("/subscriber/90010", json={"ID": 90010, "name": "ETag Reader", "address": "New Street"})
+    response = client.get("/subscriber/90010", headers={"If-None-Match": etags["/subscriber/90010"]})
+    assert response.status_code == 200
+    assert response.get_json()["subscriber"]["address"] == "New Street"
+    # the fields have their own ETag
+    assert client.get("/subscriber/90010?fields=ID").headers["ETag"] != response.headers["ETag"]
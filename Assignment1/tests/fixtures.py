@@ -19,7 +19,9 @@ def client(app):
 @pytest.fixture()
 def agency(app):
     agency = Agency.get_instance()
-    populate(agency)
-    populate_issues(agency.newspapers[0])  # add issues to the first newspaper in the list (ID 100)
+    # the agency is a singleton, so the testdata is only added once (the objects go through the agency's indexes)
+    if not agency.newspapers:
+        populate(agency)
+        populate_issues(agency, agency.get_newspaper(100))  # add issues to the newspaper with ID 100
     yield agency
 
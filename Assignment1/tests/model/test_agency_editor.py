@@ -1,6 +1,8 @@
 import pytest
 
 from ...src.model.editor import Editor
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
 from ..fixtures import app, client, agency
 
 
@@ -104,3 +106,51 @@ def test_get_editor_issues(agency, app):
         agency.add_editor_to_issue(issue, editor)
         assert len(editor.issues_list) == before + 1
         assert editor.issues_list == agency.get_editor_issues(editor)
+
+
+# remove an editor with issues:
+def test_remove_editor_transfers_issues(agency, app):
+    with app.app_context():
+        paper = Newspaper(paper_id=4401, name="Harbour Weekly", frequency=7, price=1.00)
+        agency.add_newspaper(paper)
+        leaving = Editor(ID=4400, name="Lotte", address="Harbour 1")
+        staying = Editor(ID=4401, name="Lukas", address="Harbour 2")
+        agency.add_editor(leaving)
+        agency.add_editor(staying)
+        agency.add_issue(paper, Issue(issue_id=4400, releasedate=2026-5-1, released=False, editor_id=4400, pages=4))
+        agency.add_issue(paper, Issue(issue_id=4401, releasedate=2026-5-2, released=False, editor_id=4401, pages=4))
+        other_paper = Newspaper(paper_id=4400, name="Only Lotte", frequency=7, price=1.00)
+        agency.add_newspaper(other_paper)
+        orphan = Issue(issue_id=1, releasedate=2026-5-3, released=False, editor_id=4400, pages=4)
+        agency.add_issue(other_paper, orphan)
+
+        agency.remove_editor(leaving)
+        transferred = agency.get_issue(paper, 4400)
+        assert transferred.editor_id == 4401
+        assert transferred in staying.issues_list
+        assert len(staying.issues_list) == 2
+        # nobody else works for the other paper, so the issue needs a new editor
+        assert orphan.editor_id == 0
+
+
+# the issues of a deleted newspaper leave the lists of their editors, so a newspaper that gets its ID doesn't get them:
+def test_remove_editor_after_newspaper_was_recreated(agency, app):
+    with app.app_context():
+        leaving = agency.add_editor(Editor(ID=9200, name="Greta", address="Reprint Road 1"))
+        staying = agency.add_editor(Editor(ID=9201, name="Gustav", address="Reprint Road 2"))
+        paper = agency.add_newspaper(Newspaper(paper_id=9200, name="Reprint Daily", frequency=1, price=1.00))
+        agency.add_issue(paper, Issue(issue_id=1, releasedate=2026-6-1, released=False, editor_id=9200, pages=9200))
+        agency.add_issue(paper, Issue(issue_id=2, releasedate=2026-6-2, released=False, editor_id=9201, pages=9201))
+        agency.remove_newspaper(paper)
+        assert len(agency.get_editor_issues(leaving)) == 0 and len(agency.get_editor_issues(staying)) == 0
+        assert 9200 not in agency.paper_editors
+
+        paper = agency.add_newspaper(Newspaper(paper_id=9200, name="Reprint Daily", frequency=1, price=1.00))
+        issue = agency.add_issue(paper, Issue(issue_id=1, releasedate=2026-6-3, released=False, editor_id=9201, pages=9202))
+        agency.remove_editor(leaving)
+        assert [i.pages for i in agency.get_editor_issues(agency.get_editor(9201))] == [9202]
+        assert [i.pages for i in agency.all_issues(paper)] == [9202]
+        assert agency.get_issue(paper, 1).editor_id == 9201
+        assert agency.paper_editors[9200] == {9201: 1}
+        agency.remove_issue(paper, issue)
+        agency.add_issue(paper, Issue(issue_id=1, releasedate=2026-6-3, released=False, editor_id=9201, pages=9202))
@@ -1,6 +1,13 @@
 import pytest
+from flask_restx import marshal
 
+from ...src.api.newspaperNS import issue_model
+from ...src.app import create_app
+from ...src.model.agency import Agency
+from ...src.model.editor import Editor
 from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.subscriber import Subscriber
 from ..fixtures import app, client, agency
 
 
@@ -224,3 +231,185 @@ def test_deliver_issue_not_released(agency, app):
             # this one should raise an exception!
             agency.deliver_issue(subscriber, issue, paper)
         assert len(subscriber.issues_list) == before
+
+
+# the issue indexes have to follow releases and updates:
+def test_issue_index_follows_release_and_update(agency, app):
+    with app.app_context():
+        paper = agency.get_newspaper(101)  # using testdata
+        issue = Issue(issue_id=3001, releasedate=2026-1-5, released=False, editor_id=1, pages=8)
+        agency.add_issue(paper, issue)
+        assert issue.newspaper_id == paper.paper_id
+        agency.release_issue(issue)
+        # the released issue no longer equals an unreleased one with the same data
+        unreleased = Issue(issue_id=3002, releasedate=2026-1-5, released=False, editor_id=1, pages=8)
+        agency.add_issue(paper, unreleased)
+        updated = Issue(issue_id=3001, releasedate=2026-1-6, released=True, editor_id=1, pages=8, newspaper_id=paper.paper_id)
+        agency.update_issue(paper, issue, updated)
+        ids = [x.issue_id for x in agency.all_issues(paper)]
+        assert ids.index(3001) < ids.index(3002)  # the updated issue keeps its position
+        assert agency.get_issue(paper, 3001) is updated
+        agency.remove_issue(paper, unreleased)
+        assert agency.get_issue(paper, 3002) is None
+        agency.add_issue(paper, Issue(issue_id=3003, releasedate=2026-1-5, released=False, editor_id=1, pages=8))
+
+
+def test_deliver_issue_checks_delivered_keys(agency, app):
+    with app.app_context():
+        paper = agency.get_newspaper(101)  # using testdata
+        subscriber = agency.get_subscriber(160)  # using testdata
+        first = Issue(issue_id=3100, releasedate=2026-2-1, released=False, editor_id=1, pages=8)
+        second = Issue(issue_id=3101, releasedate=2026-2-2, released=False, editor_id=1, pages=8)
+        for issue in [first, second]:
+            agency.add_issue(paper, issue)
+            agency.release_issue(issue)
+        agency.deliver_issue(subscriber, first, paper)
+        assert first.key() in subscriber.delivered
+        assert second.key() not in subscriber.delivered
+        agency.deliver_issue(subscriber, second, paper)
+        # the ordered history stays available
+        assert list(subscriber.issues_list)[-2:] == [first, second]
+
+
+# the issue columns have to give the same aggregates as the Issue objects:
+def test_issue_columns_follow_issue_changes(app):
+    with app.app_context():
+        agency = Agency()  # a separate agency, so the columns don't change the shared testdata
+        for editor_id in [1, 2]:
+            agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address="Office"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Columns", frequency=1, price=2.0))
+        subscriber = agency.add_subscriber(Subscriber(ID=1, name="Reader", address="Home"))
+        agency.subscribe_to_paper(subscriber, paper)
+        issues = [agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1 + issue_id % 2, pages=issue_id))
+                  for issue_id in range(1, 7)]
+        before = agency.issue_stats(paper)
+        agency.enable_issue_columns()
+        assert agency.issue_stats(paper) == before
+
+        agency.release_issue(issues[0])
+        agency.release_issue(issues[1])
+        agency.deliver_issue(subscriber, issues[0], paper)
+        agency.update_issue(paper, issues[2], Issue(issue_id=3, releasedate="day 3", editor_id=2, pages=30, newspaper_id=1))
+        agency.remove_issue(paper, issues[3])
+        agency.remove_editor(agency.get_editor(1))
+        agency.add_issue(paper, Issue(issue_id=7, releasedate="day 7", editor_id=0, pages=7))
+        stats = agency.issue_stats(paper)
+        columns, paper.columns = paper.columns, None
+        assert stats == agency.issue_stats(paper)
+        assert stats == {"issues": 6, "released": 2, "pages": 1 + 2 + 30 + 5 + 6 + 7, "released_pages": 3,
+                         "editors": {2: {"issues": 5, "pages": 1 + 2 + 30 + 5 + 6}}, "undelivered": 1}
+        # the rows read like the issues they were built from
+        for issue in paper.issues:
+            assert marshal(columns.view(issue.issue_id), issue_model) == marshal(issue, issue_model)
+        assert columns.view(4) is None
+
+
+def test_issue_columns_from_the_environment(monkeypatch):
+    monkeypatch.setattr(Agency, "singleton_instance", Agency())  # a separate agency, for the same reason
+    assert create_app().config["ISSUE_COLUMNS"] is False and not Agency.get_instance().columnar_issues
+    monkeypatch.setenv("PAPERBACK_ISSUE_COLUMNS", "1")
+    assert create_app().config["ISSUE_COLUMNS"] is True and Agency.get_instance().columnar_issues
+
+
+def test_deliver_issue_to_subscribers(agency, app):
+    with app.app_context():
+        paper = agency.add_newspaper(Newspaper(paper_id=4600, name="Fan-out Times", frequency=1, price=1.5))
+        subscribers = [agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address="Fan-out Street"))
+                       for ID in range(4601, 4604)]
+        for subscriber in subscribers:
+            agency.subscribe_to_paper(subscriber, paper)
+        issue = agency.add_issue(paper, Issue(issue_id=1, releasedate=2026-3-1, released=False, editor_id=1, pages=4))
+        with pytest.raises(ValueError, match="hasn't been released yet"):
+            agency.deliver_issue_to_subscribers(issue, paper)
+        agency.release_issue(issue)
+        agency.deliver_issue(subscribers[0], issue, paper)
+
+        response = agency.deliver_issue_to_subscribers(issue, paper)
+        assert response.get_json() == {"delivered": 2, "already_delivered": 1, "not_found": 0}
+        for subscriber in subscribers:
+            assert issue.key() in subscriber.delivered
+            assert paper.paper_id not in subscriber.missing
+            assert subscriber.received[paper.paper_id] == 1
+        # explicit IDs, also subscribers without a subscription (special issue)
+        response = agency.deliver_issue_to_subscribers(issue, paper, [4601, 160, 160, 4699])
+        assert response.get_json() == {"delivered": 1, "already_delivered": 1, "not_found": 1}
+        assert issue.issue_id in agency.get_subscriber(160).special_issues[paper.paper_id]
+
+
+def test_versions_follow_changes(app):
+    with app.app_context():
+        agency = Agency()  # a separate agency, so the test doesn't depend on the order of the other tests
+        editor = agency.add_editor(Editor(ID=1, name="Editor", address="Office"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Versions", frequency=1, price=2.0))
+        subscriber = agency.add_subscriber(Subscriber(ID=1, name="Reader", address="Home"))
+        issue = agency.add_issue(paper, Issue(issue_id=1, releasedate="day 1", editor_id=1, pages=4))
+
+        def current():
+            return [obj.version for obj in [agency.newspapers, paper, paper.issues, paper.subscribers, issue,
+                                            agency.editors, editor, editor.issues_list, agency.subscribers, subscriber]]
+
+        before = current()
+        assert all(obj.version > 0 for obj in [paper, issue, editor, subscriber])
+        agency.subscribe_to_paper(subscriber, paper)
+        after = current()
+        changed = [i for i, (old, new) in enumerate(zip(before, after)) if old != new]
+        assert changed == [3, 9]  # paper.subscribers and the subscriber
+
+        before = after
+        agency.release_issue(issue)  # released in place: the issue and both issue lists (and the subscriber's missing issues)
+        after = current()
+        assert [i for i, (old, new) in enumerate(zip(before, after)) if old != new] == [2, 4, 7, 9]
+
+        before = after
+        agency.deliver_issue(subscriber, issue, paper)
+        after = current()
+        assert [i for i, (old, new) in enumerate(zip(before, after)) if old != new] == [9]
+        assert max(after) > max(before)  # one counter for everything, so the versions only go up
+
+        # an updated newspaper is a new object with a new version, its subscribers see the new name in their stats
+        version = subscriber.version
+        paper = agency.update_newspaper(paper, Newspaper(paper_id=1, name="Renamed", frequency=1, price=2.0))
+        assert paper.version > max(after) and subscriber.version > version
+
+
+# a removed issue is taken back from the subscribers who received it, so the issue that gets its ID can be delivered
+def test_removed_issue_stays_delivered(agency, app):
+    with app.app_context():
+        paper = agency.add_newspaper(Newspaper(paper_id=9100, name="Second Chance Times", frequency=1, price=1.5))
+        subscriber = agency.add_subscriber(Subscriber(ID=9100, name="Second Reader", address="Chance Street 1"))
+        agency.subscribe_to_paper(subscriber, paper)
+        issue = agency.add_issue(paper, Issue(issue_id=1, releasedate="2026-4-1", editor_id=1, pages=9100))
+        agency.release_issue(issue)
+        agency.deliver_issue(subscriber, issue, paper)
+        agency.deliver_issue(agency.get_subscriber(160), issue, paper)  # a special issue
+        agency.remove_issue(paper, issue)
+        # the delivery history stays, but the removed issue isn't counted anymore
+        subscriber = agency.get_subscriber(9100)
+        assert [i.pages for i in subscriber.issues_list] == [9100] and issue.key() in subscriber.delivered
+        assert paper.paper_id not in subscriber.received
+        assert paper.paper_id not in agency.get_subscriber(160).special_issues
+        # its ID isn't handed out again while subscribers have it
+        with pytest.raises(ValueError):
+            agency.add_issue(paper, Issue(issue_id=1, releasedate="2026-4-2", editor_id=1, pages=9101))
+        assert paper.issue_ids.allocate(1) == 2
+        recreated = agency.add_issue(paper, Issue(issue_id=2, releasedate="2026-4-2", editor_id=1, pages=9101))
+        agency.release_issue(recreated)
+        assert agency.get_subscriber(9100).missing == {paper.paper_id: {2: None}}
+        agency.deliver_issue(subscriber, recreated, paper)
+        subscriber = agency.get_subscriber(9100)
+        assert [i.pages for i in subscriber.issues_list] == [9100, 9101]
+        assert subscriber.received == {paper.paper_id: 1} and subscriber.missing == {}
+        agency.deliver_issue(agency.get_subscriber(160), recreated, paper)
+        # removing the newspaper keeps its issues in the issue lists too, also the special issues
+        agency.remove_newspaper(paper)
+        assert [i.pages for i in agency.get_subscriber(9100).issues_list] == [9100, 9101]
+        assert paper.paper_id not in agency.get_subscriber(160).received
+        assert paper.paper_id not in agency.get_subscriber(160).special_issues
+        assert recreated.key() in agency.get_subscriber(160).delivered
+        # a new newspaper with the same ID doesn't get their IDs either, until nobody has them anymore
+        agency.remove_subscriber(agency.get_subscriber(9100))
+        paper = agency.add_newspaper(Newspaper(paper_id=9100, name="Third Chance Times", frequency=1, price=1.5))
+        assert paper.issue_ids.allocate(1) == 3
+        with pytest.raises(ValueError):
+            agency.add_issue(paper, Issue(issue_id=2, releasedate="2026-4-3", editor_id=1, pages=9102))
+        agency.remove_newspaper(paper)
@@ -105,3 +105,19 @@ def test_update_newspaper(agency, app):
         with pytest.raises(ValueError, match='Newspaper already up to date'):
             # updating newspaper without a change should raise an exception!
             agency.update_newspaper(updated_paper, updated_paper)
+
+
+# the ID index must not change the order of the listing:
+def test_all_newspapers_keeps_insertion_order(agency):
+    first = Newspaper(paper_id=600, name="Morning Post", frequency=1, price=2.00)
+    second = Newspaper(paper_id=601, name="Evening Post", frequency=1, price=2.50)
+    third = Newspaper(paper_id=602, name="Night Post", frequency=1, price=3.00)
+    for paper in [first, second, third]:
+        agency.add_newspaper(paper)
+    agency.update_newspaper(second, Newspaper(paper_id=601, name="Evening Post", frequency=2, price=2.50))
+    agency.remove_newspaper(first)
+    ids = [paper.paper_id for paper in agency.all_newspapers()]
+    assert ids.index(601) < ids.index(602)
+    assert 600 not in ids
+    assert agency.get_newspaper(600) is None
+    assert agency.get_newspaper(601).frequency == 2
@@ -1,5 +1,6 @@
 import pytest
 
+from ...src.model.newspaper import Newspaper
 from ...src.model.subscriber import Subscriber
 from ...src.model.issue import Issue
 from ..fixtures import app, client, agency
@@ -45,6 +46,19 @@ def test_add_subscriber_same_person_should_raise_error(agency):
     assert len(agency.all_subscribers()) == before + 1  # make sure only 1 subscriber got added to the list
 
 
+def test_duplicate_check_follows_updates_and_removals(agency):
+    old = Subscriber(ID=4001, name="Ida", address="Riverside 1")
+    agency.add_subscriber(old)
+    moved = Subscriber(ID=4001, name="Ida", address="Hillside 2")
+    agency.update_subscriber(old, moved)
+    # the old address is free again, the new one is taken
+    agency.add_subscriber(Subscriber(ID=4002, name="Ida", address="Riverside 1"))
+    with pytest.raises(ValueError, match='Subscriber Ida already exists'):
+        agency.add_subscriber(Subscriber(ID=4003, name="Ida", address="Hillside 2"))
+    agency.remove_subscriber(moved)
+    agency.add_subscriber(Subscriber(ID=4003, name="Ida", address="Hillside 2"))
+
+
 # getting a subscriber by ID:
 def test_get_subscriber_by_id(agency):
     ID = 12222
@@ -116,6 +130,27 @@ def test_subscribe_to_paper(agency, app):
         assert subscriber not in paper.subscribers
 
 
+def test_subscriptions_follow_updates_and_deletions(agency, app):
+    with app.app_context():
+        subscriber = Subscriber(ID=4100, name="Vera", address="Lakeside 4")
+        agency.add_subscriber(subscriber)
+        paper = Newspaper(paper_id=4100, name="Lake News", frequency=7, price=2.00)
+        agency.add_newspaper(paper)
+        agency.subscribe_to_paper(subscriber, paper)
+        # updating the subscriber keeps the subscription (and the paper sees the updated subscriber)
+        updated_subscriber = Subscriber(ID=4100, name="Vera", address="Seaside 5")
+        agency.update_subscriber(subscriber, updated_subscriber)
+        assert list(paper.subscribers)[0] is updated_subscriber
+        # updating the paper is visible in the subscription list
+        updated_paper = Newspaper(paper_id=4100, name="Lake News", frequency=7, price=3.00)
+        agency.update_newspaper(paper, updated_paper)
+        assert updated_subscriber.newspaper_list.get(4100).price == 3.00
+        # deleting the paper stops the subscription
+        agency.remove_newspaper(updated_paper)
+        assert updated_paper not in updated_subscriber.newspaper_list
+        assert len(updated_subscriber.newspaper_list) == 0
+
+
 # check for missing issues
 def test_check_missingissues(agency, app):
     with app.app_context():
@@ -137,3 +172,102 @@ def test_check_missingissues(agency, app):
         agency.deliver_issue(subscriber, new_issue, paper)
         assert before != len(agency.check_missingissues(subscriber))
         assert agency.check_missingissues(subscriber) == "Undelivered Issues from: []"
+
+
+def test_missingissues_follow_release_delivery_and_subscription(agency, app):
+    with app.app_context():
+        paper = Newspaper(paper_id=4200, name="Harbour Times", frequency=1, price=1.50)
+        agency.add_newspaper(paper)
+        first = Issue(issue_id=1, releasedate=2026-3-1, released=False, editor_id=1, pages=4)
+        second = Issue(issue_id=2, releasedate=2026-3-2, released=False, editor_id=1, pages=4)
+        agency.add_issue(paper, first)
+        agency.add_issue(paper, second)
+        agency.release_issue(first)  # released before the subscription
+        subscriber = Subscriber(ID=4200, name="Otto", address="Pier 1")
+        agency.add_subscriber(subscriber)
+        agency.subscribe_to_paper(subscriber, paper)
+        assert agency.check_missingissues(subscriber) == "Undelivered Issues from: ['Harbour Times: Issues with ID 1 ']"
+        agency.release_issue(second)  # released after the subscription
+        assert agency.check_missingissues(subscriber) == "Undelivered Issues from: ['Harbour Times: Issues with ID 1, 2 ']"
+        agency.deliver_issue(subscriber, first, paper)
+        agency.remove_issue(paper, second)
+        assert agency.check_missingissues(subscriber) == "Undelivered Issues from: []"
+
+
+def test_subscriber_stats_follow_price_updates_and_subscriptions(agency, app):
+    with app.app_context():
+        paper = Newspaper(paper_id=4300, name="Valley Daily", frequency=1, price=2.00)
+        agency.add_newspaper(paper)
+        issue = Issue(issue_id=1, releasedate=2026-4-1, released=False, editor_id=1, pages=4)
+        agency.add_issue(paper, issue)
+        agency.release_issue(issue)
+        subscriber = Subscriber(ID=4300, name="Nina", address="Valley 3")
+        agency.add_subscriber(subscriber)
+        agency.deliver_issue(subscriber, issue, paper)  # special issue, no subscription yet
+        assert agency.get_subscriber_stats(subscriber).get_json() == (
+            "Number of newspaper subscriptions: 0 "
+            "Cost: 0 monthly or 0 annually "
+            "Number of Issues received from: [] "
+            "Special issues without subscription: Issue with ID 1 from 'Valley Daily', ")
+        agency.subscribe_to_paper(subscriber, paper)
+        agency.update_newspaper(paper, Newspaper(paper_id=4300, name="Valley Daily", frequency=1, price=2.50))
+        assert agency.get_subscriber_stats(subscriber).get_json() == (
+            "Number of newspaper subscriptions: 1 "
+            "Cost: 2.5 monthly or 30.0 annually "
+            "Number of Issues received from: ['Valley Daily: 1'] "
+            "Special issues without subscription: ")
+
+
+def test_missingissues_in_subscription_and_issue_order(agency, app):
+    with app.app_context():
+        first_paper = agency.add_newspaper(Newspaper(paper_id=9300, name="Morning Order", frequency=1, price=1.00))
+        second_paper = agency.add_newspaper(Newspaper(paper_id=9301, name="Evening Order", frequency=1, price=1.00))
+        subscriber = agency.add_subscriber(Subscriber(ID=9300, name="Orla", address="Order Lane 1"))
+        agency.subscribe_to_paper(subscriber, first_paper)
+        agency.subscribe_to_paper(subscriber, second_paper)
+        issues = {(paper.paper_id, issue_id): agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}",
+                                                                            editor_id=1, pages=paper.paper_id + issue_id))
+                  for paper in [first_paper, second_paper] for issue_id in [1, 2, 3]}
+        # released out of order: the second paper first, the issues of the first paper backwards
+        for key in [(9301, 2), (9300, 3), (9301, 1), (9300, 1), (9300, 2)]:
+            agency.release_issue(issues[key])
+        assert agency.missing_issue_parts(subscriber) == [["Morning Order", [1, 2, 3]], ["Evening Order", [1, 2]]]
+        assert agency.check_missingissues(subscriber) == ("Undelivered Issues from: ['Morning Order: Issues with ID 1, 2, 3 ', "
+                                                          "'Evening Order: Issues with ID 1, 2 ']")
+        # updated issues keep their place, and so do the issues of an updated newspaper
+        agency.update_issue(first_paper, issues[9300, 1], Issue(issue_id=1, releasedate="day 1", released=True, editor_id=1,
+                                                                pages=9399, newspaper_id=9300))
+        first_paper = agency.update_newspaper(first_paper, Newspaper(paper_id=9300, name="Morning Order", frequency=2,
+                                                                     price=1.00))
+        agency.release_issue(agency.add_issue(first_paper, Issue(issue_id=4, releasedate="day 4", editor_id=1, pages=9304)))
+        agency.release_issue(issues[9301, 3])
+        assert agency.missing_issue_parts(agency.get_subscriber(9300)) == [["Morning Order", [1, 2, 3, 4]],
+                                                                           ["Evening Order", [1, 2, 3]]]
+
+
+def test_subscriber_stats_dont_count_removed_issues(agency, app):
+    with app.app_context():
+        paper = agency.add_newspaper(Newspaper(paper_id=9400, name="Shrinking Herald", frequency=1, price=2.00))
+        other_paper = agency.add_newspaper(Newspaper(paper_id=9401, name="Special Courier", frequency=1, price=2.00))
+        subscriber = agency.add_subscriber(Subscriber(ID=9400, name="Stella", address="Count Street 1"))
+        agency.subscribe_to_paper(subscriber, paper)
+        issues = [agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1,
+                                                pages=9400 + issue_id)) for issue_id in [1, 2]]
+        special = agency.add_issue(other_paper, Issue(issue_id=1, releasedate="day 1", editor_id=1, pages=9401))
+        for issue in issues + [special]:
+            agency.release_issue(issue)
+            agency.deliver_issue(subscriber, issue, agency.get_newspaper(issue.newspaper_id))
+        assert agency.get_subscriber_stats(subscriber).get_json() == (
+            "Number of newspaper subscriptions: 1 "
+            "Cost: 2.0 monthly or 24.0 annually "
+            "Number of Issues received from: ['Shrinking Herald: 2'] "
+            "Special issues without subscription: Issue with ID 1 from 'Special Courier', ")
+        agency.remove_issue(paper, issues[0])
+        agency.remove_newspaper(other_paper)
+        assert agency.get_subscriber_stats(subscriber).get_json() == (
+            "Number of newspaper subscriptions: 1 "
+            "Cost: 2.0 monthly or 24.0 annually "
+            "Number of Issues received from: ['Shrinking Herald: 1'] "
+            "Special issues without subscription: ")
+        agency.remove_issue(paper, issues[1])
+        assert agency.get_subscriber(9400).received == {}
@@ -0,0 +1,133 @@
+import random
+import sys
+import threading
+from collections import Counter
+
+from ...src.model.agency import Agency
+from ...src.model.editor import Editor
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.subscriber import Subscriber
+from ..fixtures import app, client, agency
+
+
+def check_consistency(agency):
+    # every index of the agency agrees with the objects it was built from
+    issues = [issue for paper in agency.newspapers for issue in paper.issues]
+    for paper in agency.newspapers:
+        assert paper.issue_contents == Counter(issue.content_key() for issue in paper.issues)
+        for subscriber in paper.subscribers:
+            assert paper in subscriber.newspaper_list
+            missing = {issue.issue_id for issue in paper.issues if issue.released and issue.key() not in subscriber.delivered}
+            assert set(subscriber.missing.get(paper.paper_id, ())) == missing
+    for editor in agency.editors:
+        assert set(editor.issues_list.keys()) == {issue.key() for issue in issues if issue.editor_id == editor.ID}
+        assert all(paper.issues.get(issue.issue_id) is issue for issue in editor.issues_list
+                   for paper in [agency.get_newspaper(issue.newspaper_id)])
+    workload = Counter((issue.newspaper_id, issue.editor_id) for issue in issues if issue.editor_id != 0)
+    assert {(paper_id, editor_id): count for paper_id, editors in agency.paper_editors.items()
+            for editor_id, count in editors.items()} == workload
+    for subscriber in agency.subscribers:
+        assert subscriber.received == Counter(issue.newspaper_id for issue in subscriber.issues_list)
+
+
+def test_concurrent_changes_keep_the_agency_consistent(app):
+    agency = Agency()  # a separate agency, the threads change a lot
+    with app.app_context():
+        for editor_id in range(1, 5):
+            agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address="Office"))
+        papers = [agency.add_newspaper(Newspaper(paper_id=paper_id, name=f"Paper {paper_id}", frequency=1, price=paper_id))
+                  for paper_id in [1, 2]]
+        for ID in range(1, 9):
+            agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address="Home"))
+        for paper in papers:
+            for issue_id in range(1, 26):
+                agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=1 + issue_id % 4, pages=1))
+    next_editor = iter(range(100, 100000))
+
+    def change(rng):
+        paper = rng.choice(papers)
+        subscriber = agency.get_subscriber(rng.randrange(1, 9))
+        operation = rng.randrange(8)
+        # the compound operations (look up, check, change) hold the write lock, like a request of the API
+        with agency.lock.write():
+            issue = paper.issues.get(rng.randrange(1, 26))
+            editor_ids = list(agency.editors.keys())
+            if operation == 0:
+                updated = Issue(issue_id=issue.issue_id, releasedate=issue.releasedate, released=issue.released,
+                                editor_id=rng.choice(editor_ids), pages=rng.randrange(1, 50), newspaper_id=paper.paper_id)
+                if updated != issue:
+                    agency.update_issue(paper, issue, updated)
+            elif operation == 1 and not issue.released and issue.editor_id != 0:
+                agency.release_issue(issue)
+            elif operation == 2 and issue.released and issue.key() not in subscriber.delivered:
+                agency.deliver_issue(subscriber, issue, paper)
+            elif operation == 3 and subscriber not in paper.subscribers:
+                agency.subscribe_to_paper(subscriber, paper)
+            elif operation == 4 and len(editor_ids) > 2:
+                agency.remove_editor(agency.get_editor(rng.choice(editor_ids)))
+                editor_id = next(next_editor)
+                agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address="Office"))
+            elif operation == 5 and issue.editor_id == 0:
+                agency.add_editor_to_issue(issue, agency.get_editor(rng.choice(editor_ids)))
+        # and the readers run next to them
+        if operation == 6:
+            agency.get_subscriber_stats(subscriber)
+            agency.check_missingissues(subscriber)
+        elif operation == 7:
+            agency.issue_stats(paper)
+            agency.all_issues(paper)
+
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            with app.app_context():
+                for _ in range(300):
+                    change(rng)
+        except Exception as error:  # reported by the main thread
+            errors.append(error)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible, to run into the races
+    try:
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    check_consistency(agency)
+
+
+def test_requests_from_many_threads(client, agency):
+    client.post("/newspaper/", json={"paper_id": 4900, "name": "Threaded Times", "frequency": 1, "price": 1.0})
+    editor_id = next(iter(agency.editors.keys()))
+    errors = []
+
+    def worker(thread_id):
+        try:
+            for i in range(20):
+                issue_id = thread_id * 100 + i
+                assert client.post("/newspaper/4900/issue", json={"issue_id": issue_id, "releasedate": f"day {issue_id}",
+                                                                  "released": False, "editor_id": editor_id, "pages": i}).status_code == 200
+                assert client.post(f"/newspaper/4900/issue/{issue_id}/release").status_code == 200
+                assert client.get("/newspaper/4900/issue?limit=10").status_code == 200
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(thread_id,)) for thread_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    paper = agency.get_newspaper(4900)
+    assert len(paper.issues) == 160 and all(issue.released for issue in paper.issues)
+    # (the shared testdata has been changed by hand in other tests, so only the new paper is checked)
+    assert paper.issue_contents == Counter(issue.content_key() for issue in paper.issues)
+    assert all(issue.key() in agency.get_editor(editor_id).issues_list.keys() for issue in paper.issues)
+    assert agency.paper_editors[4900] == {editor_id: 160}
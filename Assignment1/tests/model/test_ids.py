@@ -0,0 +1,71 @@
+import threading
+
+from ...src.model.ids import IdAllocator
+
+
+def test_allocate_requested_id_if_free():
+    ids = IdAllocator()
+    assert ids.allocate(5) == 5
+    assert ids.allocate(7) == 7
+    assert 5 in ids and 6 not in ids
+
+
+def test_allocate_next_free_id():
+    ids = IdAllocator()
+    for ID in [0, 1, 2, 4]:
+        ids.claim(ID)
+    assert ids.allocate(0) == 3  # fills the gap and joins the two runs
+    assert ids.allocate(1) == 5
+    assert ids.allocate(10) == 10
+
+
+def test_released_ids_are_reused():
+    ids = IdAllocator()
+    for _ in range(5):
+        ids.allocate(0)  # 0 - 4
+    ids.release(2)
+    assert 2 not in ids
+    assert ids.allocate(0) == 2
+    ids.release(0)
+    ids.release(4)
+    assert ids.allocate(0) == 0
+    assert ids.allocate(0) == 4
+
+
+def test_claim_all_merges_the_runs():
+    ids = IdAllocator()
+    ids.claim(3)
+    ids.claim_all([9, 1, 2, 4, 10, 7, 2])
+    assert [ID for ID in range(12) if ID in ids] == [1, 2, 3, 4, 7, 9, 10]
+    assert ids.allocate(1) == 5
+    assert ids.allocate(9) == 11
+
+
+def test_reserve_gives_the_id_back_on_error():
+    ids = IdAllocator()
+    try:
+        with ids.reserve(1) as ID:
+            assert ID in ids
+            raise ValueError("adding failed")
+    except ValueError:
+        pass
+    assert 1 not in ids
+    with ids.reserve(1) as ID:
+        pass
+    assert ID == 1 and 1 in ids
+
+
+def test_concurrent_allocations_are_unique():
+    ids = IdAllocator()
+    results = []
+
+    def worker():
+        for _ in range(500):
+            results.append(ids.allocate(0))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == list(range(8 * 500))
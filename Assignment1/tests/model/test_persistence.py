@@ -0,0 +1,127 @@
+import io
+import os
+
+import pytest
+
+from ...src.app import create_app
+from ...src.model.agency import Agency
+from ...src.model.editor import Editor
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.persistence import Persistence
+from ...src.model.snapshot import dump_snapshot
+from ...src.model.subscriber import Subscriber
+from ...src.model.wal import WriteAheadLog
+from ..fixtures import app
+
+
+def state(agency) -> bytes:
+    file = io.BytesIO()
+    dump_snapshot(agency, file)
+    return file.getvalue()
+
+
+def make_changes(agency, first_id=1):
+    # one of every change the agency logs
+    for editor_id in [first_id, first_id + 1]:
+        agency.add_editor(Editor(ID=editor_id, name=f"Editor {editor_id}", address="Office"))
+    paper = agency.add_newspaper(Newspaper(paper_id=first_id, name=f"Paper {first_id}", frequency=7, price=1.1))
+    other = agency.add_newspaper(Newspaper(paper_id=first_id + 1, name=f"Other {first_id}", frequency=1, price=0.2))
+    subscribers = [agency.add_subscriber(Subscriber(ID=ID, name=f"Reader {ID}", address="Home"))
+                   for ID in range(first_id, first_id + 3)]
+    for subscriber in subscribers[:2]:
+        agency.subscribe_to_paper(subscriber, paper)
+    issues = [agency.add_issue(paper, Issue(issue_id=issue_id, releasedate=f"day {issue_id}", editor_id=first_id + issue_id % 2,
+                                            pages=issue_id)) for issue_id in range(1, 6)]
+    unassigned = agency.add_issue(other, Issue(issue_id=1, releasedate="special", editor_id=0, pages=2))
+    agency.add_editor_to_issue(unassigned, agency.get_editor(first_id))
+    for issue in issues[:3] + [unassigned]:
+        agency.release_issue(issue)
+    agency.deliver_issue(subscribers[0], issues[0], paper)
+    agency.deliver_issue(subscribers[2], unassigned, other)  # a special issue
+    agency.deliver_issue_to_subscribers(issues[1], paper)
+    agency.update_issue(paper, issues[4], Issue(issue_id=5, releasedate="day 5", editor_id=first_id, pages=50,
+                                                newspaper_id=paper.paper_id))
+    agency.remove_issue(paper, issues[2])
+    agency.update_newspaper(paper, Newspaper(paper_id=paper.paper_id, name=f"Paper {first_id}", frequency=7, price=2.2))
+    agency.update_subscriber(subscribers[1], Subscriber(ID=subscribers[1].ID, name="Moved Reader", address="Away"))
+    agency.update_editor(agency.get_editor(first_id + 1), Editor(ID=first_id + 1, name="Renamed Editor", address="Office"))
+    agency.remove_editor(agency.get_editor(first_id))
+    agency.remove_subscriber(subscribers[2])
+    agency.remove_newspaper(other)
+
+
+def test_state_is_restored_from_the_log(app, tmp_path):
+    with app.app_context():
+        agency = Agency()
+        persistence = Persistence(str(tmp_path))
+        persistence.open(agency)
+        make_changes(agency)
+        persistence.close()
+
+        restored = Agency()
+        Persistence(str(tmp_path)).open(restored)
+        assert state(restored) == state(agency)
+        assert restored.get_subscriber(2).name == "Moved Reader"
+        assert [issue.issue_id for issue in restored.get_editor(2).issues_list] == [1, 2, 4, 5]  # and the issues of the removed editor
+
+
+def test_state_is_restored_from_a_snapshot_and_the_log_after_it(app, tmp_path):
+    with app.app_context():
+        agency = Agency()
+        persistence = Persistence(str(tmp_path), fsync="never", snapshot_every=15)
+        persistence.open(agency)
+        make_changes(agency)
+        make_changes(agency, first_id=100)
+        assert persistence.snapshot_records > 0
+        persistence.close()
+        # only the latest snapshot and the segments after it are kept
+        files = sorted(os.listdir(tmp_path))
+        assert len([name for name in files if name.startswith("snapshot-")]) == 1
+        assert all(int(name[4:-4]) >= persistence.snapshot_records for name in files if name.startswith("log-"))
+
+        restored = Agency()
+        Persistence(str(tmp_path)).open(restored)
+        assert state(restored) == state(agency)
+        # and it goes on logging where it stopped
+        restored.add_subscriber(Subscriber(ID=500, name="New Reader", address="Home"))
+        restored.log.close()
+        again = Agency()
+        Persistence(str(tmp_path)).open(again)
+        assert state(again) == state(restored)
+
+
+def test_partly_written_record_is_cut_off(app, tmp_path):
+    with app.app_context():
+        agency = Agency()
+        persistence = Persistence(str(tmp_path), fsync="interval")
+        persistence.open(agency)
+        make_changes(agency)
+        persistence.close()
+        expected = state(agency)
+        log = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[-1])
+        with open(log, "ab") as file:
+            file.write(b'["add_subscriber",90,"Half wri')  # a crash during the write
+
+        restored = Agency()
+        Persistence(str(tmp_path)).open(restored)
+        assert state(restored) == expected
+        restored.log.close()
+        assert open(log, "rb").read().endswith(b"\n")
+
+        # a damaged record in the middle of the log isn't a crash, the log can't be trusted
+        with open(log, "r+b") as file:
+            file.write(b"{")
+        with pytest.raises(ValueError):
+            Persistence(str(tmp_path)).open(Agency())
+
+
+def test_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        WriteAheadLog(os.path.join(tmp_path, "log"), fsync="sometimes")
+
+
+def test_snapshot_interval_from_the_environment(monkeypatch):
+    assert create_app().config["SNAPSHOT_EVERY"] == 1_000_000
+    monkeypatch.setenv("PAPERBACK_SNAPSHOT_EVERY", "500")
+    assert create_app().config["SNAPSHOT_EVERY"] == 500
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from ...src.model.rwlock import ReadWriteLock
+
+
+def run(target) -> threading.Thread:
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    both_inside = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            both_inside.wait()  # only passes if the other reader is inside at the same time
+
+    threads = [run(reader), run(reader)]
+    for thread in threads:
+        thread.join(5)
+    assert not both_inside.broken
+
+
+def test_writer_waits_for_readers_and_new_readers_wait_for_the_writer():
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_read()
+    writer = run(lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    time.sleep(0.05)
+    reader = run(lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+    time.sleep(0.05)
+    assert events == []  # the writer waits for the reader, the new reader waits for the waiting writer
+    lock.release_read()
+    writer.join(5)
+    reader.join(5)
+    assert events == ["write", "read"]
+
+
+def test_lock_is_reentrant():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():  # a writer can also read
+                pass
+    with lock.read():
+        with lock.read():
+            with pytest.raises(RuntimeError):
+                lock.acquire_write()  # two readers upgrading at the same time would deadlock
+    # everything was released
+    assert run(lambda: lock.acquire_write()).join(5) is None and lock._writer is not None
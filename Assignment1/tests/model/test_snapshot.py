@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from ...src.model.agency import Agency
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.snapshot import dump_snapshot, load_snapshot
+from ...src.model.subscriber import Subscriber
+from ..fixtures import app
+from .test_persistence import make_changes
+
+
+def describe(agency):
+    # everything the agency keeps, read through the objects (independent of the snapshot format)
+    def issue(issue):
+        return issue.newspaper_id, issue.issue_id, issue.releasedate, issue.released, issue.editor_id, issue.pages
+
+    return ([(paper.paper_id, paper.name, paper.frequency, paper.price, type(paper.price), [issue(i) for i in paper.issues],
+              [i.issue_id for i in paper.issues.page(None, 100)[0]], list(paper.subscribers.keys()),
+              paper.issue_contents, list(paper.issue_ids._starts)) for paper in agency.newspapers],
+            [(editor.ID, editor.name, editor.address, [issue(i) for i in editor.issues_list],
+              [issue(i) for i in editor.issues_list.page(None, 100)[0]]) for editor in agency.editors],
+            [(subscriber.ID, subscriber.name, subscriber.address, list(subscriber.newspaper_list.keys()),
+              [issue(i) for i in subscriber.issues_list], subscriber.missing, subscriber.monthly_cost,
+              type(subscriber.monthly_cost), subscriber.received, subscriber.special_issues) for subscriber in agency.subscribers],
+            agency.paper_editors, agency.paper_receivers, agency.removed_deliveries, agency.paper_undelivered,
+            agency.newspaper_contents, agency.editor_contents, agency.subscriber_contents,
+            [list(ids._starts) + list(ids._ends) for ids in [agency.newspaper_ids, agency.editor_ids, agency.subscriber_ids]])
+
+
+def save_and_load(agency, path):
+    with open(path, "wb") as file:
+        dump_snapshot(agency, file)
+    restored = Agency()
+    load_snapshot(restored, path)
+    return restored
+
+
+def test_snapshot_restores_the_agency(app, tmp_path):
+    with app.app_context():
+        agency = Agency()
+        make_changes(agency)
+        # a free price, a name that isn't ASCII and an issue that was delivered and then removed
+        paper = agency.add_newspaper(Newspaper(paper_id=20, name="Zeitung für Ü", frequency=1, price=3))
+        reader = agency.add_subscriber(Subscriber(ID=20, name="Léa 📰", address="Straße 1"))
+        gone = agency.add_issue(paper, Issue(issue_id=1, releasedate="heute", editor_id=2, pages=1))
+        agency.release_issue(gone)
+        agency.subscribe_to_paper(reader, paper)
+        agency.deliver_issue(reader, gone, paper)
+        agency.remove_issue(paper, gone)
+
+        restored = save_and_load(agency, os.path.join(tmp_path, "state.snap"))
+        assert describe(restored) == describe(agency)
+        # the issues are shared between the lists again, like before
+        editor_issue = restored.get_editor(2).issues_list.get((1, 1))
+        assert restored.get_newspaper(1).issues.get(1) is editor_issue
+        assert restored.get_subscriber(1).issues_list.get((1, 1)) is editor_issue
+        assert restored.get_subscriber(20).newspaper_list.get(20) is restored.get_newspaper(20)
+        # and the loaded agency works like any other
+        restored.add_subscriber(Subscriber(ID=21, name="Another Reader", address="Home"))
+        with pytest.raises(ValueError):
+            restored.add_newspaper(Newspaper(paper_id=30, name="Zeitung für Ü", frequency=1, price=3))
+        assert restored.newspaper_ids.allocate(1) == 2
+        assert restored.subscriber_ids.allocate(1) == 3
+
+
+def test_empty_agency(tmp_path):
+    restored = save_and_load(Agency(), os.path.join(tmp_path, "empty.snap"))
+    assert describe(restored) == describe(Agency())
+
+
+def test_only_snapshots_are_loaded(app, tmp_path):
+    with app.app_context():
+        path = os.path.join(tmp_path, "state.snap")
+        agency = Agency()
+        make_changes(agency)
+        with open(path, "wb") as file:
+            dump_snapshot(agency, file)
+        with pytest.raises(ValueError):  # into an agency that has data
+            load_snapshot(agency, path)
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 4)
+        with pytest.raises(ValueError):
+            load_snapshot(Agency(), path)
+        with open(path, "r+b") as file:
+            file.write(b"NOTASNAP")
+        with pytest.raises(ValueError):
+            load_snapshot(Agency(), path)
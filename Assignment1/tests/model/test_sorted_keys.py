@@ -0,0 +1,46 @@
+import random
+
+from ...src.model.collection import Collection
+from ...src.model.sorted_keys import SortedKeys
+
+
+def test_sorted_keys_follow_adds_and_removes(monkeypatch):
+    monkeypatch.setattr(SortedKeys, "BLOCK_SIZE", 4)  # many small blocks
+    keys = SortedKeys()
+    expected = set()
+    rng = random.Random(7)
+    for _ in range(2000):
+        key = rng.randrange(300)
+        if key in expected:
+            keys.remove(key)
+            expected.remove(key)
+        else:
+            keys.add(key)
+            expected.add(key)
+        after = rng.choice([None, rng.randrange(300)])
+        assert keys.after(after, 25) == sorted(k for k in expected if after is None or k > after)[:25]
+
+
+def test_collection_load_builds_the_sorted_keys(monkeypatch):
+    monkeypatch.setattr(SortedKeys, "BLOCK_SIZE", 4)
+    collection = Collection(lambda x: x, paged=True)
+    collection.load({key: key for key in [12, 3, 7, 1, 9, 5, 11, 2, 8, 4]})
+    assert collection.page(3, 5) == ([4, 5, 7, 8, 9], 9)
+    collection.add(6)
+    collection.remove(11)
+    assert collection.page(None, 20) == ([1, 2, 3, 4, 5, 6, 7, 8, 9, 12], None)
+    assert list(collection) == [12, 3, 7, 1, 9, 5, 2, 8, 4, 6]
+
+
+def test_collection_pages_are_stable_under_changes():
+    collection = Collection(lambda x: x, paged=True)
+    for key in [5, 1, 9, 3, 7]:
+        collection.add(key)
+    page, next_key = collection.page(None, 2)
+    assert (page, next_key) == ([1, 3], 3)
+    collection.remove(1)  # before the cursor, doesn't shift the next page
+    collection.add(4)  # after the cursor, shows up on the next page
+    page, next_key = collection.page(next_key, 2)
+    assert (page, next_key) == ([4, 5], 5)
+    assert collection.page(next_key, 2) == ([7, 9], None)
+    assert list(collection) == [5, 9, 3, 7, 4]  # iterating still gives the insertion order
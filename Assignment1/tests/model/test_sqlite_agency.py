@@ -0,0 +1,214 @@
+import os
+import random
+
+import pytest
+from flask import Response
+
+from ...src.model.agency import Agency
+from ...src.model.editor import Editor
+from ...src.model.issue import Issue
+from ...src.model.newspaper import Newspaper
+from ...src.model.sqlite_agency import SqliteAgency
+from ...src.model.subscriber import Subscriber
+from ..fixtures import app
+from .test_persistence import make_changes
+
+
+def describe(agency):
+    # what both agencies show through the objects and the stats
+    def issue(issue):
+        return issue.newspaper_id, issue.issue_id, issue.releasedate, issue.released, issue.editor_id, issue.pages
+
+    return ([(paper.paper_id, paper.name, paper.frequency, paper.price, [issue(i) for i in paper.issues],
+              list(paper.subscribers.keys()), dict(paper.issue_contents), agency.issue_stats(paper))
+             for paper in agency.all_newspapers()],
+            [(editor.ID, editor.name, editor.address, [issue(i) for i in editor.issues_list]) for editor in agency.all_editors()],
+            [(subscriber.ID, subscriber.name, subscriber.address, list(subscriber.newspaper_list.keys()),
+              [issue(i) for i in subscriber.issues_list], dict(subscriber.missing), subscriber.monthly_cost,
+              dict(subscriber.received), dict(subscriber.special_issues), agency.check_missingissues(subscriber))
+             for subscriber in agency.all_subscribers()],
+            {paper_id: editors for paper_id, editors in agency.paper_editors.items() if editors})
+
+
+def test_same_changes_as_the_agency(app, tmp_path):
+    with app.app_context():
+        agency = Agency()
+        make_changes(agency)
+        stored = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+        make_changes(stored)
+        assert describe(stored) == describe(agency)
+        # and another process (another agency on the same database) reads the same
+        assert describe(SqliteAgency(stored.path)) == describe(agency)
+
+
+def test_missing_issues_are_computed(app, tmp_path):
+    with app.app_context():
+        agency = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+        make_changes(agency)
+        paper = agency.get_newspaper(1)
+        reader = agency.get_subscriber(1)
+        assert reader.missing == {}  # the released issues were delivered or removed
+        released = agency.add_issue(paper, Issue(issue_id=6, releasedate="day 6", editor_id=2, pages=6))
+        version = reader.version
+        agency.release_issue(released)
+        assert 6 in agency.get_subscriber(1).missing[1]
+        assert agency.get_subscriber(1).version != version  # the ETags of the subscriber change with it
+        agency.deliver_issue(reader, released, paper)
+        assert 6 not in agency.get_subscriber(1).missing.get(1, {})
+        assert agency.get_subscriber(1).received[1] == len([i for i in reader.issues_list if i.newspaper_id == 1])
+
+
+def test_a_failing_method_changes_nothing(app, tmp_path):
+    with app.app_context():
+        agency = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=1))
+        errors = agency.add_batch(lambda ID: agency.add_issue(paper, Issue(issue_id=ID, releasedate="day", editor_id=0)),
+                                  [1, 2, 3])
+        assert list(errors) == [1, 2]  # the same content as issue 1
+        assert list(paper.issues.keys()) == [1]
+        with pytest.raises(ValueError):
+            with agency.lock.write():
+                agency.add_subscriber(Subscriber(ID=1, name="Reader", address="Home"))
+                raise ValueError("the request fails")
+        assert agency.get_subscriber(1) is None and len(agency.subscribers) == 0
+        with agency.lock.read(), pytest.raises(RuntimeError):
+            agency.add_subscriber(Subscriber(ID=1, name="Reader", address="Home"))
+
+
+def test_objects_in_use_are_returned_again(app, tmp_path):
+    with app.app_context():
+        agency = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+        paper = agency.add_newspaper(Newspaper(paper_id=1, name="Paper", frequency=1, price=1))
+        assert agency.get_newspaper(1) is paper and agency.all_newspapers() == [paper]
+        other = SqliteAgency(agency.path)
+        other.update_newspaper(other.get_newspaper(1), Newspaper(paper_id=1, name="Paper", frequency=1, price=2))
+        assert agency.get_newspaper(1) is paper and paper.price == 2
+        # the IDs the other process used are skipped
+        other.add_newspaper(Newspaper(paper_id=2, name="Other", frequency=1, price=1))
+        assert agency.newspaper_ids.allocate(2) == 3
+
+
+def test_wal_journal_mode(tmp_path):
+    agency = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+    assert agency._value("PRAGMA journal_mode") == "wal"
+
+
+# randomized operations on both agencies: a few IDs, names and page counts only, so objects are removed and their IDs
+# handed out again, duplicates are rejected and most operations find their objects
+class NotFound(Exception):
+    pass
+
+
+def found(obj):
+    if obj is None:
+        raise NotFound()  # (the API answers 404)
+    return obj
+
+
+def paper_of(agency, paper_id):
+    return found(agency.get_newspaper(paper_id))
+
+
+def issue_of(agency, paper_id, issue_id):
+    return found(agency.get_issue(paper_of(agency, paper_id), issue_id))
+
+
+def update_issue(agency, paper_id, issue_id, editor_id, pages):
+    issue = issue_of(agency, paper_id, issue_id)
+    return agency.update_issue(paper_of(agency, paper_id), issue, Issue(
+        issue_id=issue_id, releasedate="day", released=issue.released, editor_id=editor_id, pages=pages,
+        newspaper_id=issue.newspaper_id))
+
+
+OPERATIONS = {
+    "add_newspaper": lambda agency, paper_id, name, price: agency.add_newspaper(Newspaper(paper_id, name, 1, price)),
+    "update_newspaper": lambda agency, paper_id, name, price: agency.update_newspaper(
+        paper_of(agency, paper_id), Newspaper(paper_id, name, 1, price)),
+    "remove_newspaper": lambda agency, paper_id: agency.remove_newspaper(paper_of(agency, paper_id)),
+    "add_editor": lambda agency, ID, name: agency.add_editor(Editor(ID, name, "Office")),
+    "update_editor": lambda agency, ID, name: agency.update_editor(found(agency.get_editor(ID)), Editor(ID, name, "Office")),
+    "remove_editor": lambda agency, ID: agency.remove_editor(found(agency.get_editor(ID))),
+    "add_subscriber": lambda agency, ID, name: agency.add_subscriber(Subscriber(ID, name, "Home")),
+    "update_subscriber": lambda agency, ID, name: agency.update_subscriber(
+        found(agency.get_subscriber(ID)), Subscriber(ID, name, "Home")),
+    "remove_subscriber": lambda agency, ID: agency.remove_subscriber(found(agency.get_subscriber(ID))),
+    "subscribe_to_paper": lambda agency, ID, paper_id: agency.subscribe_to_paper(
+        found(agency.get_subscriber(ID)), paper_of(agency, paper_id)),
+    "add_issue": lambda agency, paper_id, issue_id, editor_id, pages: agency.add_issue(
+        paper_of(agency, paper_id), Issue(issue_id=issue_id, releasedate="day", editor_id=editor_id, pages=pages,
+                                          newspaper_id=paper_id)),
+    "update_issue": update_issue,
+    "remove_issue": lambda agency, paper_id, issue_id: agency.remove_issue(
+        paper_of(agency, paper_id), issue_of(agency, paper_id, issue_id)),
+    "release_issue": lambda agency, paper_id, issue_id: agency.release_issue(issue_of(agency, paper_id, issue_id)),
+    "add_editor_to_issue": lambda agency, paper_id, issue_id, editor_id: agency.add_editor_to_issue(
+        issue_of(agency, paper_id, issue_id), found(agency.get_editor(editor_id))),
+    "deliver_issue": lambda agency, paper_id, issue_id, ID: agency.deliver_issue(
+        found(agency.get_subscriber(ID)), issue_of(agency, paper_id, issue_id), paper_of(agency, paper_id)),
+    "deliver_issue_to_subscribers": lambda agency, paper_id, issue_id: agency.deliver_issue_to_subscribers(
+        issue_of(agency, paper_id, issue_id), paper_of(agency, paper_id)),
+    "issue_stats": lambda agency, paper_id: agency.issue_stats(paper_of(agency, paper_id)),
+    "newspaper_stats": lambda agency, paper_id: agency.newspaper_stats(paper_of(agency, paper_id)),
+    "get_editor_issues": lambda agency, ID: agency.get_editor_issues(found(agency.get_editor(ID))),
+    "get_subscriber_stats": lambda agency, ID: agency.get_subscriber_stats(found(agency.get_subscriber(ID))),
+    "check_missingissues": lambda agency, ID: agency.check_missingissues(found(agency.get_subscriber(ID))),
+}
+
+
+def random_operations(seed: int, count: int):
+    rng = random.Random(seed)
+    ID = lambda: rng.randint(1, 3)  # (of newspapers, issues, editors and subscribers)
+    editor_id = lambda: rng.randint(0, 3)
+    paper = lambda: (ID(), rng.choice(["Alpha", "Beta", "Gamma"]), rng.choice([1, 2.5]))
+    person = lambda: (ID(), rng.choice(["Ann", "Ben", "Cid"]))
+    arguments = {"add_newspaper": paper, "update_newspaper": paper, "remove_newspaper": lambda: (ID(),),
+                 "add_editor": person, "update_editor": person, "remove_editor": lambda: (ID(),),
+                 "add_subscriber": person, "update_subscriber": person, "remove_subscriber": lambda: (ID(),),
+                 "subscribe_to_paper": lambda: (ID(), ID()),
+                 "add_issue": lambda: (ID(), ID(), editor_id(), rng.randint(1, 3)),
+                 "update_issue": lambda: (ID(), ID(), editor_id(), rng.randint(1, 3)),
+                 "remove_issue": lambda: (ID(), ID()), "release_issue": lambda: (ID(), ID()),
+                 "add_editor_to_issue": lambda: (ID(), ID(), ID()), "deliver_issue": lambda: (ID(), ID(), ID()),
+                 "deliver_issue_to_subscribers": lambda: (ID(), ID()),
+                 "issue_stats": lambda: (ID(),), "newspaper_stats": lambda: (ID(),), "get_editor_issues": lambda: (ID(),),
+                 "get_subscriber_stats": lambda: (ID(),), "check_missingissues": lambda: (ID(),)}
+    # (adding, releasing and delivering more often, so there is something to remove)
+    names = (list(arguments) + ["add_newspaper", "add_editor", "add_subscriber", "subscribe_to_paper"]
+             + ["add_issue", "release_issue", "deliver_issue"] * 3)
+    return [(name, arguments[name]()) for name in (rng.choice(names) for _ in range(count))]
+
+
+def respond(agency, name: str, values: tuple):
+    # what the API would answer, from the result of the operation (or its error)
+    def issue(issue):
+        return issue.newspaper_id, issue.issue_id, issue.releasedate, issue.released, issue.editor_id, issue.pages
+
+    try:
+        result = OPERATIONS[name](agency, *values)
+    except NotFound:
+        return 404
+    except ValueError as error:
+        return 500, str(error)
+    if isinstance(result, Response):
+        return result.get_json()
+    elif isinstance(result, Issue):
+        return issue(result)
+    elif isinstance(result, Newspaper):
+        return result.paper_id, result.name, result.frequency, result.price
+    elif isinstance(result, Subscriber):  # (and editors)
+        return result.ID, result.name, result.address
+    elif isinstance(result, list):
+        return [issue(i) for i in result]
+    return result
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 4])
+def test_same_responses_as_the_agency(app, tmp_path, seed):
+    with app.app_context():
+        agency = Agency()
+        stored = SqliteAgency(os.path.join(tmp_path, "agency.sqlite3"))
+        for step, (name, values) in enumerate(random_operations(seed, 600)):
+            assert respond(stored, name, values) == respond(agency, name, values), (step, name, values)
+            if step % 50 == 49:
+                assert describe(stored) == describe(agency), (step, name, values)
+        assert describe(stored) == describe(agency)
@@ -11,10 +11,11 @@ def create_newspapers(agency: Agency):
     paper3 = Newspaper(paper_id=115, name="Wall Street Journal", frequency=1, price=3.00)  # issue 1 & 2 added by test_post_add_issues and test_check_missingissues
     paper4 = Newspaper(paper_id=125, name="National Geographic", frequency=30, price=34.00)  # deleted by test_delete_newspaper
     paper5 = Newspaper(paper_id=135, name="Kronen Zeitung", frequency=15, price=30.00)  # issue_id 1, 10 & 20 added by test_get_check_missingissues, test_add_issue & test_update_issue
-    agency.newspapers.extend([paper1, paper2, paper3, paper4, paper5])
+    for paper in [paper1, paper2, paper3, paper4, paper5]:
+        agency.add_newspaper(paper)
 
 
-def create_issues(newspaper: Newspaper):
+def create_issues(agency: Agency, newspaper: Newspaper):
     issue1 = Issue(issue_id=90, releasedate=2024-10-15, released=False, editor_id=1, pages=33, newspaper_id=newspaper.paper_id)  # released and delivered to subscriber 10 by test_subscriber_stats
     issue2 = Issue(issue_id=91, releasedate=2024-10-17, released=False, editor_id=0, pages=23, newspaper_id=newspaper.paper_id)  # not released for test_deliver_issue_not_released
     issue3 = Issue(issue_id=92, releasedate=2024-11-19, released=False, editor_id=102, pages=23, newspaper_id=newspaper.paper_id)  # delivered to subscriber 180 by test_deliver_issue
@@ -23,7 +24,8 @@ def create_issues(newspaper: Newspaper):
     issue6 = Issue(issue_id=95, releasedate=2024-12-18, released=False, editor_id=0, pages=5, newspaper_id=newspaper.paper_id)  # editor 1 added by test_post_editor_to_issue # delivered to subscriber 103 by test_post_deliver_issue
     issue7 = Issue(issue_id=96, releasedate=2024-12-28, released=False, editor_id=1, pages=30, newspaper_id=newspaper.paper_id)  # issue released by test_post_release_issue
     issue8 = Issue(issue_id=97, releasedate=2024-10-28, released=False, editor_id=0, pages=30, newspaper_id=newspaper.paper_id)  # editor 1 added by test_add_editor_to_issue
-    newspaper.issues.extend([issue1, issue2, issue3, issue4, issue5, issue6, issue7, issue8])
+    for issue in [issue1, issue2, issue3, issue4, issue5, issue6, issue7, issue8]:
+        agency.add_issue(newspaper, issue)
 
 
 def create_editor(agency: Agency):  # for simplicity, I just added first names
@@ -32,7 +34,8 @@ def create_editor(agency: Agency):  # for simplicity, I just added first names
     editor3 = Editor(ID=108, name="Osiris", address="Pyramidsstreet 42")  # deleted by test_delete_editor
     editor4 = Editor(ID=130, name="Josef", address="Josefstreet 9")  # updated by test_post_update_editor
     editor5 = Editor(ID=131, name="Joey", address="Joeystreet 9")  # updated by test_update_editor
-    agency.editors.extend([editor1, editor2, editor3, editor4, editor5])
+    for editor in [editor1, editor2, editor3, editor4, editor5]:
+        agency.add_editor(editor)
 
 
 def create_subscribers(agency: Agency):  # for simplicity, I just added first names
@@ -43,7 +46,8 @@ def create_subscribers(agency: Agency):  # for simplicity, I just added first na
     subscriber5 = Subscriber(ID=160, name="Emanuel", address="Treestreet 36")  # subscribed to paper_id 100 by test_post_subscribe_to_a_newspaper
     subscriber6 = Subscriber(ID=170, name="Alisa", address="Flowerstreet 37")  # subscribed to paper_id 135 by test_get_check_missingissues  # not subscribed to paper_id 100 for test_deliver_issue_without_subscription
     subscriber7 = Subscriber(ID=180, name="Alfred", address="Flowerstreet 37")  # subscribed to paper_id 100 and delivered issue_id 92 by test_deliver_issue
-    agency.subscribers.extend([subscriber1, subscriber2, subscriber3, subscriber4, subscriber5, subscriber6, subscriber7])
+    for subscriber in [subscriber1, subscriber2, subscriber3, subscriber4, subscriber5, subscriber6, subscriber7]:
+        agency.add_subscriber(subscriber)
 
 
 def populate(agency: Agency):
@@ -52,5 +56,5 @@ def populate(agency: Agency):
     create_subscribers(agency)
 
 
-def populate_issues(newspaper: Newspaper):
-    create_issues(newspaper)
+def populate_issues(agency: Agency, newspaper: Newspaper):
+    create_issues(agency, newspaper)